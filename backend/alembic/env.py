@@ -12,7 +12,8 @@ config = context.config
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+    # Garder les loggers existants (serveur) quand les migrations sont lancées par bootstrap
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
 
 # Ajouter le chemin du projet au sys.path pour pouvoir importer les modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
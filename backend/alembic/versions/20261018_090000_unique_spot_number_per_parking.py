@@ -0,0 +1,46 @@
+"""unique_spot_number_per_parking
+
+Revision ID: 3f9c2a7d1e64
+Revises: b65ae1c80db7
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2a7d1e64'
+down_revision: Union[str, None] = 'b65ae1c80db7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Les doublons existants empêcheraient la création de l'index unique
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT parking_id, number, COUNT(*) FROM parking_spots "
+        "GROUP BY parking_id, number HAVING COUNT(*) > 1"
+    )).fetchall()
+    if duplicates:
+        details = ", ".join(f"parking {row[0]} / numéro {row[1]}" for row in duplicates[:20])
+        raise RuntimeError(
+            f"Numéros d'emplacement en double à corriger avant la migration : {details}"
+        )
+
+    op.create_index(
+        'ix_parking_spots_parking_id_number', 'parking_spots',
+        ['parking_id', 'number'], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Sous MySQL, l'index unique supporte aussi la clé étrangère parking_id :
+    # un index simple doit le remplacer avant sa suppression
+    if op.get_bind().dialect.name == 'mysql':
+        op.create_index('ix_parking_spots_parking_id', 'parking_spots', ['parking_id'], unique=False)
+    op.drop_index('ix_parking_spots_parking_id_number', table_name='parking_spots')
@@ -0,0 +1,60 @@
+"""foreign_key_indexes
+
+Revision ID: 8d41e6b0c2f5
+Revises: 3f9c2a7d1e64
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41e6b0c2f5'
+down_revision: Union[str, None] = '3f9c2a7d1e64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Index sur les clés primaires, redondants avec l'index de la clé primaire
+REDUNDANT_PK_INDEXES = [
+    ('ix_hotels_id', 'hotels'),
+    ('ix_spot_type_id', 'spot_type'),
+    ('ix_statuses_id', 'statuses'),
+    ('ix_parkings_id', 'parkings'),
+    ('ix_parking_spots_id', 'parking_spots'),
+]
+
+# Index des parcours hôtel → parking → emplacement et des recherches par statut/type.
+# parking_spots.parking_id est déjà couvert par ix_parking_spots_parking_id_number
+# (préfixe gauche de l'index unique) ; spot_statuses.spot_id et spot_types.spot_id
+# par le préfixe gauche de leur clé primaire.
+FOREIGN_KEY_INDEXES = [
+    ('ix_parkings_hotel_id', 'parkings', ['hotel_id']),
+    ('ix_spot_statuses_status_id', 'spot_statuses', ['status_id']),
+    ('ix_spot_types_type_id', 'spot_types', ['type_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Sous MySQL, l'index implicite créé pour une clé étrangère est supprimé
+    # automatiquement dès qu'un index explicite peut le remplacer
+    for name, table, columns in FOREIGN_KEY_INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+    for name, table in REDUNDANT_PK_INDEXES:
+        op.drop_index(name, table_name=table)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table in REDUNDANT_PK_INDEXES:
+        op.create_index(name, table, ['id'], unique=False)
+
+    # MySQL refuse de supprimer le seul index supportant une clé étrangère :
+    # ces index y sont conservés (ils remplacent l'index implicite d'origine)
+    if op.get_bind().dialect.name != 'mysql':
+        for name, table, _ in reversed(FOREIGN_KEY_INDEXES):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,128 @@
+"""spot_pictures_table
+
+Revision ID: c7e2a94f5b18
+Revises: 8d41e6b0c2f5
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2a94f5b18'
+down_revision: Union[str, None] = '8d41e6b0c2f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Lignes de spot_pictures insérées par requête
+BATCH_SIZE = 1000
+# Emplacements lus par page (colonne pictures potentiellement volumineuse)
+READ_BATCH_SIZE = 100
+
+parking_spots = sa.table(
+    'parking_spots',
+    sa.column('id', sa.Integer),
+    sa.column('pictures', sa.Text),
+)
+
+spot_pictures = sa.table(
+    'spot_pictures',
+    sa.column('spot_id', sa.Integer),
+    sa.column('position', sa.Integer),
+    sa.column('url', sa.Text),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'spot_pictures',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('spot_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('url', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['spot_id'], ['parking_spots.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_spot_pictures_spot_id', 'spot_pictures', ['spot_id'], unique=False)
+
+    # Déplacer les photos JSON de chaque emplacement vers spot_pictures, par pages de
+    # READ_BATCH_SIZE emplacements (id > dernier lu) : la colonne peut contenir des
+    # data-URLs volumineuses, elle n'est jamais lue en entier
+    bind = op.get_bind()
+    rows = []
+    last_id = 0
+    while True:
+        page = bind.execute(
+            sa.select(parking_spots.c.id, parking_spots.c.pictures)
+            .where(
+                parking_spots.c.id > last_id,
+                parking_spots.c.pictures.isnot(None),
+                parking_spots.c.pictures != '',
+            )
+            .order_by(parking_spots.c.id)
+            .limit(READ_BATCH_SIZE)
+        ).fetchall()
+        if not page:
+            break
+        last_id = page[-1][0]
+        for spot_id, pictures in page:
+            try:
+                urls = json.loads(pictures)
+            except ValueError:
+                urls = [pictures]
+            if not isinstance(urls, list):
+                urls = [urls]
+            rows.extend(
+                {'spot_id': spot_id, 'position': position, 'url': str(url)}
+                for position, url in enumerate(urls)
+            )
+            if len(rows) >= BATCH_SIZE:
+                bind.execute(spot_pictures.insert(), rows)
+                rows = []
+    if rows:
+        bind.execute(spot_pictures.insert(), rows)
+
+    with op.batch_alter_table('parking_spots') as batch_op:
+        batch_op.drop_column('pictures')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('parking_spots') as batch_op:
+        batch_op.add_column(sa.Column('pictures', sa.Text(), nullable=True))
+
+    # Regrouper les photos par pages d'emplacements (spot_id > dernier lu)
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        spot_ids = bind.execute(
+            sa.select(spot_pictures.c.spot_id)
+            .where(spot_pictures.c.spot_id > last_id)
+            .group_by(spot_pictures.c.spot_id)
+            .order_by(spot_pictures.c.spot_id)
+            .limit(READ_BATCH_SIZE)
+        ).scalars().all()
+        if not spot_ids:
+            break
+        last_id = spot_ids[-1]
+        pictures = {}
+        for spot_id, url in bind.execute(
+            sa.select(spot_pictures.c.spot_id, spot_pictures.c.url)
+            .where(spot_pictures.c.spot_id.in_(spot_ids))
+            .order_by(spot_pictures.c.spot_id, spot_pictures.c.position)
+        ):
+            pictures.setdefault(spot_id, []).append(url)
+        for spot_id, urls in pictures.items():
+            bind.execute(
+                parking_spots.update()
+                .where(parking_spots.c.id == spot_id)
+                .values(pictures=json.dumps(urls))
+            )
+
+    op.drop_index('ix_spot_pictures_spot_id', table_name='spot_pictures')
+    op.drop_table('spot_pictures')
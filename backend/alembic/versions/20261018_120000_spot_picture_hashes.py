@@ -0,0 +1,43 @@
+"""spot_picture_hashes
+
+Revision ID: 5a0d3e8c7b21
+Revises: c7e2a94f5b18
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a0d3e8c7b21'
+down_revision: Union[str, None] = 'c7e2a94f5b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Les photos existantes restent dans url ; `python -m scripts.store_pictures`
+    # déplace les data-URLs dans le stockage local et renseigne sha256
+    with op.batch_alter_table('spot_pictures') as batch_op:
+        batch_op.add_column(sa.Column('sha256', sa.String(length=64), nullable=True))
+        batch_op.alter_column('url', existing_type=sa.Text(), nullable=True)
+        batch_op.create_index('ix_spot_pictures_sha256', ['sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    # Les photos du stockage local n'ont pas d'URL : elles pointent vers /api/pictures/
+    bind.execute(sa.text(
+        "UPDATE spot_pictures SET url = " +
+        ("CONCAT('/api/pictures/', sha256)" if bind.dialect.name == 'mysql' else "'/api/pictures/' || sha256") +
+        " WHERE url IS NULL"
+    ))
+    with op.batch_alter_table('spot_pictures') as batch_op:
+        batch_op.drop_index('ix_spot_pictures_sha256')
+        batch_op.alter_column('url', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_column('sha256')
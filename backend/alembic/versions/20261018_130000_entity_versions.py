@@ -0,0 +1,35 @@
+"""entity_versions
+
+Revision ID: 3f9b1c7d2e40
+Revises: 5a0d3e8c7b21
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9b1c7d2e40'
+down_revision: Union[str, None] = '5a0d3e8c7b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Compteurs de version des hôtels et parkings (ETag des réponses GET)
+    with op.batch_alter_table('hotels') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    with op.batch_alter_table('parkings') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('parkings') as batch_op:
+        batch_op.drop_column('version')
+    with op.batch_alter_table('hotels') as batch_op:
+        batch_op.drop_column('version')
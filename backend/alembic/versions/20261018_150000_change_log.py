@@ -0,0 +1,46 @@
+"""change_log
+
+Revision ID: 6c1d8a3f5e27
+Revises: 3f9b1c7d2e40
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c1d8a3f5e27'
+down_revision: Union[str, None] = '3f9b1c7d2e40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Journal des modifications : synchronisation incrémentale (/api/changes) et diffusion
+    # des modifications d'emplacements (/api/stream)
+    op.create_table(
+        'change_log',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=16), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('op', sa.String(length=16), nullable=False),
+        sa.Column('hotel_id', sa.Integer(), nullable=False),
+        sa.Column('parking_id', sa.Integer(), nullable=True),
+        sa.Column('changes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_change_log_hotel_id_id', 'change_log', ['hotel_id', 'id'], unique=False)
+    op.create_index('ix_change_log_created_at', 'change_log', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_change_log_created_at', table_name='change_log')
+    op.drop_index('ix_change_log_hotel_id_id', table_name='change_log')
+    op.drop_table('change_log')
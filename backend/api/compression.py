@@ -0,0 +1,99 @@
+"""
+Compression négociée des réponses : brotli si le module est installé et que le client
+l'accepte, sinon gzip, au-delà d'une taille minimale. Les images (déjà compressées) et
+les flux d'événements ne sont pas compressés. Les autres réponses portent toujours
+Vary: Accept-Encoding, qu'elles soient compressées ou non, pour que les caches
+partagés ne servent pas une version gzip à un client qui ne l'accepte pas (ni l'inverse).
+"""
+from typing import Set
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle : gzip seul
+    brotli = None
+
+NOT_COMPRESSED_CONTENT_TYPES = ("image/", "text/event-stream")
+
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Encodages acceptés par le client (en-tête Accept-Encoding, q=0 exclus)"""
+    encodings = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, parameters = item.partition(";")
+        if parameters.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        encodings.add(name.strip())
+    return encodings
+
+
+def send_with_vary(send: Send) -> Send:
+    """Ajouter Vary: Accept-Encoding aux réponses compressibles, sauf s'il y est déjà"""
+    async def wrapper(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            compressible = (
+                "content-encoding" not in headers
+                and not headers.get("content-type", "").startswith(NOT_COMPRESSED_CONTENT_TYPES)
+            )
+            if compressible and "accept-encoding" not in headers.get("vary", "").lower():
+                headers.add_vary_header("Accept-Encoding")
+        await send(message)
+
+    return wrapper
+
+
+class _ExcludedTypesMixin:
+    """Laisser passer sans compression les types de contenu de NOT_COMPRESSED_CONTENT_TYPES"""
+
+    async def send_with_compression(self, message: Message) -> None:
+        await super().send_with_compression(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            if content_type.startswith(NOT_COMPRESSED_CONTENT_TYPES):
+                self.content_type_is_excluded = True
+
+
+class GzipResponder(_ExcludedTypesMixin, GZipResponder):
+    pass
+
+
+class BrotliResponder(_ExcludedTypesMixin, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int) -> None:
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        data = self.compressor.process(body)
+        # Pour une réponse en flux, chaque morceau est envoyé dès qu'il est compressé
+        return data + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+class CompressionMiddleware:
+    """Middleware de compression gzip / brotli selon Accept-Encoding"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encodings = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in encodings:
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif "gzip" in encodings:
+            responder = GzipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = self.app
+        # Le choix de l'encodage dépend d'Accept-Encoding, y compris quand rien n'est compressé
+        await responder(scope, receive, send_with_vary(send))
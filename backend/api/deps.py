@@ -1,11 +1,131 @@
 """
 Dépendances pour les endpoints FastAPI
 """
-from fastapi import Depends
+import functools
+import zlib
+from typing import Any, AsyncGenerator, Callable, Dict, Generator, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from database import get_db
+from app.schemas.parking import parse_fields, partial_page_schema, partial_schema
+from database import get_db, get_async_db
+
+# Dépendance à base de yield : FastAPI exécute le bloc finally de get_db
+# à la fin de la requête, ce qui rend toujours la connexion au pool
+def get_db_session() -> Generator[Session, None, None]:
+    yield from get_db()
+
+# Session asynchrone utilisée par les endpoints async
+async def get_async_db_session() -> AsyncGenerator[AsyncSession, None]:
+    async for db in get_async_db():
+        yield db
+
+@functools.lru_cache(maxsize=None)
+def _get_type_adapter(response_model: Any) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+async def run_service(
+    db: AsyncSession,
+    func: Callable[..., Any],
+    *args: Any,
+    response_model: Optional[Any] = None,
+) -> Any:
+    """
+    Exécuter une méthode de service synchrone sur une session asynchrone.
+
+    La sérialisation vers response_model est faite dans le même contexte que la requête,
+    afin que les relations chargées à la demande ne soient pas lues hors de la session.
+
+    run_sync n'utilise pas de thread : le code synchrone (hydratation des objets ORM,
+    validation vers response_model) s'exécute sur le thread de la boucle d'événements,
+    seules les attentes de la base lui sont rendues. Ce calcul bloque la boucle pendant
+    sa durée ; les traitements lourds (validation d'un lot d'import, enregistrement des
+    photos, calcul d'une affectation) sont faits à part dans un thread (asyncio.to_thread).
+    """
+    def call(session: Session) -> Any:
+        result = func(session, *args)
+        if response_model is None:
+            return result
+        return _get_type_adapter(response_model).validate_python(result, from_attributes=True)
+
+    return await db.run_sync(call)
+
+async def run_sparse_service(
+    db: AsyncSession,
+    func: Callable[..., Any],
+    *args: Any,
+    schema: Type[BaseModel],
+    fields: str,
+    page: bool = False,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Exécuter un service de liste limité aux champs demandés (?fields=) : la liste des
+    champs est passée en dernier argument au service et la réponse est sérialisée
+    directement avec le sous-schéma correspondant (liste, ou page si page=True)
+    """
+    try:
+        names = parse_fields(schema, fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    item_schema = partial_schema(schema, names)
+    response_model = partial_page_schema(item_schema) if page else List[item_schema]
+    data = await run_service(db, func, *args, names, response_model=response_model)
+    return Response(_get_type_adapter(response_model).dump_json(data), media_type="application/json", headers=headers)
+
+async def run_rows_service(
+    db: AsyncSession,
+    func: Callable[..., Any],
+    *args: Any,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Exécuter un service de lecture qui retourne des lignes déjà au format du schéma de
+    réponse (dictionnaires) : elles sont encodées directement par orjson, sans validation
+    par le response_model de la route
+    """
+    data = await db.run_sync(lambda session: func(session, *args))
+    return ORJSONResponse(data, headers=headers)
+
+def _opaque_tag(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Vérifier si l'en-tête If-None-Match de la requête contient l'ETag courant
+    (comparaison faible : W/"v" et "v" désignent la même version)
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque_tag(etag) in [_opaque_tag(tag) for tag in if_none_match.split(",")]
 
-# Export la fonction get_db pour qu'elle soit utilisable dans les endpoints
-def get_db_session():
-    return next(get_db())
\ No newline at end of file
+async def check_etag(
+    request: Request,
+    db: AsyncSession,
+    func: Callable[..., Optional[str]],
+    *args: Any,
+) -> Tuple[Optional[Response], Dict[str, str]]:
+    """
+    GET conditionnel : func retourne la version de la ressource (None si elle n'existe
+    pas), lue avant tout chargement. Retourne (réponse 304, en-têtes) si le client a
+    déjà cette version, sinon (None, en-têtes ETag à poser sur la réponse complète).
+    """
+    version = await db.run_sync(lambda session: func(session, *args))
+    if version is None:
+        return None, {}
+    # Chaque combinaison de paramètres de requête est une représentation distincte
+    if request.url.query:
+        version = f"{version}-{zlib.crc32(request.url.query.encode()):08x}"
+    # ETag faible : la même version est servie brute, en gzip ou en brotli (compression)
+    headers = {"ETag": f'W/"{version}"', "Cache-Control": "no-cache"}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers), headers
+    return None, headers
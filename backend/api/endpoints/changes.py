@@ -0,0 +1,29 @@
+"""
+Endpoint de synchronisation incrémentale (journal des modifications)
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.deps import get_async_db_session, run_rows_service
+from app.schemas.parking import ChangeSet
+from app.services.changes import CHANGES_PAGE_SIZE, ChangeService
+
+router = APIRouter()
+
+
+@router.get("/changes", response_model=ChangeSet, tags=["changes"])
+async def read_changes(
+    since: Optional[int] = Query(None, ge=0),
+    hotel_id: Optional[int] = None,
+    limit: int = Query(CHANGES_PAGE_SIZE, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    Récupérer les hôtels, parkings et emplacements modifiés depuis la position since
+    (optionnellement d'un seul hôtel), compactés par entité. Rappeler avec since=next
+    tant que has_more est vrai. Sans since : position courante, à garder avant un
+    chargement complet de l'inventaire. 410 si la position a été purgée du journal.
+    """
+    return await run_rows_service(db, ChangeService.get_changes, since, hotel_id, limit)
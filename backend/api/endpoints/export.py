@@ -0,0 +1,37 @@
+"""
+Endpoints d'export de l'inventaire
+"""
+from typing import Literal, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from app.services.export import ExportService
+
+router = APIRouter()
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+@router.get("/export/spots", tags=["export"])
+async def export_spots(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    hotel_id: Optional[int] = None,
+    parking_id: Optional[int] = None,
+):
+    """
+    Exporter tous les emplacements (optionnellement d'un hôtel ou d'un parking) en un
+    seul flux NDJSON ou CSV, avec leurs types et statuts
+    """
+    if format == "csv":
+        content = ExportService.export_csv(hotel_id, parking_id)
+    else:
+        content = ExportService.export_ndjson(hotel_id, parking_id)
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="spots.{format}"'},
+    )
@@ -0,0 +1,27 @@
+"""
+Endpoints d'import de l'inventaire
+"""
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.deps import get_async_db_session
+from app.schemas.parking import SpotImportResult
+from app.services.importer import ImportService
+
+router = APIRouter()
+
+
+@router.post("/import/spots", response_model=SpotImportResult, tags=["import"])
+async def import_spots(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: AsyncSession = Depends(get_async_db_session),
+):
+    """
+    Importer des emplacements envoyés comme corps brut de la requête (CSV ou NDJSON).
+    Les hôtels et parkings sont créés ou mis à jour par nom ; le fichier est traité par
+    lots au fil de la réception et les lignes invalides sont listées dans le bilan.
+    """
+    return await ImportService.import_stream(db, request.stream(), format)
@@ -1,11 +1,14 @@
 """
 Endpoints pour la gestion des hôtels, parkings et emplacements
 """
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import asyncio
+from typing import Annotated, List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.deps import get_db_session
+from api.deps import check_etag, get_async_db_session, run_rows_service, run_service, run_sparse_service
+from app.services.allocation import AllocationService
 from app.services.parking import (
     HotelService, ParkingService, ParkingSpotService,
     StatusService, SpotTypeService
@@ -13,235 +16,394 @@ from app.services.parking import (
 from app.schemas.parking import (
     HotelCreate, HotelUpdate, HotelInDB, HotelWithoutParkings,
     ParkingCreate, ParkingUpdate, ParkingInDB, ParkingWithoutSpots,
-    ParkingSpotCreate, ParkingSpotUpdate, ParkingSpotInDB,
-    StatusCreate, Status, SpotType
+    ParkingSpotCreate, ParkingSpotUpdate, ParkingSpotInDB, ParkingSpotDetail,
+    StatusCreate, Status, SpotType,
+    HotelPage, ParkingPage, ParkingSpotPage,
+    ParkingSpotBulkResult, SpotStatusBulkUpdate, SpotStatusBulkResult,
+    ParkingSpotSearch, HotelOccupancy, ParkingOccupancy,
+    AvailabilityQuery, AvailableSpot, AllocationRequest, AllocationResult
 )
 
-router = APIRouter()
+# Les réponses sont encodées par orjson plutôt que par le module json standard
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Pagination par curseur : passer cursor (vide pour la première page) pour recevoir
+# {"items": [...], "next_cursor": ...} ; sans curseur, skip/limit renvoie une liste
+CURSOR_DESCRIPTION = (
+    "Curseur opaque de pagination (chaîne vide pour la première page, puis next_cursor). "
+    "Si absent, la pagination skip/limit est utilisée."
+)
+
+# Champs partiels : seuls ces champs (et l'ID) sont lus en base et renvoyés
+FIELDS_DESCRIPTION = "Liste de champs à renvoyer, séparés par des virgules (ex. id,number,floor,statuses)"
 
 # Endpoints pour les hôtels
-@router.get("/hotels/", response_model=List[HotelWithoutParkings], tags=["hotels"])
-def read_hotels(
+@router.get("/hotels/", response_model=Union[List[HotelWithoutParkings], HotelPage], tags=["hotels"])
+async def read_hotels(
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db_session)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Récupérer tous les hôtels
     """
-    return HotelService.get_all_hotels(db, skip, limit)
+    if cursor is not None:
+        if fields is not None:
+            return await run_sparse_service(db, HotelService.get_hotels_page, cursor, limit, schema=HotelWithoutParkings, fields=fields, page=True)
+        return await run_service(db, HotelService.get_hotels_page, cursor, limit, response_model=HotelPage)
+    if fields is not None:
+        return await run_sparse_service(db, HotelService.get_all_hotels, skip, limit, schema=HotelWithoutParkings, fields=fields)
+    return await run_service(db, HotelService.get_all_hotels, skip, limit, response_model=List[HotelWithoutParkings])
 
 @router.get("/hotels/{hotel_id}", response_model=HotelInDB, tags=["hotels"])
-def read_hotel(
+async def read_hotel(
     hotel_id: int,
-    db: Session = Depends(get_db_session)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Récupérer les détails d'un hôtel par son ID
+    (ETag et réponse 304 si If-None-Match contient la version courante)
     """
-    return HotelService.get_hotel_by_id(db, hotel_id)
+    not_modified, headers = await check_etag(request, db, HotelService.get_hotel_version, hotel_id)
+    if not_modified is not None:
+        return not_modified
+    response.headers.update(headers)
+    return await run_service(db, HotelService.get_hotel_by_id, hotel_id, response_model=HotelInDB)
+
+@router.get("/hotels/{hotel_id}/occupancy", response_model=HotelOccupancy, tags=["hotels"])
+async def read_hotel_occupancy(
+    hotel_id: int,
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    Récupérer l'occupation d'un hôtel : nombre d'emplacements par statut et par type,
+    au total et pour chaque parking
+    """
+    return await run_service(db, HotelService.get_hotel_occupancy, hotel_id, response_model=HotelOccupancy)
+
+@router.post("/hotels/{hotel_id}/allocations", response_model=AllocationResult, tags=["hotels"])
+async def allocate_arrivals(
+    hotel_id: int,
+    request: AllocationRequest,
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    Affecter les emplacements libres de l'hôtel aux arrivées (dimensions du véhicule,
+    besoin PMR, recharge électrique) en minimisant la surface perdue ou le tarif.
+    Avec apply, le statut arrival_today est posé sur les emplacements affectés
+    dans une seule transaction.
+    """
+    return await AllocationService.allocate_arrivals(db, hotel_id, request)
 
 @router.post("/hotels/", response_model=HotelInDB, status_code=201, tags=["hotels"])
-def create_hotel(
+async def create_hotel(
     hotel: HotelCreate,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Créer un nouvel hôtel
     """
-    return HotelService.create_hotel(db, hotel)
+    return await run_service(db, HotelService.create_hotel, hotel, response_model=HotelInDB)
 
 @router.put("/hotels/{hotel_id}", response_model=HotelInDB, tags=["hotels"])
-def update_hotel(
+async def update_hotel(
     hotel_id: int,
     hotel: HotelUpdate,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Mettre à jour un hôtel
     """
-    return HotelService.update_hotel(db, hotel_id, hotel)
+    return await run_service(db, HotelService.update_hotel, hotel_id, hotel, response_model=HotelInDB)
 
 @router.delete("/hotels/{hotel_id}", tags=["hotels"])
-def delete_hotel(
+async def delete_hotel(
     hotel_id: int,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Supprimer un hôtel
     """
-    return HotelService.delete_hotel(db, hotel_id)
+    return await run_service(db, HotelService.delete_hotel, hotel_id)
 
 # Endpoints pour les parkings
-@router.get("/parkings/", response_model=List[ParkingWithoutSpots], tags=["parkings"])
-def read_parkings(
+@router.get("/parkings/", response_model=Union[List[ParkingWithoutSpots], ParkingPage], tags=["parkings"])
+async def read_parkings(
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db_session)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Récupérer tous les parkings
     """
-    return ParkingService.get_all_parkings(db, None, skip, limit)
+    if cursor is not None:
+        if fields is not None:
+            return await run_sparse_service(db, ParkingService.get_parkings_page, None, cursor, limit, schema=ParkingWithoutSpots, fields=fields, page=True)
+        return await run_service(db, ParkingService.get_parkings_page, None, cursor, limit, response_model=ParkingPage)
+    if fields is not None:
+        return await run_sparse_service(db, ParkingService.get_all_parkings, None, skip, limit, schema=ParkingWithoutSpots, fields=fields)
+    return await run_service(db, ParkingService.get_all_parkings, None, skip, limit, response_model=List[ParkingWithoutSpots])
 
-@router.get("/hotels/{hotel_id}/parkings/", response_model=List[ParkingWithoutSpots], tags=["parkings"])
-def read_hotel_parkings(
+@router.get("/hotels/{hotel_id}/parkings/", response_model=Union[List[ParkingWithoutSpots], ParkingPage], tags=["parkings"])
+async def read_hotel_parkings(
     hotel_id: int,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db_session)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Récupérer tous les parkings d'un hôtel spécifique
     """
-    return ParkingService.get_all_parkings(db, hotel_id, skip, limit)
+    if cursor is not None:
+        if fields is not None:
+            return await run_sparse_service(db, ParkingService.get_parkings_page, hotel_id, cursor, limit, schema=ParkingWithoutSpots, fields=fields, page=True)
+        return await run_service(db, ParkingService.get_parkings_page, hotel_id, cursor, limit, response_model=ParkingPage)
+    if fields is not None:
+        return await run_sparse_service(db, ParkingService.get_all_parkings, hotel_id, skip, limit, schema=ParkingWithoutSpots, fields=fields)
+    return await run_service(db, ParkingService.get_all_parkings, hotel_id, skip, limit, response_model=List[ParkingWithoutSpots])
 
 @router.get("/parkings/{parking_id}", response_model=ParkingInDB, tags=["parkings"])
-def read_parking(
+async def read_parking(
     parking_id: int,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Récupérer les détails d'un parking par son ID
     """
-    return ParkingService.get_parking_by_id(db, parking_id)
+    return await run_service(db, ParkingService.get_parking_by_id, parking_id, response_model=ParkingInDB)
+
+@router.get("/parkings/{parking_id}/occupancy", response_model=ParkingOccupancy, tags=["parkings"])
+async def read_parking_occupancy(
+    parking_id: int,
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    Récupérer l'occupation d'un parking : nombre d'emplacements par statut et par type
+    """
+    return await run_service(db, ParkingService.get_parking_occupancy, parking_id, response_model=ParkingOccupancy)
 
 @router.post("/hotels/{hotel_id}/parkings/", response_model=ParkingInDB, status_code=201, tags=["parkings"])
-def create_parking(
+async def create_parking(
     hotel_id: int,
     parking: ParkingCreate,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Créer un nouveau parking dans un hôtel
     """
-    return ParkingService.create_parking(db, parking, hotel_id)
+    return await run_service(db, ParkingService.create_parking, parking, hotel_id, response_model=ParkingInDB)
 
 @router.put("/parkings/{parking_id}", response_model=ParkingInDB, tags=["parkings"])
-def update_parking(
+async def update_parking(
     parking_id: int,
     parking: ParkingUpdate,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Mettre à jour un parking
     """
-    return ParkingService.update_parking(db, parking_id, parking)
+    return await run_service(db, ParkingService.update_parking, parking_id, parking, response_model=ParkingInDB)
 
 @router.delete("/parkings/{parking_id}", tags=["parkings"])
-def delete_parking(
+async def delete_parking(
     parking_id: int,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Supprimer un parking
     """
-    return ParkingService.delete_parking(db, parking_id)
+    return await run_service(db, ParkingService.delete_parking, parking_id)
 
 # Endpoints pour les emplacements de parking
-@router.get("/spots/", response_model=List[ParkingSpotInDB], tags=["spots"])
-def read_spots(
+@router.get("/spots/", response_model=Union[List[ParkingSpotInDB], ParkingSpotPage], tags=["spots"])
+async def read_spots(
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db_session)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Récupérer tous les emplacements
     """
-    return ParkingSpotService.get_all_spots(db, None, skip, limit)
+    if cursor is not None:
+        if fields is not None:
+            return await run_sparse_service(db, ParkingSpotService.get_spots_page, None, cursor, limit, schema=ParkingSpotInDB, fields=fields, page=True)
+        return await run_rows_service(db, ParkingSpotService.get_spot_rows_page, None, cursor, limit)
+    if fields is not None:
+        return await run_sparse_service(db, ParkingSpotService.get_all_spots, None, skip, limit, schema=ParkingSpotInDB, fields=fields)
+    return await run_rows_service(db, ParkingSpotService.get_spot_rows, None, skip, limit)
 
-@router.get("/parkings/{parking_id}/spots/", response_model=List[ParkingSpotInDB], tags=["spots"])
-def read_parking_spots(
+@router.get("/parkings/{parking_id}/spots/", response_model=Union[List[ParkingSpotInDB], ParkingSpotPage], tags=["spots"])
+async def read_parking_spots(
     parking_id: int,
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db_session)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Récupérer tous les emplacements d'un parking spécifique
+    (ETag et réponse 304 si If-None-Match contient la version courante)
+    """
+    not_modified, headers = await check_etag(request, db, ParkingSpotService.get_parking_spots_version, parking_id)
+    if not_modified is not None:
+        return not_modified
+    if cursor is not None:
+        if fields is not None:
+            return await run_sparse_service(db, ParkingSpotService.get_spots_page, parking_id, cursor, limit, schema=ParkingSpotInDB, fields=fields, page=True, headers=headers)
+        return await run_rows_service(db, ParkingSpotService.get_spot_rows_page, parking_id, cursor, limit, headers=headers)
+    if fields is not None:
+        return await run_sparse_service(db, ParkingSpotService.get_all_spots, parking_id, skip, limit, schema=ParkingSpotInDB, fields=fields, headers=headers)
+    return await run_rows_service(db, ParkingSpotService.get_spot_rows, parking_id, skip, limit, headers=headers)
+
+@router.get("/spots/search", response_model=ParkingSpotPage, tags=["spots"])
+async def search_spots(
+    filters: Annotated[ParkingSpotSearch, Query()],
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    Rechercher des emplacements (hôtel, parking, étage, section, types, statuts,
+    équipement, dimensions minimales, fourchettes de prix), avec tri et pagination
+    par curseur (paramètre cursor = next_cursor de la page précédente)
     """
-    return ParkingSpotService.get_all_spots(db, parking_id, skip, limit)
+    return await run_service(db, ParkingSpotService.search_spots, filters, response_model=ParkingSpotPage)
 
-@router.get("/spots/{spot_id}", response_model=ParkingSpotInDB, tags=["spots"])
-def read_spot(
+@router.get("/spots/available", response_model=List[AvailableSpot], tags=["spots"])
+async def find_available_spots(filters: Annotated[AvailabilityQuery, Query()]):
+    """
+    Trouver des emplacements libres (sans statut, ou sans aucun des busy_statuses)
+    ayant les types, l'équipement et les dimensions minimales demandés.
+    La réponse vient de l'index de disponibilité en mémoire, sans accès à la base.
+    """
+    return ParkingSpotService.find_available_spots(filters)
+
+@router.get("/spots/{spot_id}", response_model=ParkingSpotDetail, tags=["spots"])
+async def read_spot(
     spot_id: int,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Récupérer les détails d'un emplacement par son ID
     """
-    return ParkingSpotService.get_spot_by_id(db, spot_id)
+    return await run_service(db, ParkingSpotService.get_spot_by_id, spot_id, response_model=ParkingSpotDetail)
 
-@router.post("/parkings/{parking_id}/spots/", response_model=ParkingSpotInDB, status_code=201, tags=["spots"])
-def create_spot(
+@router.post("/parkings/{parking_id}/spots/", response_model=ParkingSpotDetail, status_code=201, tags=["spots"])
+async def create_spot(
     parking_id: int,
     spot: ParkingSpotCreate,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Créer un nouvel emplacement dans un parking
     """
-    return ParkingSpotService.create_spot(db, spot, parking_id)
+    # Photos enregistrées dans un thread : décodage, SHA-256 et écriture hors de la boucle
+    spot = await asyncio.to_thread(ParkingSpotService.store_pictures, spot)
+    return await run_service(db, ParkingSpotService.create_spot, spot, parking_id, response_model=ParkingSpotDetail)
+
+@router.post("/parkings/{parking_id}/spots/bulk", response_model=ParkingSpotBulkResult, tags=["spots"])
+async def bulk_create_spots(
+    parking_id: int,
+    spots: List[ParkingSpotCreate],
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    Créer plusieurs emplacements dans un parking en une seule transaction
+    """
+    spots, picture_errors = await asyncio.to_thread(ParkingSpotService.store_bulk_pictures, spots)
+    return await run_service(
+        db, ParkingSpotService.bulk_create_spots, spots, parking_id, picture_errors,
+        response_model=ParkingSpotBulkResult
+    )
 
-@router.put("/spots/{spot_id}", response_model=ParkingSpotInDB, tags=["spots"])
-def update_spot(
+@router.put("/spots/{spot_id}", response_model=ParkingSpotDetail, tags=["spots"])
+async def update_spot(
     spot_id: int,
     spot: ParkingSpotUpdate,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Mettre à jour un emplacement
     """
-    return ParkingSpotService.update_spot(db, spot_id, spot)
+    spot = await asyncio.to_thread(ParkingSpotService.store_pictures, spot)
+    return await run_service(db, ParkingSpotService.update_spot, spot_id, spot, response_model=ParkingSpotDetail)
 
 @router.delete("/spots/{spot_id}", tags=["spots"])
-def delete_spot(
+async def delete_spot(
     spot_id: int,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Supprimer un emplacement
     """
-    return ParkingSpotService.delete_spot(db, spot_id)
+    return await run_service(db, ParkingSpotService.delete_spot, spot_id)
 
 # Endpoints pour les statuts des emplacements
 @router.get("/statuses/", response_model=List[Status], tags=["statuses"])
-def get_all_statuses(
-    db: Session = Depends(get_db_session)
+async def get_all_statuses(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Récupérer tous les statuts disponibles
+    (ETag et réponse 304 si If-None-Match contient la version courante)
     """
-    return StatusService.get_all_statuses(db)
+    not_modified, headers = await check_etag(request, db, StatusService.get_statuses_version)
+    if not_modified is not None:
+        return not_modified
+    response.headers.update(headers)
+    return await run_service(db, StatusService.get_all_statuses, response_model=List[Status])
 
 @router.post("/spots/{spot_id}/statuses/", response_model=ParkingSpotInDB, tags=["statuses"])
-def add_status_to_spot(
+async def add_status_to_spot(
     spot_id: int,
     status: StatusCreate,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Ajouter un statut à un emplacement
     """
-    return ParkingSpotService.add_status_to_spot(db, spot_id, status)
+    return await run_service(db, ParkingSpotService.add_status_to_spot, spot_id, status, response_model=ParkingSpotInDB)
+
+@router.post("/spots/statuses/bulk", response_model=SpotStatusBulkResult, tags=["statuses"])
+async def bulk_update_statuses(
+    bulk: SpotStatusBulkUpdate,
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    Ajouter, retirer ou remplacer des statuts sur plusieurs emplacements
+    (liste d'IDs et/ou tous les emplacements d'un parking ou d'un hôtel)
+    """
+    return await run_service(db, ParkingSpotService.bulk_update_statuses, bulk, response_model=SpotStatusBulkResult)
 
 @router.delete("/spots/{spot_id}/statuses/{status_id}", response_model=ParkingSpotInDB, tags=["statuses"])
-def remove_status_from_spot(
+async def remove_status_from_spot(
     spot_id: int,
     status_id: int,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Retirer un statut d'un emplacement
     """
-    return ParkingSpotService.remove_status_from_spot(db, spot_id, status_id)
+    return await run_service(db, ParkingSpotService.remove_status_from_spot, spot_id, status_id, response_model=ParkingSpotInDB)
 
 # Endpoints pour les types d'emplacement
 @router.get("/types/", response_model=List[SpotType], tags=["types"])
-def get_all_types(
-    db: Session = Depends(get_db_session)
+async def get_all_types(
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Récupérer tous les types d'emplacement disponibles
     """
-    return SpotTypeService.get_all_types(db)
\ No newline at end of file
+    return await run_service(db, SpotTypeService.get_all_types, response_model=List[SpotType])
\ No newline at end of file
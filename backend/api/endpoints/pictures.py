@@ -0,0 +1,84 @@
+"""
+Endpoints du stockage local des photos (envoi en flux, service avec cache immuable)
+"""
+from pathlib import Path
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+
+from api.deps import etag_matches
+from app.repositories.picture_store import (
+    EmptyPictureError, PictureTooLargeError, UnsupportedPictureError, is_picture_hash, picture_store
+)
+from app.schemas.parking import PictureUploadResult, PICTURE_URL_PREFIX
+
+router = APIRouter()
+
+# Un fichier adressé par son SHA-256 ne change jamais
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _file_response(request: Request, path: Path, etag: str, media_type: str) -> Response:
+    """Servir un fichier immuable (ETag, If-None-Match → 304, requêtes Range)"""
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+def _check_hash(sha256: str) -> None:
+    if not is_picture_hash(sha256) or not picture_store.exists(sha256):
+        raise HTTPException(status_code=404, detail=f"Photo {sha256} non trouvée")
+
+
+@router.post("/pictures/", response_model=PictureUploadResult, status_code=201, tags=["pictures"])
+async def upload_picture(request: Request):
+    """
+    Enregistrer une photo envoyée comme corps brut de la requête (Content-Type: image/*).
+    Le fichier est écrit au fil de l'eau sous le SHA-256 de son contenu (un fichier déjà
+    présent n'est pas dupliqué) et sa miniature est générée dans un pool de processus.
+    Seuls les fichiers JPEG, PNG, GIF et WebP sont acceptés (415 sinon, d'après l'en-tête
+    puis les premiers octets). Le SHA-256 retourné est à indiquer dans les photos de
+    l'emplacement.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type and content_type != "application/octet-stream" and not content_type.startswith("image/"):
+        raise HTTPException(status_code=415, detail=f"Type de contenu {content_type} refusé : image/* attendu")
+    try:
+        sha256, size, created = await picture_store.save_stream(request.stream())
+    except PictureTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except EmptyPictureError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except UnsupportedPictureError as exc:
+        raise HTTPException(status_code=415, detail=str(exc))
+
+    thumbnail = await picture_store.create_thumbnail(sha256)
+    url = f"{PICTURE_URL_PREFIX}{sha256}"
+    return {
+        "sha256": sha256,
+        "size": size,
+        "created": created,
+        "url": url,
+        "thumbnail_url": f"{url}/thumbnail" if thumbnail else None,
+    }
+
+
+@router.get("/pictures/{sha256}", tags=["pictures"])
+async def read_picture(sha256: str, request: Request):
+    """
+    Récupérer une photo (ETag = SHA-256, cache immuable, requêtes Range acceptées)
+    """
+    _check_hash(sha256)
+    return _file_response(request, picture_store.path(sha256), f'"{sha256}"', picture_store.content_type(sha256))
+
+
+@router.get("/pictures/{sha256}/thumbnail", tags=["pictures"])
+async def read_picture_thumbnail(sha256: str, request: Request):
+    """
+    Récupérer la miniature JPEG d'une photo (générée à la demande si absente)
+    """
+    _check_hash(sha256)
+    if not picture_store.thumbnail_path(sha256).is_file() and not await picture_store.create_thumbnail(sha256):
+        raise HTTPException(status_code=404, detail=f"Miniature de la photo {sha256} indisponible")
+    return _file_response(request, picture_store.thumbnail_path(sha256), f'"{sha256}-thumbnail"', "image/jpeg")
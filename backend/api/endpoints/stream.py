@@ -0,0 +1,111 @@
+"""
+Flux temps réel des modifications d'emplacements d'un parking (WebSocket et SSE)
+
+Chaque message est un objet JSON compact : {"seq", "parking_id", "op", ...} avec
+op = create (changes : emplacement complet), update (changes : champs modifiés), delete,
+status (changes : statuts ajoutés, retirés ou remplacés sur spot_ids), resync (client
+trop lent : recharger les emplacements du parking) ou deleted (le parking ou son hôtel a
+été supprimé : dernier message, le flux est ensuite fermé). seq est la position dans le
+journal des modifications, utilisable avec /api/changes?since= après une reconnexion.
+"""
+import asyncio
+import json
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.repositories.parking import ParkingRepository
+from app.repositories.spot_events import spot_event_hub
+from config import settings
+from database import AsyncSessionLocal
+
+router = APIRouter()
+
+
+async def _parking_state(parking_id: int) -> Optional[Tuple[int, int]]:
+    """Version courante et hôtel du parking (None s'il n'existe pas), sans garder de connexion"""
+    async with AsyncSessionLocal() as db:
+        return await db.run_sync(ParkingRepository.get_version_and_hotel_id, parking_id)
+
+
+def _hello(parking_id: int, version: int) -> str:
+    return json.dumps({"op": "subscribed", "parking_id": parking_id, "version": version})
+
+
+@router.websocket("/stream/parkings/{parking_id}")
+async def stream_parking_websocket(websocket: WebSocket, parking_id: int):
+    """
+    Recevoir par WebSocket les modifications des emplacements d'un parking
+    """
+    state = await _parking_state(parking_id)
+    if state is None:
+        await websocket.close(code=4404, reason=f"Parking avec l'ID {parking_id} non trouvé")
+        return
+    version, hotel_id = state
+    await websocket.accept()
+    subscription = spot_event_hub.subscribe(parking_id, hotel_id)
+    receive = asyncio.ensure_future(websocket.receive())
+    message = asyncio.ensure_future(subscription.get())
+    try:
+        await websocket.send_text(_hello(parking_id, version))
+        while True:
+            done, _ = await asyncio.wait({message, receive}, return_when=asyncio.FIRST_COMPLETED)
+            # Un message déjà retiré de la file est envoyé avant de traiter le client
+            if message in done:
+                await websocket.send_text(message.result())
+                if subscription.finished:
+                    await websocket.close(reason=f"Parking {parking_id} supprimé")
+                    break
+                message = asyncio.ensure_future(subscription.get())
+            if receive in done:
+                # Les messages du client sont ignorés ; seule la déconnexion compte
+                if receive.result()["type"] == "websocket.disconnect":
+                    break
+                receive = asyncio.ensure_future(websocket.receive())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receive.cancel()
+        message.cancel()
+        spot_event_hub.unsubscribe(subscription)
+
+
+async def _sse_events(parking_id: int, hotel_id: int, version: int) -> AsyncIterator[str]:
+    subscription = spot_event_hub.subscribe(parking_id, hotel_id)
+    try:
+        yield f"event: subscribed\ndata: {_hello(parking_id, version)}\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.get(), settings.STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # Commentaire périodique : maintient la connexion ouverte derrière les proxys
+                yield ": heartbeat\n\n"
+                continue
+            if message.startswith('{"seq":'):
+                seq = message[7:message.index(",")]
+                yield f"id: {seq}\ndata: {message}\n\n"
+            else:
+                yield f"data: {message}\n\n"
+            if subscription.finished:
+                # Parking supprimé : fin de la réponse après le dernier message
+                return
+    finally:
+        spot_event_hub.unsubscribe(subscription)
+
+
+@router.get("/stream/parkings/{parking_id}", tags=["parkings"])
+async def stream_parking_sse(parking_id: int):
+    """
+    Recevoir en Server-Sent Events (text/event-stream) les modifications des emplacements
+    d'un parking
+    """
+    state = await _parking_state(parking_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Parking avec l'ID {parking_id} non trouvé")
+    version, hotel_id = state
+    return StreamingResponse(
+        _sse_events(parking_id, hotel_id, version),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,9 +1,10 @@
 """
 Modèle SQLAlchemy restructuré pour la hiérarchie Hôtels → Parkings → Emplacements
 """
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Text, Table
-from sqlalchemy.orm import relationship
-import json
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Table, Index, func, select
+from sqlalchemy.orm import column_property, relationship
 
 from database import Base
 
@@ -12,7 +13,7 @@ spot_types = Table(
     "spot_types",
     Base.metadata,
     Column("spot_id", Integer, ForeignKey("parking_spots.id"), primary_key=True),
-    Column("type_id", Integer, ForeignKey("spot_type.id"), primary_key=True)
+    Column("type_id", Integer, ForeignKey("spot_type.id"), primary_key=True, index=True)
 )
 
 # Table d'association pour les statuts d'emplacement
@@ -20,16 +21,18 @@ spot_statuses = Table(
     "spot_statuses",
     Base.metadata,
     Column("spot_id", Integer, ForeignKey("parking_spots.id"), primary_key=True),
-    Column("status_id", Integer, ForeignKey("statuses.id"), primary_key=True)
+    Column("status_id", Integer, ForeignKey("statuses.id"), primary_key=True, index=True)
 )
 
 class Hotel(Base):
     """Modèle pour les hôtels"""
     __tablename__ = "hotels"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(255), unique=True, index=True)
     address = Column(String(255))
+    # Incrémentée à chaque écriture dans l'hôtel, ses parkings ou leurs emplacements (ETag)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Relation avec les parkings
     parkings = relationship("Parking", back_populates="hotel", cascade="all, delete-orphan")
@@ -38,12 +41,14 @@ class Parking(Base):
     """Modèle pour les parkings (zones de stationnement)"""
     __tablename__ = "parkings"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(255), index=True)
-    hotel_id = Column(Integer, ForeignKey("hotels.id"))
+    hotel_id = Column(Integer, ForeignKey("hotels.id"), index=True)
     description = Column(String(255), nullable=True)
     location = Column(String(255), nullable=True)  # Ex: "Souterrain", "Extérieur", etc.
     total_capacity = Column(Integer, default=0)
+    # Incrémentée à chaque écriture dans le parking ou ses emplacements (ETag)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Relations
     hotel = relationship("Hotel", back_populates="parkings")
@@ -53,7 +58,7 @@ class Status(Base):
     """Modèle pour les statuts possibles des emplacements"""
     __tablename__ = "statuses"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     value = Column(String(255), unique=True, index=True)
     color = Column(String(50))
     
@@ -64,11 +69,27 @@ class Status(Base):
         back_populates="statuses"
     )
 
+class SpotPicture(Base):
+    """Photo d'un emplacement, hors de la ligne de l'emplacement"""
+    __tablename__ = "spot_pictures"
+
+    id = Column(Integer, primary_key=True)
+    spot_id = Column(Integer, ForeignKey("parking_spots.id"), nullable=False, index=True)
+    position = Column(Integer, nullable=False, default=0)
+    # SHA-256 du fichier dans le stockage local des photos
+    sha256 = Column(String(64), nullable=True, index=True)
+    # URL externe (photos antérieures au stockage local)
+    url = Column(Text, nullable=True)
+
 class ParkingSpot(Base):
     """Modèle pour les emplacements individuels de stationnement"""
     __tablename__ = "parking_spots"
+    __table_args__ = (
+        # Un numéro d'emplacement est unique au sein d'un parking
+        Index("ix_parking_spots_parking_id_number", "parking_id", "number", unique=True),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     number = Column(Integer, index=True)
     parking_id = Column(Integer, ForeignKey("parkings.id"))
     
@@ -93,8 +114,18 @@ class ParkingSpot(Base):
     daily_rate = Column(Float)
     monthly_rate = Column(Float)
     
-    # Photos (stockées en JSON sous forme de texte pour MySQL)
-    pictures = Column(Text)
+    # Photos (table spot_pictures, chargées uniquement pour le détail d'un emplacement)
+    pictures = relationship(
+        "SpotPicture",
+        order_by=SpotPicture.position,
+        cascade="all, delete-orphan"
+    )
+    picture_count = column_property(
+        select(func.count(SpotPicture.id))
+        .where(SpotPicture.spot_id == id)
+        .correlate_except(SpotPicture)
+        .scalar_subquery()
+    )
     
     # Relations
     parking = relationship("Parking", back_populates="spots")
@@ -108,23 +139,12 @@ class ParkingSpot(Base):
         secondary=spot_statuses,
         back_populates="spots"
     )
-    
-    # Méthodes pour la gestion des images JSON
-    @property
-    def pictures_list(self):
-        if self.pictures:
-            return json.loads(self.pictures)
-        return []
-    
-    @pictures_list.setter
-    def pictures_list(self, value):
-        self.pictures = json.dumps(value)
 
 class SpotType(Base):
     """Modèle pour les types d'emplacement"""
     __tablename__ = "spot_type"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     value = Column(String(255), unique=True, index=True)
     
     # Relation avec les emplacements
@@ -132,4 +152,29 @@ class SpotType(Base):
         "ParkingSpot",
         secondary=spot_types,
         back_populates="types"
-    )
\ No newline at end of file
+    )
+
+class ChangeLogEntry(Base):
+    """
+    Modification d'un hôtel, d'un parking ou d'un emplacement, écrite dans la transaction
+    de l'écriture. L'ID est la position de synchronisation (/api/changes?since=) et de
+    diffusion (/api/stream).
+    """
+    __tablename__ = "change_log"
+    # Les IDs servent de position de lecture : SQLite ne doit pas réutiliser ceux des lignes purgées
+    __table_args__ = (
+        Index("ix_change_log_hotel_id_id", "hotel_id", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    entity = Column(String(16), nullable=False)  # hotel, parking, spot
+    # Pas de clés étrangères : la ligne survit à la suppression de l'entité
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String(16), nullable=False)  # create, update, delete, status
+    hotel_id = Column(Integer, nullable=False)
+    parking_id = Column(Integer, nullable=True)
+    # Champs modifiés (état complet pour create, statuts ajoutés/retirés pour status) en JSON
+    changes = Column(Text, nullable=True)
+    # Date UTC fixée par l'application (indépendante du fuseau du serveur de base)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
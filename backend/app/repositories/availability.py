@@ -0,0 +1,344 @@
+"""
+Index mémoire (par processus) de la disponibilité des emplacements
+
+Pour chaque parking, les emplacements occupent une position dans des tableaux
+compacts (array) de dimensions ; équipements, types et statuts sont des bitmaps
+(entiers Python dont le bit i correspond à la position i). Une recherche combine
+les bitmaps par ET/OU puis ne vérifie les dimensions que sur les candidats restants,
+sans requête SQL.
+
+L'index est construit au démarrage puis tenu à jour par les méthodes d'écriture
+des repositories. Les écritures faites par les autres workers ne sont visibles
+qu'après la reconstruction périodique (AVAILABILITY_INDEX_REFRESH).
+"""
+import math
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.parking import Parking, ParkingSpot, Status, SpotType, spot_statuses, spot_types
+
+EQUIPMENT_FLAGS = ("electric_charging", "camera", "sensor")
+
+# Colonnes de ParkingSpot conservées dans l'index
+SPOT_COLUMNS = (
+    ParkingSpot.id, ParkingSpot.parking_id, ParkingSpot.number,
+    ParkingSpot.floor, ParkingSpot.section,
+    ParkingSpot.length, ParkingSpot.width, ParkingSpot.height,
+    ParkingSpot.electric_charging, ParkingSpot.camera, ParkingSpot.sensor,
+)
+
+
+def _dimension(value: Optional[float]) -> float:
+    # Dimension non renseignée (place extérieure, sans hauteur limite) : pas de limite,
+    # comme pour l'affectation des arrivées (app.services.allocation)
+    return math.inf if value is None else float(value)
+
+
+def _recorded(value: float) -> Optional[float]:
+    """Dimension telle qu'enregistrée (None si non renseignée)"""
+    return None if value == math.inf else value
+
+
+class ParkingAvailability:
+    """Index des emplacements d'un parking"""
+
+    def __init__(self, parking_id: int, hotel_id: Optional[int]):
+        self.parking_id = parking_id
+        self.hotel_id = hotel_id
+        self.spot_ids = array("q")
+        self.numbers = array("q")
+        self.floors = array("q")
+        self.lengths = array("d")
+        self.widths = array("d")
+        self.heights = array("d")
+        self.sections: List[Optional[str]] = []
+        self.positions: Dict[int, int] = {}
+        self.alive = 0
+        self.flags: Dict[str, int] = {flag: 0 for flag in EQUIPMENT_FLAGS}
+        self.types: Dict[str, int] = {}
+        self.statuses: Dict[str, int] = {}
+
+    def upsert(self, row: Dict[str, Any], types: Iterable[str], statuses: Iterable[str]) -> None:
+        """Ajouter ou remplacer un emplacement"""
+        position = self.positions.get(row["id"])
+        if position is None:
+            position = len(self.spot_ids)
+            self.positions[row["id"]] = position
+            self.spot_ids.append(row["id"])
+            self.numbers.append(row["number"] or 0)
+            self.floors.append(row["floor"] or 0)
+            self.lengths.append(_dimension(row["length"]))
+            self.widths.append(_dimension(row["width"]))
+            self.heights.append(_dimension(row["height"]))
+            self.sections.append(row["section"])
+        else:
+            self.numbers[position] = row["number"] or 0
+            self.floors[position] = row["floor"] or 0
+            self.lengths[position] = _dimension(row["length"])
+            self.widths[position] = _dimension(row["width"])
+            self.heights[position] = _dimension(row["height"])
+            self.sections[position] = row["section"]
+
+        bit = 1 << position
+        self.alive |= bit
+        for flag in EQUIPMENT_FLAGS:
+            if row[flag]:
+                self.flags[flag] |= bit
+            else:
+                self.flags[flag] &= ~bit
+        self._set_members(self.types, bit, types)
+        self._set_members(self.statuses, bit, statuses)
+
+    @staticmethod
+    def _set_members(bitmaps: Dict[str, int], bit: int, values: Iterable[str]) -> None:
+        values = set(values)
+        for value in list(bitmaps):
+            if value not in values:
+                bitmaps[value] &= ~bit
+        for value in values:
+            bitmaps[value] = bitmaps.get(value, 0) | bit
+
+    def remove(self, spot_id: int) -> None:
+        """Retirer un emplacement (sa position reste libre jusqu'au compactage)"""
+        position = self.positions.pop(spot_id, None)
+        if position is None:
+            return
+        mask = ~(1 << position)
+        self.alive &= mask
+        for bitmaps in (self.flags, self.types, self.statuses):
+            for key in bitmaps:
+                bitmaps[key] &= mask
+        if len(self.spot_ids) > 64 and len(self.positions) < len(self.spot_ids) // 2:
+            self._compact()
+
+    def set_statuses(self, spot_id: int, add: Iterable[str] = (), remove: Iterable[str] = ()) -> None:
+        """Ajouter / retirer des statuts sur un emplacement"""
+        position = self.positions.get(spot_id)
+        if position is None:
+            return
+        bit = 1 << position
+        for value in remove:
+            if value in self.statuses:
+                self.statuses[value] &= ~bit
+        for value in add:
+            self.statuses[value] = self.statuses.get(value, 0) | bit
+
+    def _compact(self) -> None:
+        """Réécrire les tableaux sans les positions libérées"""
+        old_positions = sorted(self.positions.items(), key=lambda item: item[1])
+        compacted = ParkingAvailability(self.parking_id, self.hotel_id)
+        for spot_id, position in old_positions:
+            bit = 1 << position
+            compacted.upsert(
+                {
+                    "id": spot_id,
+                    "number": self.numbers[position],
+                    "floor": self.floors[position],
+                    "section": self.sections[position],
+                    "length": self.lengths[position],
+                    "width": self.widths[position],
+                    "height": self.heights[position],
+                    **{flag: self.flags[flag] & bit for flag in EQUIPMENT_FLAGS},
+                },
+                [value for value, bitmap in self.types.items() if bitmap & bit],
+                [value for value, bitmap in self.statuses.items() if bitmap & bit],
+            )
+        self.__dict__.update(compacted.__dict__)
+
+    def find(
+        self,
+        types: Iterable[str] = (),
+        equipment: Iterable[str] = (),
+        busy_statuses: Optional[Iterable[str]] = None,
+        min_length: Optional[float] = None,
+        min_width: Optional[float] = None,
+        min_height: Optional[float] = None,
+        floor: Optional[int] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Emplacements ayant tous les types et équipements demandés, aucun des statuts
+        busy_statuses (None : aucun statut du tout) et des dimensions suffisantes
+        """
+        candidates = self.alive
+        for value in types:
+            candidates &= self.types.get(value, 0)
+        for flag in equipment:
+            candidates &= self.flags[flag]
+        busy = self.statuses if busy_statuses is None else {
+            value: self.statuses[value] for value in busy_statuses if value in self.statuses
+        }
+        for bitmap in busy.values():
+            candidates &= ~bitmap
+
+        results = []
+        while candidates and len(results) < limit:
+            lowest = candidates & -candidates
+            candidates ^= lowest
+            position = lowest.bit_length() - 1
+            if min_length is not None and not self.lengths[position] >= min_length:
+                continue
+            if min_width is not None and not self.widths[position] >= min_width:
+                continue
+            if min_height is not None and not self.heights[position] >= min_height:
+                continue
+            if floor is not None and self.floors[position] != floor:
+                continue
+            results.append(self._describe(position))
+        return results
+
+    def _describe(self, position: int) -> Dict[str, Any]:
+        bit = 1 << position
+        return {
+            "id": self.spot_ids[position],
+            "parking_id": self.parking_id,
+            "number": self.numbers[position],
+            "floor": self.floors[position],
+            "section": self.sections[position],
+            "length": _recorded(self.lengths[position]),
+            "width": _recorded(self.widths[position]),
+            "height": _recorded(self.heights[position]),
+            **{flag: bool(self.flags[flag] & bit) for flag in EQUIPMENT_FLAGS},
+            "types": [value for value, bitmap in self.types.items() if bitmap & bit],
+        }
+
+
+class AvailabilityIndex:
+    """Index de disponibilité de tous les parkings du processus"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._parkings: Dict[int, ParkingAvailability] = {}
+
+    def build(self, db: Session) -> None:
+        """Construire l'index complet en quatre requêtes"""
+        parkings = {
+            parking_id: ParkingAvailability(parking_id, hotel_id)
+            for parking_id, hotel_id in db.execute(select(Parking.id, Parking.hotel_id))
+        }
+        self._load_spots(db, parkings, None)
+        with self._lock:
+            self._parkings = parkings
+
+    def reload_parkings(self, db: Session, parking_ids: Iterable[int]) -> None:
+        """Reconstruire l'index de quelques parkings (après une écriture en lot)"""
+        parking_ids = list(set(parking_ids))
+        if not parking_ids:
+            return
+        parkings = {
+            parking_id: ParkingAvailability(parking_id, hotel_id)
+            for parking_id, hotel_id in db.execute(
+                select(Parking.id, Parking.hotel_id).where(Parking.id.in_(parking_ids))
+            )
+        }
+        self._load_spots(db, parkings, parking_ids)
+        with self._lock:
+            for parking_id in parking_ids:
+                self._parkings.pop(parking_id, None)
+            self._parkings.update(parkings)
+
+    @staticmethod
+    def _load_spots(db: Session, parkings: Dict[int, ParkingAvailability], parking_ids: Optional[List[int]]) -> None:
+        spot_query = select(*SPOT_COLUMNS).order_by(ParkingSpot.id)
+        type_query = (
+            select(spot_types.c.spot_id, SpotType.value)
+            .join(SpotType, SpotType.id == spot_types.c.type_id)
+        )
+        status_query = (
+            select(spot_statuses.c.spot_id, Status.value)
+            .join(Status, Status.id == spot_statuses.c.status_id)
+        )
+        if parking_ids is not None:
+            selected_spots = select(ParkingSpot.id).where(ParkingSpot.parking_id.in_(parking_ids))
+            spot_query = spot_query.where(ParkingSpot.parking_id.in_(parking_ids))
+            type_query = type_query.where(spot_types.c.spot_id.in_(selected_spots))
+            status_query = status_query.where(spot_statuses.c.spot_id.in_(selected_spots))
+
+        types: Dict[int, List[str]] = {}
+        for spot_id, value in db.execute(type_query):
+            types.setdefault(spot_id, []).append(value)
+        statuses: Dict[int, List[str]] = {}
+        for spot_id, value in db.execute(status_query):
+            statuses.setdefault(spot_id, []).append(value)
+
+        for row in db.execute(spot_query).mappings():
+            parking = parkings.get(row["parking_id"])
+            if parking is not None:
+                parking.upsert(row, types.get(row["id"], ()), statuses.get(row["id"], ()))
+
+    def add_parking(self, parking_id: int, hotel_id: Optional[int]) -> None:
+        with self._lock:
+            self._parkings.setdefault(parking_id, ParkingAvailability(parking_id, hotel_id))
+
+    def drop_parking(self, parking_id: int) -> None:
+        with self._lock:
+            self._parkings.pop(parking_id, None)
+
+    def drop_hotel(self, hotel_id: int) -> None:
+        with self._lock:
+            for parking_id in [pid for pid, parking in self._parkings.items() if parking.hotel_id == hotel_id]:
+                del self._parkings[parking_id]
+
+    def upsert_spot(self, spot: ParkingSpot) -> None:
+        """Indexer un emplacement venant d'être écrit (types et statuts chargés)"""
+        row = {column.key: getattr(spot, column.key) for column in SPOT_COLUMNS}
+        types = [spot_type.value for spot_type in spot.types]
+        statuses = [status.value for status in spot.statuses]
+        with self._lock:
+            parking = self._parkings.get(spot.parking_id)
+            if parking is None:
+                parking = self._parkings[spot.parking_id] = ParkingAvailability(
+                    spot.parking_id, spot.parking.hotel_id
+                )
+            parking.upsert(row, types, statuses)
+
+    def remove_spot(self, parking_id: int, spot_id: int) -> None:
+        with self._lock:
+            parking = self._parkings.get(parking_id)
+            if parking is not None:
+                parking.remove(spot_id)
+
+    def update_statuses(
+        self,
+        spots: Iterable[Tuple[int, int]],
+        add: Iterable[str] = (),
+        remove: Iterable[str] = (),
+        replace: bool = False,
+    ) -> None:
+        """
+        Modifier les statuts d'emplacements donnés par couples (spot_id, parking_id) ;
+        avec replace, tous les statuts absents de add sont retirés
+        """
+        add, remove = list(add), list(remove)
+        with self._lock:
+            for spot_id, parking_id in spots:
+                parking = self._parkings.get(parking_id)
+                if parking is not None:
+                    parking.set_statuses(spot_id, add, list(parking.statuses) if replace else remove)
+
+    def find(
+        self,
+        hotel_id: Optional[int] = None,
+        parking_id: Optional[int] = None,
+        limit: int = 100,
+        **criteria: Any,
+    ) -> List[Dict[str, Any]]:
+        """Rechercher des emplacements libres dans un parking, un hôtel ou partout"""
+        results: List[Dict[str, Any]] = []
+        with self._lock:
+            for parking in sorted(self._parkings.values(), key=lambda item: item.parking_id):
+                if parking_id is not None and parking.parking_id != parking_id:
+                    continue
+                if hotel_id is not None and parking.hotel_id != hotel_id:
+                    continue
+                results.extend(parking.find(limit=limit - len(results), **criteria))
+                if len(results) >= limit:
+                    break
+        return results
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,185 @@
+"""
+Cache mémoire (par processus) des tables de référence Status et SpotType
+
+Ces tables contiennent une vingtaine de lignes qui ne changent presque jamais :
+elles sont chargées en une requête, servies depuis la mémoire et rechargées
+lorsqu'une valeur créée est validée ou que la durée de vie du cache est écoulée
+(afin de voir les créations faites par les autres workers). Une valeur inconnue
+provoque aussi un rechargement, au plus une fois par intervalle miss_reload : une
+requête répétée avec une valeur qui n'existe pas ne relit pas la table à chaque fois.
+
+Contient aussi le cache à courte durée de vie des taux d'occupation, invalidé
+par les écritures sur les emplacements.
+"""
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Type
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+from app.models.parking import Status, SpotType
+from app.schemas.parking import Status as StatusSchema, SpotType as SpotTypeSchema
+from config import settings
+
+
+class LookupCache:
+    """Cache valeur → ligne d'une table de référence"""
+
+    def __init__(self, model: Type, schema: Type[BaseModel], ttl: float, miss_reload: float):
+        self.model = model
+        self.schema = schema
+        self.ttl = ttl
+        self.miss_reload = miss_reload
+        self._lock = threading.Lock()
+        self._by_value: Dict[str, BaseModel] = {}
+        self._by_id: Dict[int, BaseModel] = {}
+        self._items: List[BaseModel] = []
+        self._loaded_at: Optional[float] = None
+
+    def load(self, db: Session) -> None:
+        """(Re)charger toutes les lignes de la table en une requête"""
+        rows = db.query(self.model).order_by(self.model.id).all()
+        items = [self.schema.model_validate(row, from_attributes=True) for row in rows]
+        with self._lock:
+            self._items = items
+            self._by_value = {item.value: item for item in items}
+            self._by_id = {item.id: item for item in items}
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Invalider le cache (après la création d'une valeur)"""
+        with self._lock:
+            self._loaded_at = None
+
+    def invalidate_after_commit(self, db: Session) -> None:
+        """
+        Invalider le cache à la validation de la transaction de db, qui vient de créer une
+        valeur : un rechargement plus tôt ne la verrait pas et la croirait inconnue
+        """
+        db.info.setdefault(_PENDING_INVALIDATIONS, set()).add(self)
+
+    def _ensure_loaded(self, db: Session) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.ttl:
+            self.load(db)
+
+    def _reload_on_miss(self, db: Session) -> bool:
+        """
+        Recharger pour une valeur absente, qui a pu être créée par un autre worker depuis
+        le chargement, sauf si le chargement date de moins de miss_reload secondes
+        """
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.miss_reload:
+            return False
+        self.load(db)
+        return True
+
+    def get_all(self, db: Session) -> List[BaseModel]:
+        self._ensure_loaded(db)
+        return self._items
+
+    def get_by_value(self, db: Session, value: str) -> Optional[BaseModel]:
+        self._ensure_loaded(db)
+        item = self._by_value.get(value)
+        if item is None and self._reload_on_miss(db):
+            item = self._by_value.get(value)
+        return item
+
+    def get_by_id(self, db: Session, item_id: int) -> Optional[BaseModel]:
+        self._ensure_loaded(db)
+        item = self._by_id.get(item_id)
+        if item is None and self._reload_on_miss(db):
+            item = self._by_id.get(item_id)
+        return item
+
+    def get_ids(self, db: Session, values) -> Dict[str, int]:
+        """Résoudre des valeurs en IDs ; les valeurs inconnues sont absentes du résultat"""
+        self._ensure_loaded(db)
+        values = set(values)
+        if not values <= self._by_value.keys():
+            self._reload_on_miss(db)
+        by_value = self._by_value
+        return {value: by_value[value].id for value in values if value in by_value}
+
+    def attach(self, db: Session, item: BaseModel):
+        """
+        Obtenir l'objet ORM correspondant à une entrée du cache, rattaché à la session
+        sans requête (pour l'ajouter à une relation d'un emplacement)
+        """
+        instance = db.identity_map.get(identity_key(self.model, item.id))
+        if instance is None:
+            instance = self.model(**item.model_dump())
+            make_transient_to_detached(instance)
+            db.add(instance)
+        return instance
+
+
+# Caches à invalider à la validation de la transaction d'une session (Session.info)
+_PENDING_INVALIDATIONS = "lookup_cache_invalidations"
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    for cache in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        cache.invalidate()
+
+
+status_cache = LookupCache(Status, StatusSchema, settings.LOOKUP_CACHE_TTL, settings.LOOKUP_CACHE_MISS_RELOAD)
+spot_type_cache = LookupCache(SpotType, SpotTypeSchema, settings.LOOKUP_CACHE_TTL, settings.LOOKUP_CACHE_MISS_RELOAD)
+
+
+class TTLCache:
+    """Cache clé → valeur à durée de vie limitée"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, tuple] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        """Invalider toutes les clés (prefix, ...)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == prefix]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+occupancy_cache = TTLCache(settings.OCCUPANCY_CACHE_TTL)
+
+
+def invalidate_occupancy(parking_id: Optional[int] = None) -> None:
+    """
+    Invalider l'occupation d'un parking et celle de tous les hôtels
+    (ou tout le cache si le parking n'est pas connu)
+    """
+    if parking_id is None:
+        occupancy_cache.clear()
+        return
+    occupancy_cache.invalidate(("parking", parking_id))
+    occupancy_cache.invalidate_prefix("hotel")
+
+
+def warm_lookup_caches(db: Session) -> None:
+    """Charger les caches de référence (au démarrage, après l'initialisation des données)"""
+    status_cache.load(db)
+    spot_type_cache.load(db)
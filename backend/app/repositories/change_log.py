@@ -0,0 +1,111 @@
+"""
+Journal des modifications (table change_log)
+
+Les repositories y ajoutent une ligne par entité modifiée (hôtel, parking ou emplacement)
+dans la transaction de l'écriture : seules les modifications validées y figurent. L'ID
+de la ligne est une position croissante, utilisée par la synchronisation incrémentale
+(/api/changes?since=) et par la diffusion des modifications d'emplacements (/api/stream).
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.parking import ChangeLogEntry
+
+# Durée pendant laquelle un ID manquant (transaction pas encore validée) est attendu
+GAP_TIMEOUT = 10.0
+
+
+def change_row(
+    entity: str,
+    entity_id: int,
+    op: str,
+    hotel_id: int,
+    parking_id: Optional[int] = None,
+    changes: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Ligne du journal pour la modification d'une entité (changes : champs modifiés)"""
+    return {
+        "entity": entity,
+        "entity_id": entity_id,
+        "op": op,
+        "hotel_id": hotel_id,
+        "parking_id": parking_id,
+        "changes": None if changes is None else json.dumps(changes, ensure_ascii=False, separators=(",", ":")),
+    }
+
+
+def record_changes(db: Session, rows: Iterable[Dict[str, Any]]) -> None:
+    """Ajouter, sans commit, des lignes au journal dans la transaction en cours"""
+    rows = list(rows)
+    if rows:
+        db.execute(insert(ChangeLogEntry), rows)
+
+
+class ChangeLogRepository:
+    """Repository pour la lecture et la purge du journal des modifications"""
+
+    @staticmethod
+    def get_bounds(db: Session) -> Tuple[int, int]:
+        """Récupérer les positions de la première et de la dernière ligne (0 si le journal est vide)"""
+        first, last = db.execute(select(func.min(ChangeLogEntry.id), func.max(ChangeLogEntry.id))).one()
+        return first or 0, last or 0
+
+    @staticmethod
+    def get_settled_position(db: Session, since: int, last: int) -> int:
+        """
+        Position jusqu'à laquelle le journal est complet : un ID manquant suivi de lignes
+        récentes peut appartenir à une transaction pas encore validée, la lecture s'arrête
+        avant lui (au plus GAP_TIMEOUT secondes, ensuite il est considéré comme annulé)
+        """
+        recent = db.execute(
+            select(ChangeLogEntry.id)
+            .where(
+                ChangeLogEntry.id > since,
+                ChangeLogEntry.created_at >= datetime.utcnow() - timedelta(seconds=GAP_TIMEOUT)
+            )
+            .order_by(ChangeLogEntry.id)
+        ).scalars().all()
+        if not recent:
+            return last
+        previous = db.execute(
+            select(func.max(ChangeLogEntry.id)).where(ChangeLogEntry.id > since, ChangeLogEntry.id < recent[0])
+        ).scalar() or since
+        for position in recent:
+            if position != previous + 1:
+                return previous
+            previous = position
+        return last
+
+    @staticmethod
+    def get_entries(db: Session, since: int, until: int, hotel_id: Optional[int] = None, limit: int = 1000) -> List[Any]:
+        """Lire les lignes de positions ]since, until], optionnellement d'un hôtel"""
+        query = (
+            select(
+                ChangeLogEntry.id, ChangeLogEntry.entity, ChangeLogEntry.entity_id,
+                ChangeLogEntry.op, ChangeLogEntry.parking_id,
+            )
+            .where(ChangeLogEntry.id > since, ChangeLogEntry.id <= until)
+        )
+        if hotel_id:
+            query = query.where(ChangeLogEntry.hotel_id == hotel_id)
+        return db.execute(query.order_by(ChangeLogEntry.id).limit(limit)).all()
+
+    @staticmethod
+    def truncate(db: Session, retention: float) -> int:
+        """
+        Supprimer les lignes plus anciennes que retention secondes, en gardant la dernière
+        (elle marque la position courante) ; retourne le nombre de lignes supprimées
+        """
+        _, last = ChangeLogRepository.get_bounds(db)
+        result = db.execute(
+            delete(ChangeLogEntry).where(
+                ChangeLogEntry.created_at < datetime.utcnow() - timedelta(seconds=retention),
+                ChangeLogEntry.id < last
+            )
+        )
+        db.commit()
+        return result.rowcount
@@ -0,0 +1,88 @@
+"""
+Pagination par curseur (keyset) pour les listes des repositories
+"""
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.orm import Query, Session
+
+
+class InvalidCursorError(ValueError):
+    """Curseur de pagination illisible ou incompatible avec la liste demandée"""
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encoder les valeurs de la clé de tri du dernier élément en curseur opaque"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Décoder un curseur opaque en valeurs de clé de tri"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError) as exc:
+        raise InvalidCursorError("Curseur de pagination invalide") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError("Curseur de pagination invalide")
+    return values
+
+
+def keyset_page(
+    query: Query,
+    columns: Sequence[Any],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = False
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Récupérer une page triée selon columns (toutes dans le même sens) à partir du curseur.
+
+    La page suivante est sélectionnée par une comparaison de tuple sur la clé de tri
+    (WHERE (a, b) > (:a, :b) ORDER BY a, b LIMIT n) : la base parcourt l'index à partir
+    de la position du curseur au lieu de lire puis d'écarter les lignes précédentes.
+    """
+    rows = _keyset_query(query, columns, cursor, limit, descending).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    return rows, next_cursor
+
+
+def keyset_rows(
+    db: Session,
+    query: Select,
+    columns: Sequence[Any],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = False
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Variante de keyset_page pour une requête Core : retourne une page de lignes sous
+    forme de dictionnaires (les colonnes de tri doivent faire partie de la sélection)
+    """
+    rows = [dict(row) for row in db.execute(_keyset_query(query, columns, cursor, limit, descending)).mappings()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last[column.key] for column in columns])
+    return rows, next_cursor
+
+
+def _keyset_query(query, columns: Sequence[Any], cursor: Optional[str], limit: int, descending: bool):
+    """Filtrer après la position du curseur, trier et limiter à limit + 1 lignes"""
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        key, position = tuple_(*columns), tuple_(*values)
+        query = query.filter(key < position if descending else key > position)
+    order_by = [column.desc() for column in columns] if descending else list(columns)
+    return query.order_by(*order_by).limit(limit + 1)
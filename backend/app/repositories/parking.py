@@ -1,39 +1,267 @@
 """
 Repository pour les opérations de base de données - Hiérarchie à trois niveaux
 """
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-import json
+from typing import List, Optional, Dict, Any, Tuple, Iterable, Sequence, Set
+from sqlalchemy import String, and_, case, cast, delete, exists, func, insert, or_, select, true, update
+from sqlalchemy.orm import Session, load_only, selectinload
 
-from app.models.parking import Hotel, Parking, ParkingSpot, Status, SpotType
+from app.models.parking import Hotel, Parking, ParkingSpot, SpotPicture, Status, SpotType, spot_types, spot_statuses
+from app.repositories.availability import availability_index
+from app.repositories.cache import status_cache, spot_type_cache, occupancy_cache, invalidate_occupancy
+from app.repositories.pagination import keyset_page, keyset_rows
+from app.repositories.picture_store import is_picture_hash
+from app.repositories.change_log import change_row, record_changes
+from app.repositories.spot_events import spot_event_hub
 from app.schemas.parking import (
     HotelCreate, ParkingCreate, ParkingSpotCreate, ParkingUpdate, 
-    ParkingSpotUpdate, StatusCreate, SpotTypeCreate
+    ParkingSpotUpdate, StatusCreate, SpotTypeCreate, ParkingSpotSearch
 )
 
+# Stratégies de chargement par schéma de réponse : les relations sérialisées sont
+# chargées par des requêtes IN groupées (selectinload) au lieu d'une requête par ligne
+SPOT_LOAD_OPTIONS = (
+    selectinload(ParkingSpot.types),
+    selectinload(ParkingSpot.statuses),
+)
+
+# Relations de ParkingSpotInDB, chargées uniquement si demandées par ?fields=
+SPOT_RELATION_OPTIONS = {
+    "types": selectinload(ParkingSpot.types),
+    "statuses": selectinload(ParkingSpot.statuses),
+}
+
+# ParkingSpotDetail (détail d'un emplacement, avec ses photos)
+SPOT_DETAIL_LOAD_OPTIONS = SPOT_LOAD_OPTIONS + (
+    selectinload(ParkingSpot.pictures),
+)
+
+# ParkingInDB → ParkingSpotInDB
+PARKING_TREE_LOAD_OPTIONS = (
+    selectinload(Parking.spots).selectinload(ParkingSpot.types),
+    selectinload(Parking.spots).selectinload(ParkingSpot.statuses),
+)
+
+# HotelInDB → ParkingInDB → ParkingSpotInDB
+HOTEL_TREE_LOAD_OPTIONS = (
+    selectinload(Hotel.parkings).selectinload(Parking.spots).selectinload(ParkingSpot.types),
+    selectinload(Hotel.parkings).selectinload(Parking.spots).selectinload(ParkingSpot.statuses),
+)
+
+# Lecture des listes d'emplacements en lignes Core (sans objets ORM) : les types et les
+# IDs de statuts de chaque emplacement sont agrégés en SQL (GROUP_CONCAT / string_agg)
+AGGREGATE_SEPARATOR = "\x1f"
+
+SPOT_ROW_COLUMNS = (
+    ParkingSpot.number, ParkingSpot.floor, ParkingSpot.section, ParkingSpot.address,
+    ParkingSpot.electric_charging, ParkingSpot.camera, ParkingSpot.sensor,
+    ParkingSpot.length, ParkingSpot.width, ParkingSpot.height, ParkingSpot.surface,
+    ParkingSpot.hourly_rate, ParkingSpot.daily_rate, ParkingSpot.monthly_rate,
+    ParkingSpot.id,
+    select(func.aggregate_strings(SpotType.value, AGGREGATE_SEPARATOR))
+    .select_from(spot_types.join(SpotType, SpotType.id == spot_types.c.type_id))
+    .where(spot_types.c.spot_id == ParkingSpot.id)
+    .scalar_subquery().label("types"),
+    select(func.aggregate_strings(cast(spot_statuses.c.status_id, String), AGGREGATE_SEPARATOR))
+    .where(spot_statuses.c.spot_id == ParkingSpot.id)
+    .scalar_subquery().label("status_ids"),
+    ParkingSpot.parking_id,
+    ParkingSpot.picture_count.expression.label("picture_count"),
+)
+
+def _spot_rows_to_dicts(db: Session, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Mettre les lignes au format de ParkingSpotInDB : types en liste, IDs de statuts
+    remplacés par les statuts du cache
+    """
+    statuses = {status.id: {"value": status.value, "color": status.color} for status in status_cache.get_all(db)}
+    for row in rows:
+        types = row["types"]
+        row["types"] = types.split(AGGREGATE_SEPARATOR) if types else []
+        status_ids = row.pop("status_ids")
+        row["statuses"] = [
+            statuses[int(status_id)] for status_id in status_ids.split(AGGREGATE_SEPARATOR)
+            if int(status_id) in statuses
+        ] if status_ids else []
+    return rows
+
+def _projection_options(model, fields: Sequence[str], relations: Optional[Dict[str, Any]] = None, keys: Sequence[Any] = ()) -> Tuple[Any, ...]:
+    """
+    Options de chargement limitées aux champs demandés (?fields=) : seules ces colonnes
+    (et la clé de tri) sont lues et seules les relations demandées sont chargées
+    """
+    relations = relations or {}
+    columns = [getattr(model, name) for name in fields if name not in relations]
+    columns.extend(key for key in keys if key.key not in fields)
+    return (load_only(*columns), *(relations[name] for name in fields if name in relations))
+
+def _count_occupancy(db: Session, parking_filter) -> Dict[int, Dict[str, Any]]:
+    """
+    Compter les emplacements par parking, par statut et par type en quatre requêtes
+    GROUP BY (les IDs de statut/type sont traduits en valeurs par le cache)
+    """
+    occupancy: Dict[int, Dict[str, Any]] = {}
+
+    def entry(parking_id: int) -> Dict[str, Any]:
+        return occupancy.setdefault(parking_id, {
+            "parking_id": parking_id,
+            "total_spots": 0,
+            "spots_without_status": 0,
+            "by_status": {},
+            "by_type": {},
+        })
+
+    for parking_id, total in db.execute(
+        select(ParkingSpot.parking_id, func.count(ParkingSpot.id))
+        .where(parking_filter)
+        .group_by(ParkingSpot.parking_id)
+    ):
+        entry(parking_id)["total_spots"] = total
+        entry(parking_id)["spots_without_status"] = total
+
+    for parking_id, with_status in db.execute(
+        select(ParkingSpot.parking_id, func.count(func.distinct(spot_statuses.c.spot_id)))
+        .join(spot_statuses, spot_statuses.c.spot_id == ParkingSpot.id)
+        .where(parking_filter)
+        .group_by(ParkingSpot.parking_id)
+    ):
+        entry(parking_id)["spots_without_status"] -= with_status
+
+    for table, value_column, cache, key in (
+        (spot_statuses, spot_statuses.c.status_id, status_cache, "by_status"),
+        (spot_types, spot_types.c.type_id, spot_type_cache, "by_type"),
+    ):
+        for parking_id, value_id, count in db.execute(
+            select(ParkingSpot.parking_id, value_column, func.count())
+            .join(table, table.c.spot_id == ParkingSpot.id)
+            .where(parking_filter)
+            .group_by(ParkingSpot.parking_id, value_column)
+        ):
+            cached = cache.get_by_id(db, value_id)
+            if cached:
+                entry(parking_id)[key][cached.value] = count
+
+    return occupancy
+
+# Type d'emplacement réservé aux personnes à mobilité réduite
+PMR_TYPE = "PMR"
+
+def _bump_versions(db: Session, parking_ids: Iterable[int] = (), hotel_ids: Iterable[int] = ()) -> None:
+    """
+    Incrémenter, sans commit, la version des parkings donnés et de leurs hôtels ainsi que
+    celle des hôtels donnés : la version d'un hôtel couvre toute son arborescence
+    """
+    parking_ids = set(parking_ids)
+    hotel_ids = set(hotel_ids)
+    hotel_conditions = []
+    if parking_ids:
+        db.execute(
+            update(Parking)
+            .where(Parking.id.in_(parking_ids))
+            .values(version=Parking.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        hotel_conditions.append(Hotel.id.in_(select(Parking.hotel_id).where(Parking.id.in_(parking_ids))))
+    if hotel_ids:
+        hotel_conditions.append(Hotel.id.in_(hotel_ids))
+    if hotel_conditions:
+        db.execute(
+            update(Hotel)
+            .where(or_(*hotel_conditions))
+            .values(version=Hotel.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+def _parking_hotel_ids(db: Session, parking_ids: Iterable[int]) -> Dict[int, int]:
+    """Récupérer l'hôtel de chaque parking (lignes du journal des modifications)"""
+    return dict(db.execute(select(Parking.id, Parking.hotel_id).where(Parking.id.in_(set(parking_ids)))).all())
+
 class HotelRepository:
     """Repository pour les opérations sur les hôtels"""
 
     @staticmethod
-    def get_all_hotels(db: Session, skip: int = 0, limit: int = 100) -> List[Hotel]:
-        """Récupérer tous les hôtels"""
-        return db.query(Hotel).offset(skip).limit(limit).all()
+    def get_all_hotels(db: Session, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[Hotel]:
+        """Récupérer tous les hôtels (limités aux champs demandés si fields)"""
+        query = db.query(Hotel)
+        if fields:
+            query = query.options(*_projection_options(Hotel, fields))
+        return query.offset(skip).limit(limit).all()
+
+    @staticmethod
+    def get_hotels_page(db: Session, cursor: Optional[str] = None, limit: int = 100, fields: Optional[Sequence[str]] = None) -> Tuple[List[Hotel], Optional[str]]:
+        """Récupérer une page d'hôtels triés par ID à partir d'un curseur"""
+        query = db.query(Hotel)
+        if fields:
+            query = query.options(*_projection_options(Hotel, fields, keys=(Hotel.id,)))
+        return keyset_page(query, (Hotel.id,), cursor, limit)
+
+    @staticmethod
+    def get_hotel_by_id(db: Session, hotel_id: int, load_tree: bool = False) -> Optional[Hotel]:
+        """Récupérer un hôtel par son ID (avec ses parkings et emplacements si load_tree)"""
+        query = db.query(Hotel)
+        if load_tree:
+            query = query.options(*HOTEL_TREE_LOAD_OPTIONS)
+        return query.filter(Hotel.id == hotel_id).first()
 
     @staticmethod
-    def get_hotel_by_id(db: Session, hotel_id: int) -> Optional[Hotel]:
-        """Récupérer un hôtel par son ID"""
-        return db.query(Hotel).filter(Hotel.id == hotel_id).first()
+    def get_version(db: Session, hotel_id: int) -> Optional[int]:
+        """Récupérer la version d'un hôtel par une lecture de clé primaire (None s'il n'existe pas)"""
+        return db.execute(select(Hotel.version).where(Hotel.id == hotel_id)).scalar()
+
+    @staticmethod
+    def get_hotel_rows_by_ids(db: Session, hotel_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Lire des hôtels par leurs IDs en lignes Core (format de HotelWithoutParkings)"""
+        return [dict(row) for row in db.execute(
+            select(Hotel.name, Hotel.address, Hotel.id).where(Hotel.id.in_(set(hotel_ids))).order_by(Hotel.id)
+        ).mappings()]
 
     @staticmethod
     def get_hotel_by_name(db: Session, name: str) -> Optional[Hotel]:
         """Récupérer un hôtel par son nom"""
         return db.query(Hotel).filter(Hotel.name == name).first()
 
+    @staticmethod
+    def upsert_hotels_by_name(db: Session, hotels: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Créer les hôtels absents et mettre à jour les attributs fournis des hôtels existants,
+        identifiés par leur nom (sans commit) ; retourne le mapping nom → ID
+        """
+        if not hotels:
+            return {}
+        existing = {
+            hotel.name: hotel
+            for hotel in db.execute(select(Hotel).where(Hotel.name.in_(list(hotels)))).scalars()
+        }
+        created = []
+        updated = []
+        for name, attributes in hotels.items():
+            hotel = existing.get(name)
+            if hotel is None:
+                hotel = Hotel(name=name, **attributes)
+                db.add(hotel)
+                existing[name] = hotel
+                created.append((hotel, attributes))
+            elif attributes:
+                for key, value in attributes.items():
+                    setattr(hotel, key, value)
+                updated.append((hotel.id, attributes))
+        db.flush()
+        _bump_versions(db, hotel_ids=[hotel_id for hotel_id, _ in updated])
+        record_changes(db, [
+            change_row("hotel", hotel.id, "create", hotel.id, changes=dict(attributes, name=hotel.name))
+            for hotel, attributes in created
+        ] + [
+            change_row("hotel", hotel_id, "update", hotel_id, changes=attributes)
+            for hotel_id, attributes in updated
+        ])
+        return {name: hotel.id for name, hotel in existing.items()}
+
     @staticmethod
     def create_hotel(db: Session, hotel: HotelCreate) -> Hotel:
         """Créer un nouvel hôtel"""
-        db_hotel = Hotel(**hotel.dict())
+        db_hotel = Hotel(**hotel.model_dump())
         db.add(db_hotel)
+        db.flush()
+        record_changes(db, [change_row("hotel", db_hotel.id, "create", db_hotel.id, changes=hotel.model_dump())])
         db.commit()
         db.refresh(db_hotel)
         return db_hotel
@@ -45,6 +273,8 @@ class HotelRepository:
         if db_hotel:
             for key, value in hotel_data.items():
                 setattr(db_hotel, key, value)
+            _bump_versions(db, hotel_ids=[hotel_id])
+            record_changes(db, [change_row("hotel", hotel_id, "update", hotel_id, changes=hotel_data)])
             db.commit()
             db.refresh(db_hotel)
         return db_hotel
@@ -55,35 +285,167 @@ class HotelRepository:
         db_hotel = HotelRepository.get_hotel_by_id(db, hotel_id)
         if db_hotel:
             db.delete(db_hotel)
+            # Les parkings et emplacements de l'hôtel sont supprimés avec lui
+            record_changes(db, [change_row("hotel", hotel_id, "delete", hotel_id)])
             db.commit()
+            invalidate_occupancy()
+            availability_index.drop_hotel(hotel_id)
+            spot_event_hub.notify()
             return True
         return False
 
+    @staticmethod
+    def get_occupancy(db: Session, hotel_id: int) -> Dict[str, Any]:
+        """Récupérer l'occupation d'un hôtel, totalisée et détaillée par parking (mise en cache)"""
+        cached = occupancy_cache.get(("hotel", hotel_id))
+        if cached is not None:
+            return cached
+
+        parking_ids = db.execute(
+            select(Parking.id).where(Parking.hotel_id == hotel_id).order_by(Parking.id)
+        ).scalars().all()
+        counts = _count_occupancy(
+            db, ParkingSpot.parking_id.in_(select(Parking.id).where(Parking.hotel_id == hotel_id))
+        )
+        occupancy = {
+            "hotel_id": hotel_id,
+            "total_spots": 0,
+            "spots_without_status": 0,
+            "by_status": {},
+            "by_type": {},
+            "parkings": [],
+        }
+        for parking_id in parking_ids:
+            parking = counts.get(parking_id) or {"parking_id": parking_id}
+            occupancy["parkings"].append(parking)
+            occupancy["total_spots"] += parking.get("total_spots", 0)
+            occupancy["spots_without_status"] += parking.get("spots_without_status", 0)
+            for key in ("by_status", "by_type"):
+                for value, count in parking.get(key, {}).items():
+                    occupancy[key][value] = occupancy[key].get(value, 0) + count
+
+        occupancy_cache.set(("hotel", hotel_id), occupancy)
+        return occupancy
+
 class ParkingRepository:
     """Repository pour les opérations sur les parkings"""
 
     @staticmethod
-    def get_all_parkings(db: Session, hotel_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[Parking]:
-        """Récupérer tous les parkings, optionnellement filtrés par hôtel"""
+    def get_all_parkings(db: Session, hotel_id: Optional[int] = None, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[Parking]:
+        """Récupérer tous les parkings, optionnellement filtrés par hôtel (limités aux champs demandés si fields)"""
         query = db.query(Parking)
+        if fields:
+            query = query.options(*_projection_options(Parking, fields))
         if hotel_id:
             query = query.filter(Parking.hotel_id == hotel_id)
         return query.offset(skip).limit(limit).all()
 
     @staticmethod
-    def get_parking_by_id(db: Session, parking_id: int) -> Optional[Parking]:
-        """Récupérer un parking par son ID"""
-        return db.query(Parking).filter(Parking.id == parking_id).first()
+    def get_parkings_page(db: Session, hotel_id: Optional[int] = None, cursor: Optional[str] = None, limit: int = 100, fields: Optional[Sequence[str]] = None) -> Tuple[List[Parking], Optional[str]]:
+        """Récupérer une page de parkings triés par ID à partir d'un curseur"""
+        query = db.query(Parking)
+        if fields:
+            query = query.options(*_projection_options(Parking, fields, keys=(Parking.id,)))
+        if hotel_id:
+            query = query.filter(Parking.hotel_id == hotel_id)
+        return keyset_page(query, (Parking.id,), cursor, limit)
+
+    @staticmethod
+    def get_parking_by_id(db: Session, parking_id: int, load_tree: bool = False) -> Optional[Parking]:
+        """Récupérer un parking par son ID (avec ses emplacements si load_tree)"""
+        query = db.query(Parking)
+        if load_tree:
+            query = query.options(*PARKING_TREE_LOAD_OPTIONS)
+        return query.filter(Parking.id == parking_id).first()
+
+    @staticmethod
+    def get_version(db: Session, parking_id: int) -> Optional[int]:
+        """Récupérer la version d'un parking par une lecture de clé primaire (None s'il n'existe pas)"""
+        return db.execute(select(Parking.version).where(Parking.id == parking_id)).scalar()
+
+    @staticmethod
+    def get_version_and_hotel_id(db: Session, parking_id: int) -> Optional[Tuple[int, int]]:
+        """Récupérer la version et l'hôtel d'un parking (None s'il n'existe pas)"""
+        row = db.execute(select(Parking.version, Parking.hotel_id).where(Parking.id == parking_id)).first()
+        return None if row is None else tuple(row)
+
+    @staticmethod
+    def get_parking_rows_by_ids(db: Session, parking_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Lire des parkings par leurs IDs en lignes Core (format de ParkingWithoutSpots)"""
+        return [dict(row) for row in db.execute(
+            select(
+                Parking.name, Parking.description, Parking.location,
+                func.coalesce(Parking.total_capacity, 0).label("total_capacity"),
+                Parking.id, Parking.hotel_id,
+            )
+            .where(Parking.id.in_(set(parking_ids)))
+            .order_by(Parking.id)
+        ).mappings()]
 
     @staticmethod
     def create_parking(db: Session, parking: ParkingCreate, hotel_id: int) -> Parking:
         """Créer un nouveau parking"""
-        db_parking = Parking(**parking.dict(), hotel_id=hotel_id)
+        db_parking = Parking(**parking.model_dump(), hotel_id=hotel_id)
         db.add(db_parking)
+        db.flush()
+        _bump_versions(db, hotel_ids=[hotel_id])
+        record_changes(db, [
+            change_row("parking", db_parking.id, "create", hotel_id, db_parking.id, dict(parking.model_dump(), hotel_id=hotel_id))
+        ])
         db.commit()
         db.refresh(db_parking)
+        availability_index.add_parking(db_parking.id, hotel_id)
         return db_parking
 
+    @staticmethod
+    def upsert_parkings_by_name(db: Session, parkings: Dict[Tuple[int, str], Dict[str, Any]]) -> Dict[Tuple[int, str], int]:
+        """
+        Créer les parkings absents et mettre à jour les attributs fournis des parkings
+        existants, identifiés par (hôtel, nom) (sans commit) ; retourne le mapping
+        (hôtel, nom) → ID. Les nouveaux parkings sont ajoutés à l'index de disponibilité
+        par l'appelant, après le commit.
+        """
+        if not parkings:
+            return {}
+        existing: Dict[Tuple[int, str], Parking] = {}
+        for parking in db.execute(
+            select(Parking)
+            .where(
+                Parking.hotel_id.in_({hotel_id for hotel_id, _ in parkings}),
+                Parking.name.in_({name for _, name in parkings})
+            )
+            .order_by(Parking.id)
+        ).scalars():
+            existing.setdefault((parking.hotel_id, parking.name), parking)
+        created = []
+        updated = []
+        for (hotel_id, name), attributes in parkings.items():
+            parking = existing.get((hotel_id, name))
+            if parking is None:
+                parking = Parking(name=name, hotel_id=hotel_id, total_capacity=0, **attributes)
+                db.add(parking)
+                existing[(hotel_id, name)] = parking
+                created.append((parking, attributes))
+            elif attributes:
+                for key, value in attributes.items():
+                    setattr(parking, key, value)
+                updated.append((parking, attributes))
+        db.flush()
+        _bump_versions(
+            db, [parking.id for parking, _ in updated], {parking.hotel_id for parking, _ in created}
+        )
+        record_changes(db, [
+            change_row(
+                "parking", parking.id, "create", parking.hotel_id, parking.id,
+                dict(attributes, name=parking.name, hotel_id=parking.hotel_id, total_capacity=0),
+            )
+            for parking, attributes in created
+        ] + [
+            change_row("parking", parking.id, "update", parking.hotel_id, parking.id, attributes)
+            for parking, attributes in updated
+        ])
+        return {key: existing[key].id for key in parkings}
+
     @staticmethod
     def update_parking(db: Session, parking_id: int, parking_data: Dict[str, Any]) -> Optional[Parking]:
         """Mettre à jour un parking"""
@@ -91,6 +453,8 @@ class ParkingRepository:
         if db_parking:
             for key, value in parking_data.items():
                 setattr(db_parking, key, value)
+            _bump_versions(db, [parking_id])
+            record_changes(db, [change_row("parking", parking_id, "update", db_parking.hotel_id, parking_id, parking_data)])
             db.commit()
             db.refresh(db_parking)
         return db_parking
@@ -101,74 +465,438 @@ class ParkingRepository:
         db_parking = ParkingRepository.get_parking_by_id(db, parking_id)
         if db_parking:
             db.delete(db_parking)
+            _bump_versions(db, hotel_ids=[db_parking.hotel_id])
+            # Les emplacements du parking sont supprimés avec lui
+            record_changes(db, [change_row("parking", parking_id, "delete", db_parking.hotel_id, parking_id)])
             db.commit()
+            invalidate_occupancy(parking_id)
+            availability_index.drop_parking(parking_id)
+            spot_event_hub.notify()
             return True
         return False
 
+    @staticmethod
+    def get_occupancy(db: Session, parking_id: int) -> Dict[str, Any]:
+        """Récupérer l'occupation d'un parking par statut et par type (mise en cache)"""
+        cached = occupancy_cache.get(("parking", parking_id))
+        if cached is not None:
+            return cached
+        occupancy = _count_occupancy(db, ParkingSpot.parking_id == parking_id).get(
+            parking_id, {"parking_id": parking_id}
+        )
+        occupancy_cache.set(("parking", parking_id), occupancy)
+        return occupancy
+
+    @staticmethod
+    def adjust_capacity(db: Session, parking_id: int, delta: int) -> None:
+        """
+        Modifier la capacité totale d'un parking par une requête UPDATE atomique
+        (total_capacity = total_capacity + :delta, sans descendre sous zéro), sans commit :
+        elle s'exécute dans la transaction de l'écriture de l'emplacement
+        """
+        new_capacity = func.coalesce(Parking.total_capacity, 0) + delta
+        db.execute(
+            update(Parking)
+            .where(Parking.id == parking_id)
+            .values(total_capacity=case((new_capacity < 0, 0), else_=new_capacity))
+            .execution_options(synchronize_session="fetch")
+        )
+
+    @staticmethod
+    def reconcile_capacities(db: Session) -> int:
+        """
+        Recalculer en une requête la capacité de tous les parkings à partir du nombre
+        d'emplacements ; retourne le nombre de parkings corrigés
+        """
+        spot_count = (
+            select(func.count(ParkingSpot.id))
+            .where(ParkingSpot.parking_id == Parking.id)
+            .scalar_subquery()
+        )
+        mismatch = (Parking.total_capacity != spot_count) | Parking.total_capacity.is_(None)
+        corrections = db.execute(select(Parking.id, Parking.hotel_id, spot_count).where(mismatch)).all()
+        _bump_versions(db, hotel_ids=[hotel_id for _, hotel_id, _ in corrections])
+        record_changes(db, (
+            change_row("parking", parking_id, "update", hotel_id, parking_id, {"total_capacity": capacity})
+            for parking_id, hotel_id, capacity in corrections
+        ))
+        result = db.execute(
+            update(Parking)
+            .where(mismatch)
+            .values(total_capacity=spot_count, version=Parking.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount
+
 class ParkingSpotRepository:
     """Repository pour les opérations sur les emplacements de parking"""
 
     @staticmethod
-    def get_all_spots(db: Session, parking_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[ParkingSpot]:
-        """Récupérer tous les emplacements, optionnellement filtrés par parking"""
-        query = db.query(ParkingSpot)
+    def get_all_spots(db: Session, parking_id: Optional[int] = None, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[ParkingSpot]:
+        """Récupérer tous les emplacements, optionnellement filtrés par parking (limités aux champs demandés si fields)"""
+        if fields:
+            options = _projection_options(ParkingSpot, fields, SPOT_RELATION_OPTIONS)
+        else:
+            options = SPOT_LOAD_OPTIONS
+        query = db.query(ParkingSpot).options(*options)
         if parking_id:
             query = query.filter(ParkingSpot.parking_id == parking_id)
         return query.offset(skip).limit(limit).all()
 
     @staticmethod
-    def get_spot_by_id(db: Session, spot_id: int) -> Optional[ParkingSpot]:
-        """Récupérer un emplacement par son ID"""
-        return db.query(ParkingSpot).filter(ParkingSpot.id == spot_id).first()
+    def get_spots_page(db: Session, parking_id: Optional[int] = None, cursor: Optional[str] = None, limit: int = 100, fields: Optional[Sequence[str]] = None) -> Tuple[List[ParkingSpot], Optional[str]]:
+        """Récupérer une page d'emplacements triés par (parking, numéro, ID) à partir d'un curseur"""
+        query = db.query(ParkingSpot)
+        if parking_id:
+            query = query.filter(ParkingSpot.parking_id == parking_id)
+            columns = (ParkingSpot.number, ParkingSpot.id)
+        else:
+            columns = (ParkingSpot.parking_id, ParkingSpot.number, ParkingSpot.id)
+        if fields:
+            query = query.options(*_projection_options(ParkingSpot, fields, SPOT_RELATION_OPTIONS, columns))
+        else:
+            query = query.options(*SPOT_LOAD_OPTIONS)
+        return keyset_page(query, columns, cursor, limit)
+
+    @staticmethod
+    def get_spot_rows(db: Session, parking_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Lire une liste d'emplacements en une requête Core, sans objets ORM : chaque ligne
+        est un dictionnaire au format de ParkingSpotInDB
+        """
+        query = select(*SPOT_ROW_COLUMNS)
+        if parking_id:
+            query = query.where(ParkingSpot.parking_id == parking_id)
+        rows = [dict(row) for row in db.execute(query.offset(skip).limit(limit)).mappings()]
+        return _spot_rows_to_dicts(db, rows)
+
+    @staticmethod
+    def get_spot_rows_page(db: Session, parking_id: Optional[int] = None, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Variante de get_spots_page en lignes Core (dictionnaires au format de ParkingSpotInDB)"""
+        query = select(*SPOT_ROW_COLUMNS)
+        if parking_id:
+            query = query.where(ParkingSpot.parking_id == parking_id)
+            columns = (ParkingSpot.number, ParkingSpot.id)
+        else:
+            columns = (ParkingSpot.parking_id, ParkingSpot.number, ParkingSpot.id)
+        rows, next_cursor = keyset_rows(db, query, columns, cursor, limit)
+        return _spot_rows_to_dicts(db, rows), next_cursor
+
+    @staticmethod
+    def get_spot_rows_by_ids(db: Session, spot_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Lire des emplacements par leurs IDs en lignes Core (format de ParkingSpotInDB)"""
+        query = select(*SPOT_ROW_COLUMNS).where(ParkingSpot.id.in_(set(spot_ids))).order_by(ParkingSpot.id)
+        return _spot_rows_to_dicts(db, [dict(row) for row in db.execute(query).mappings()])
+
+    @staticmethod
+    def _association_filter(table, value_column, ids: List[int], requested: int, mode: str):
+        """Condition sur une table d'association (types ou statuts) : any, all ou none"""
+        matching = select(table.c.spot_id).where(value_column.in_(ids))
+        if mode == "all":
+            matching = matching.group_by(table.c.spot_id).having(func.count() == requested)
+        elif mode == "none":
+            return ParkingSpot.id.not_in(matching)
+        return ParkingSpot.id.in_(matching)
+
+    @staticmethod
+    def search_spots(db: Session, filters: ParkingSpotSearch) -> Tuple[List[ParkingSpot], Optional[str]]:
+        """Rechercher des emplacements selon des critères combinables, en une requête paginée par curseur"""
+        query = db.query(ParkingSpot).options(*SPOT_LOAD_OPTIONS)
+
+        if filters.parking_id:
+            query = query.filter(ParkingSpot.parking_id == filters.parking_id)
+        if filters.hotel_id:
+            query = query.filter(
+                ParkingSpot.parking_id.in_(select(Parking.id).where(Parking.hotel_id == filters.hotel_id))
+            )
+        if filters.floor is not None:
+            query = query.filter(ParkingSpot.floor == filters.floor)
+        if filters.section is not None:
+            query = query.filter(ParkingSpot.section == filters.section)
+
+        # Équipement
+        for field in ("electric_charging", "camera", "sensor"):
+            value = getattr(filters, field)
+            if value is not None:
+                query = query.filter(getattr(ParkingSpot, field) == value)
+
+        # Dimensions minimales et fourchettes de prix
+        for field in ("length", "width", "height"):
+            value = getattr(filters, f"min_{field}")
+            if value is not None:
+                query = query.filter(getattr(ParkingSpot, field) >= value)
+        for field in ("hourly_rate", "daily_rate", "monthly_rate"):
+            minimum, maximum = getattr(filters, f"min_{field}"), getattr(filters, f"max_{field}")
+            if minimum is not None:
+                query = query.filter(getattr(ParkingSpot, field) >= minimum)
+            if maximum is not None:
+                query = query.filter(getattr(ParkingSpot, field) <= maximum)
+
+        # Types et statuts, résolus en IDs depuis le cache (les valeurs inconnues ne correspondent à rien)
+        if filters.types:
+            type_ids = spot_type_cache.get_ids(db, filters.types)
+            query = query.filter(ParkingSpotRepository._association_filter(
+                spot_types, spot_types.c.type_id, list(type_ids.values()),
+                len(set(filters.types)), filters.types_mode
+            ))
+        if filters.statuses:
+            status_ids = status_cache.get_ids(db, filters.statuses)
+            query = query.filter(ParkingSpotRepository._association_filter(
+                spot_statuses, spot_statuses.c.status_id, list(status_ids.values()),
+                len(set(filters.statuses)), filters.statuses_mode
+            ))
+
+        if filters.sort:
+            columns = (getattr(ParkingSpot, filters.sort), ParkingSpot.id)
+        elif filters.parking_id:
+            columns = (ParkingSpot.number, ParkingSpot.id)
+        else:
+            columns = (ParkingSpot.parking_id, ParkingSpot.number, ParkingSpot.id)
+        return keyset_page(query, columns, filters.cursor, filters.limit, descending=filters.order == "desc")
+
+    @staticmethod
+    def get_spot_by_id(db: Session, spot_id: int, load_relations: bool = False) -> Optional[ParkingSpot]:
+        """Récupérer un emplacement par son ID (avec ses types, statuts et photos si load_relations)"""
+        query = db.query(ParkingSpot)
+        if load_relations:
+            query = query.options(*SPOT_DETAIL_LOAD_OPTIONS)
+        return query.filter(ParkingSpot.id == spot_id).first()
 
     @staticmethod
     def get_or_create_status(db: Session, status_data: StatusCreate) -> Status:
         """Récupérer ou créer un statut"""
+        cached = status_cache.get_by_value(db, status_data.value)
+        if cached:
+            return status_cache.attach(db, cached)
+        # Créé par un autre worker depuis le dernier rechargement du cache
         db_status = db.query(Status).filter(Status.value == status_data.value).first()
-        if not db_status:
-            db_status = Status(**status_data.dict())
-            db.add(db_status)
-            db.commit()
-            db.refresh(db_status)
+        if db_status is not None:
+            return db_status
+        db_status = Status(**status_data.model_dump())
+        db.add(db_status)
+        status_cache.invalidate_after_commit(db)
+        db.commit()
+        db.refresh(db_status)
         return db_status
 
     @staticmethod
-    def get_or_create_spot_type(db: Session, type_value: str) -> SpotType:
-        """Récupérer ou créer un type d'emplacement"""
+    def get_or_create_spot_type(db: Session, type_value: str, commit: bool = True) -> SpotType:
+        """Récupérer ou créer un type d'emplacement (sans commit si commit=False)"""
+        cached = spot_type_cache.get_by_value(db, type_value)
+        if cached:
+            return spot_type_cache.attach(db, cached)
+        # Créé par un autre worker depuis le dernier rechargement du cache, ou plus tôt dans la transaction
         db_type = db.query(SpotType).filter(SpotType.value == type_value).first()
-        if not db_type:
-            db_type = SpotType(value=type_value)
-            db.add(db_type)
+        if db_type is not None:
+            return db_type
+        db_type = SpotType(value=type_value)
+        db.add(db_type)
+        spot_type_cache.invalidate_after_commit(db)
+        if commit:
             db.commit()
             db.refresh(db_type)
         return db_type
 
+    @staticmethod
+    def resolve_spot_type_ids(db: Session, type_values: Iterable[str]) -> Dict[str, int]:
+        """Résoudre des valeurs de type en IDs depuis le cache, en créant les types manquants (sans commit)"""
+        values = set(type_values)
+        if not values:
+            return {}
+        type_ids = spot_type_cache.get_ids(db, values)
+        missing = values - type_ids.keys()
+        if missing:
+            # Types créés par un autre worker depuis le dernier rechargement du cache,
+            # ou plus tôt dans la transaction (lot d'import de plusieurs parkings)
+            type_ids.update(db.execute(
+                select(SpotType.value, SpotType.id).where(SpotType.value.in_(missing))
+            ).all())
+            missing = values - type_ids.keys()
+        if missing:
+            new_types = [SpotType(value=value) for value in sorted(missing)]
+            db.add_all(new_types)
+            db.flush()
+            type_ids.update({spot_type.value: spot_type.id for spot_type in new_types})
+            spot_type_cache.invalidate_after_commit(db)
+        return type_ids
+
+    @staticmethod
+    def number_exists(db: Session, parking_id: int, number: int, exclude_spot_id: Optional[int] = None) -> bool:
+        """Vérifier par une requête EXISTS (index unique parking/numéro) si un numéro est déjà utilisé"""
+        condition = exists().where(
+            ParkingSpot.parking_id == parking_id,
+            ParkingSpot.number == number
+        )
+        if exclude_spot_id is not None:
+            condition = condition.where(ParkingSpot.id != exclude_spot_id)
+        return db.execute(select(condition)).scalar()
+
+    @staticmethod
+    def get_existing_numbers(db: Session, parking_id: int, numbers: Iterable[int]) -> Set[int]:
+        """Récupérer, parmi les numéros donnés, ceux déjà utilisés dans un parking"""
+        numbers = set(numbers)
+        if not numbers:
+            return set()
+        return set(db.execute(
+            select(ParkingSpot.number).where(
+                ParkingSpot.parking_id == parking_id,
+                ParkingSpot.number.in_(numbers)
+            )
+        ).scalars())
+
+    @staticmethod
+    def bulk_create_spots(db: Session, spots: List[ParkingSpotCreate], parking_id: int) -> Dict[int, int]:
+        """
+        Créer des emplacements en lot dans une seule transaction.
+
+        Les lignes sont insérées avec executemany, les IDs sont relus par (parking, numéro),
+        puis les associations de types sont insérées en une fois et la capacité du parking
+        est incrémentée par une seule requête UPDATE. Retourne le mapping numéro → ID.
+        """
+        if not spots:
+            return {}
+
+        try:
+            spot_ids = ParkingSpotRepository.insert_spots(db, spots, parking_id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        invalidate_occupancy(parking_id)
+        spot_event_hub.notify()
+        availability_index.reload_parkings(db, [parking_id])
+        return spot_ids
+
+    @staticmethod
+    def insert_spots(
+        db: Session,
+        spots: Sequence[ParkingSpotCreate],
+        parking_id: int,
+        status_ids: Optional[Sequence[Iterable[int]]] = None,
+    ) -> Dict[int, int]:
+        """
+        Insérer des emplacements d'un parking avec leurs types, photos et statuts
+        (status_ids[i] = statuts de spots[i]) et incrémenter sa capacité, sans commit
+        ni mise à jour des caches ; retourne le mapping numéro → ID
+        """
+        type_ids = ParkingSpotRepository.resolve_spot_type_ids(
+            db, (type_value for spot in spots for type_value in spot.types)
+        )
+
+        rows = []
+        for spot in spots:
+            row = spot.model_dump(exclude={"types", "pictures"})
+            row["parking_id"] = parking_id
+            rows.append(row)
+        db.execute(insert(ParkingSpot), rows)
+
+        numbers = [spot.number for spot in spots]
+        spot_ids = dict(db.execute(
+            select(ParkingSpot.number, ParkingSpot.id).where(
+                ParkingSpot.parking_id == parking_id,
+                ParkingSpot.number.in_(numbers)
+            )
+        ).all())
+
+        association_rows = [
+            {"spot_id": spot_ids[spot.number], "type_id": type_ids[type_value]}
+            for spot in spots
+            for type_value in set(spot.types)
+        ]
+        if association_rows:
+            db.execute(insert(spot_types), association_rows)
+
+        if status_ids is not None:
+            status_rows = [
+                {"spot_id": spot_ids[spot.number], "status_id": status_id}
+                for spot, spot_status_ids in zip(spots, status_ids)
+                for status_id in set(spot_status_ids)
+            ]
+            if status_rows:
+                db.execute(insert(spot_statuses), status_rows)
+
+        picture_rows = [
+            dict(ParkingSpotRepository._picture_row(position, picture), spot_id=spot_ids[spot.number])
+            for spot in spots
+            for position, picture in enumerate(spot.pictures)
+        ]
+        if picture_rows:
+            db.execute(insert(SpotPicture), picture_rows)
+
+        ParkingRepository.adjust_capacity(db, parking_id, len(spots))
+        _bump_versions(db, [parking_id])
+        hotel_id = _parking_hotel_ids(db, [parking_id])[parking_id]
+        status_values = {status.id: status.value for status in status_cache.get_all(db)}
+        record_changes(db, (
+            change_row("spot", spot_ids[row["number"]], "create", hotel_id, parking_id, dict(
+                row,
+                id=spot_ids[row["number"]],
+                types=list(dict.fromkeys(spot.types)),
+                statuses=[
+                    status_values[status_id] for status_id in dict.fromkeys(spot_status_ids)
+                    if status_id in status_values
+                ],
+                picture_count=len(spot.pictures),
+            ))
+            for spot, row, spot_status_ids in zip(spots, rows, status_ids if status_ids is not None else [()] * len(spots))
+        ))
+        return spot_ids
+
+    @staticmethod
+    def _picture_row(position: int, picture: str) -> Dict[str, Any]:
+        """Colonnes spot_pictures d'une photo (SHA-256 du stockage local ou URL externe)"""
+        if is_picture_hash(picture):
+            return {"position": position, "sha256": picture, "url": None}
+        return {"position": position, "sha256": None, "url": picture}
+
+    @staticmethod
+    def _build_pictures(pictures: Iterable[str]) -> List[SpotPicture]:
+        """Construire les lignes spot_pictures d'une liste ordonnée de photos"""
+        return [
+            SpotPicture(**ParkingSpotRepository._picture_row(position, picture))
+            for position, picture in enumerate(pictures)
+        ]
+
     @staticmethod
     def create_spot(db: Session, spot: ParkingSpotCreate, parking_id: int) -> ParkingSpot:
         """Créer un nouvel emplacement de parking"""
         # Création de l'emplacement avec les données de base
-        spot_data = spot.dict(exclude={"types"})
+        spot_data = spot.model_dump(exclude={"types", "pictures"})
         db_spot = ParkingSpot(
             **spot_data,
             parking_id=parking_id,
-            pictures=json.dumps(spot.pictures if hasattr(spot, "pictures") else [])
+            pictures=ParkingSpotRepository._build_pictures(spot.pictures)
         )
         
         # Ajout des types d'emplacement
-        for type_value in spot.types:
-            type_obj = ParkingSpotRepository.get_or_create_spot_type(db, type_value)
+        for type_value in dict.fromkeys(spot.types):
+            type_obj = ParkingSpotRepository.get_or_create_spot_type(db, type_value, commit=False)
             db_spot.types.append(type_obj)
         
-        db.add(db_spot)
-        db.commit()
-        db.refresh(db_spot)
-        
-        # Mettre à jour la capacité totale du parking
-        db_parking = ParkingRepository.get_parking_by_id(db, parking_id)
-        if db_parking:
-            db_parking.total_capacity += 1
+        # L'emplacement et la capacité du parking sont écrits dans la même transaction
+        try:
+            db.add(db_spot)
+            db.flush()
+            ParkingRepository.adjust_capacity(db, parking_id, 1)
+            _bump_versions(db, [parking_id])
+            hotel_id = _parking_hotel_ids(db, [parking_id])[parking_id]
+            record_changes(db, [change_row("spot", db_spot.id, "create", hotel_id, parking_id, dict(
+                spot_data,
+                id=db_spot.id,
+                parking_id=parking_id,
+                types=list(dict.fromkeys(spot.types)),
+                statuses=[],
+                picture_count=len(spot.pictures),
+            ))])
             db.commit()
-            
+        except Exception:
+            db.rollback()
+            raise
+        invalidate_occupancy(parking_id)
+        spot_event_hub.notify()
+        db.refresh(db_spot)
+        availability_index.upsert_spot(db_spot)
         return db_spot
 
     @staticmethod
@@ -179,7 +907,8 @@ class ParkingSpotRepository:
         if not db_spot:
             return None
             
-        update_data = spot_data.dict(exclude_unset=True)
+        update_data = spot_data.model_dump(exclude_unset=True)
+        changes = {key: value for key, value in update_data.items() if key not in ("types", "statuses", "pictures")}
         
         # Gestion des types d'emplacement
         if "types" in update_data:
@@ -187,9 +916,10 @@ class ParkingSpotRepository:
             # Nettoyer les types existants
             db_spot.types = []
             # Ajouter les nouveaux types
-            for type_value in types:
-                type_obj = ParkingSpotRepository.get_or_create_spot_type(db, type_value)
+            for type_value in dict.fromkeys(types):
+                type_obj = ParkingSpotRepository.get_or_create_spot_type(db, type_value, commit=False)
                 db_spot.types.append(type_obj)
+            changes["types"] = list(dict.fromkeys(types))
         
         # Gestion des statuts
         if "statuses" in update_data:
@@ -198,20 +928,28 @@ class ParkingSpotRepository:
             db_spot.statuses = []
             # Ajouter les nouveaux statuts
             for status_value in statuses:
-                status_obj = db.query(Status).filter(Status.value == status_value).first()
-                if status_obj:
-                    db_spot.statuses.append(status_obj)
+                cached = status_cache.get_by_value(db, status_value)
+                if cached:
+                    db_spot.statuses.append(status_cache.attach(db, cached))
+            changes["statuses"] = [status.value for status in db_spot.statuses]
         
         # Gestion des images
         if "pictures" in update_data:
-            update_data["pictures"] = json.dumps(update_data["pictures"])
+            db_spot.pictures = ParkingSpotRepository._build_pictures(update_data.pop("pictures") or [])
+            changes["picture_count"] = len(db_spot.pictures)
             
         # Mettre à jour les autres champs
         for key, value in update_data.items():
             setattr(db_spot, key, value)
             
+        _bump_versions(db, [db_spot.parking_id])
+        hotel_id = _parking_hotel_ids(db, [db_spot.parking_id])[db_spot.parking_id]
+        record_changes(db, [change_row("spot", spot_id, "update", hotel_id, db_spot.parking_id, changes)])
         db.commit()
+        invalidate_occupancy(db_spot.parking_id)
+        spot_event_hub.notify()
         db.refresh(db_spot)
+        availability_index.upsert_spot(db_spot)
         return db_spot
 
     @staticmethod
@@ -219,16 +957,20 @@ class ParkingSpotRepository:
         """Supprimer un emplacement de parking"""
         db_spot = ParkingSpotRepository.get_spot_by_id(db, spot_id)
         if db_spot:
-            parking_id = db_spot.parking_id
-            db.delete(db_spot)
-            db.commit()
-            
-            # Mettre à jour la capacité totale du parking
-            db_parking = ParkingRepository.get_parking_by_id(db, parking_id)
-            if db_parking and db_parking.total_capacity > 0:
-                db_parking.total_capacity -= 1
+            # Suppression et mise à jour de la capacité dans la même transaction
+            try:
+                db.delete(db_spot)
+                ParkingRepository.adjust_capacity(db, db_spot.parking_id, -1)
+                _bump_versions(db, [db_spot.parking_id])
+                hotel_id = _parking_hotel_ids(db, [db_spot.parking_id])[db_spot.parking_id]
+                record_changes(db, [change_row("spot", spot_id, "delete", hotel_id, db_spot.parking_id)])
                 db.commit()
-            
+            except Exception:
+                db.rollback()
+                raise
+            invalidate_occupancy(db_spot.parking_id)
+            spot_event_hub.notify()
+            availability_index.remove_spot(db_spot.parking_id, spot_id)
             return True
         return False
 
@@ -241,8 +983,14 @@ class ParkingSpotRepository:
             
         status = ParkingSpotRepository.get_or_create_status(db, status_data)
         db_spot.statuses.append(status)
+        _bump_versions(db, [db_spot.parking_id])
+        hotel_id = _parking_hotel_ids(db, [db_spot.parking_id])[db_spot.parking_id]
+        record_changes(db, [change_row("spot", spot_id, "status", hotel_id, db_spot.parking_id, {"add": [status.value]})])
         db.commit()
+        invalidate_occupancy(db_spot.parking_id)
+        spot_event_hub.notify()
         db.refresh(db_spot)
+        availability_index.upsert_spot(db_spot)
         return db_spot
 
     @staticmethod
@@ -252,35 +1000,223 @@ class ParkingSpotRepository:
         if not db_spot:
             return None
             
-        db_status = db.query(Status).filter(Status.id == status_id).first()
+        cached = status_cache.get_by_id(db, status_id)
+        db_status = status_cache.attach(db, cached) if cached else None
         if db_status and db_status in db_spot.statuses:
             db_spot.statuses.remove(db_status)
+            _bump_versions(db, [db_spot.parking_id])
+            hotel_id = _parking_hotel_ids(db, [db_spot.parking_id])[db_spot.parking_id]
+            record_changes(db, [
+                change_row("spot", spot_id, "status", hotel_id, db_spot.parking_id, {"remove": [db_status.value]})
+            ])
             db.commit()
+            invalidate_occupancy(db_spot.parking_id)
+            spot_event_hub.notify()
             db.refresh(db_spot)
+            availability_index.upsert_spot(db_spot)
         return db_spot
 
+    @staticmethod
+    def get_allocatable_spots(db: Session, hotel_id: int, busy_status_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Récupérer en une requête les emplacements libres d'un hôtel (sans statut, ou sans
+        aucun des statuts busy_status_ids) avec leurs dimensions, tarifs et l'indicateur PMR
+        """
+        busy = spot_statuses.c.spot_id == ParkingSpot.id
+        if busy_status_ids is not None:
+            busy = busy & spot_statuses.c.status_id.in_(busy_status_ids)
+        is_pmr = exists().where(
+            spot_types.c.spot_id == ParkingSpot.id,
+            spot_types.c.type_id == SpotType.id,
+            SpotType.value == PMR_TYPE
+        )
+        query = (
+            select(
+                ParkingSpot.id, ParkingSpot.parking_id, ParkingSpot.number,
+                ParkingSpot.length, ParkingSpot.width, ParkingSpot.height, ParkingSpot.surface,
+                ParkingSpot.hourly_rate, ParkingSpot.daily_rate, ParkingSpot.electric_charging,
+                is_pmr.label("pmr"),
+            )
+            .join(Parking, Parking.id == ParkingSpot.parking_id)
+            .where(Parking.hotel_id == hotel_id, ~exists().where(busy))
+            .order_by(ParkingSpot.id)
+        )
+        return [dict(row) for row in db.execute(query).mappings()]
+
+    @staticmethod
+    def export_query(hotel_id: Optional[int] = None, parking_id: Optional[int] = None):
+        """Requête d'export des emplacements (colonnes à plat avec l'hôtel), triée par ID"""
+        query = (
+            select(
+                ParkingSpot.id, Parking.hotel_id, ParkingSpot.parking_id, ParkingSpot.number,
+                ParkingSpot.floor, ParkingSpot.section, ParkingSpot.address,
+                ParkingSpot.length, ParkingSpot.width, ParkingSpot.height, ParkingSpot.surface,
+                ParkingSpot.electric_charging, ParkingSpot.camera, ParkingSpot.sensor,
+                ParkingSpot.hourly_rate, ParkingSpot.daily_rate, ParkingSpot.monthly_rate,
+            )
+            .join(Parking, Parking.id == ParkingSpot.parking_id)
+            .order_by(ParkingSpot.id)
+        )
+        if hotel_id:
+            query = query.where(Parking.hotel_id == hotel_id)
+        if parking_id:
+            query = query.where(ParkingSpot.parking_id == parking_id)
+        return query
+
+    @staticmethod
+    def export_relations_queries(spot_ids: List[int]):
+        """Requêtes (spot_id, valeur) des types et des statuts d'un lot d'emplacements"""
+        types = (
+            select(spot_types.c.spot_id, SpotType.value)
+            .join(SpotType, SpotType.id == spot_types.c.type_id)
+            .where(spot_types.c.spot_id.in_(spot_ids))
+        )
+        statuses = (
+            select(spot_statuses.c.spot_id, Status.value)
+            .join(Status, Status.id == spot_statuses.c.status_id)
+            .where(spot_statuses.c.spot_id.in_(spot_ids))
+        )
+        return types, statuses
+
+    @staticmethod
+    def select_spot_ids(
+        spot_ids: Optional[List[int]] = None,
+        parking_id: Optional[int] = None,
+        hotel_id: Optional[int] = None
+    ):
+        """Construire la sous-requête des IDs d'emplacements correspondant aux critères"""
+        query = select(ParkingSpot.id)
+        if spot_ids is not None:
+            query = query.where(ParkingSpot.id.in_(spot_ids))
+        if parking_id:
+            query = query.where(ParkingSpot.parking_id == parking_id)
+        if hotel_id:
+            query = query.where(
+                ParkingSpot.parking_id.in_(select(Parking.id).where(Parking.hotel_id == hotel_id))
+            )
+        return query
+
+    @staticmethod
+    def bulk_update_statuses(
+        db: Session,
+        operation: str,
+        status_ids: List[int],
+        spot_ids: Optional[List[int]] = None,
+        parking_id: Optional[int] = None,
+        hotel_id: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Ajouter, retirer ou remplacer des statuts sur un ensemble d'emplacements.
+
+        L'opération s'exécute en quelques requêtes ensemblistes sur spot_statuses
+        (INSERT ... SELECT / DELETE) dans une seule transaction.
+        """
+        selection = ParkingSpotRepository.select_spot_ids(spot_ids, parking_id, hotel_id)
+        added = removed = 0
+        try:
+            # Couples (emplacement, parking) sélectionnés, pour l'index de disponibilité
+            matched_spots = db.execute(selection.add_columns(ParkingSpot.parking_id)).all()
+            matched = len(matched_spots)
+
+            # Emplacements réellement modifiés (MySQL n'a pas de RETURNING) : les autres
+            # n'ont pas de ligne dans le journal des modifications
+            touched: Set[int] = set()
+
+            if operation in ("remove", "replace"):
+                condition = spot_statuses.c.status_id.in_(status_ids)
+                if operation == "replace":
+                    condition = ~condition
+                condition = and_(spot_statuses.c.spot_id.in_(selection), condition)
+                touched.update(db.execute(select(spot_statuses.c.spot_id).where(condition).distinct()).scalars())
+                result = db.execute(delete(spot_statuses).where(condition))
+                removed = result.rowcount
+
+            if operation in ("add", "replace") and status_ids:
+                already_set = exists().where(
+                    spot_statuses.c.spot_id == ParkingSpot.id,
+                    spot_statuses.c.status_id == Status.id
+                )
+                # Produit cartésien volontaire emplacements × statuts demandés
+                rows = (
+                    select(ParkingSpot.id, Status.id)
+                    .join(Status, true())
+                    .where(
+                        ParkingSpot.id.in_(selection),
+                        Status.id.in_(status_ids),
+                        ~already_set
+                    )
+                )
+                touched.update(db.execute(rows.with_only_columns(ParkingSpot.id).distinct()).scalars())
+                result = db.execute(
+                    insert(spot_statuses).from_select(["spot_id", "status_id"], rows)
+                )
+                added = result.rowcount
+
+            cached_statuses = (status_cache.get_by_id(db, status_id) for status_id in status_ids)
+            values = [cached.value for cached in cached_statuses if cached]
+            if removed or added:
+                touched_spots = [spot for spot in matched_spots if spot[0] in touched]
+                parking_hotel_ids = _parking_hotel_ids(db, (spot_parking_id for _, spot_parking_id in touched_spots))
+                _bump_versions(db, parking_hotel_ids.keys(), hotel_ids=parking_hotel_ids.values())
+                # Lignes triées par parking : la diffusion regroupe les emplacements d'un parking
+                record_changes(db, (
+                    change_row(
+                        "spot", spot_id, "status", parking_hotel_ids[spot_parking_id], spot_parking_id, {operation: values}
+                    )
+                    for spot_id, spot_parking_id in sorted(touched_spots, key=lambda spot: (spot[1], spot[0]))
+                ))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        # La sélection peut couvrir plusieurs parkings : tout le cache est invalidé
+        invalidate_occupancy()
+        spot_event_hub.notify()
+
+        availability_index.update_statuses(
+            matched_spots,
+            add=values if operation in ("add", "replace") else (),
+            remove=values if operation == "remove" else (),
+            replace=operation == "replace",
+        )
+        return {"matched_spots": matched, "added": added, "removed": removed}
+
 class StatusRepository:
     """Repository pour les opérations sur les statuts"""
     
     @staticmethod
     def get_all_statuses(db: Session, skip: int = 0, limit: int = 100) -> List[Status]:
-        """Récupérer tous les statuts"""
-        return db.query(Status).offset(skip).limit(limit).all()
+        """Récupérer tous les statuts (depuis le cache)"""
+        return status_cache.get_all(db)[skip:skip + limit]
         
     @staticmethod
     def get_status_by_id(db: Session, status_id: int) -> Optional[Status]:
-        """Récupérer un statut par son ID"""
-        return db.query(Status).filter(Status.id == status_id).first()
+        """Récupérer un statut par son ID (depuis le cache)"""
+        return status_cache.get_by_id(db, status_id)
+
+    @staticmethod
+    def get_version(db: Session) -> str:
+        """
+        Version de la liste des statuts : les statuts ne sont jamais modifiés ni supprimés,
+        le nombre et le plus grand ID suffisent à la décrire
+        """
+        count, max_id = db.execute(select(func.count(Status.id), func.max(Status.id))).one()
+        return f"{count}.{max_id or 0}"
+
+    @staticmethod
+    def get_status_ids_by_values(db: Session, values: Iterable[str]) -> Dict[str, int]:
+        """Résoudre des valeurs de statut en IDs (depuis le cache)"""
+        return status_cache.get_ids(db, values)
 
 class SpotTypeRepository:
     """Repository pour les opérations sur les types d'emplacement"""
     
     @staticmethod
     def get_all_types(db: Session, skip: int = 0, limit: int = 100) -> List[SpotType]:
-        """Récupérer tous les types d'emplacement"""
-        return db.query(SpotType).offset(skip).limit(limit).all()
+        """Récupérer tous les types d'emplacement (depuis le cache)"""
+        return spot_type_cache.get_all(db)[skip:skip + limit]
         
     @staticmethod
     def get_type_by_id(db: Session, type_id: int) -> Optional[SpotType]:
-        """Récupérer un type d'emplacement par son ID"""
-        return db.query(SpotType).filter(SpotType.id == type_id).first()
\ No newline at end of file
+        """Récupérer un type d'emplacement par son ID (depuis le cache)"""
+        return spot_type_cache.get_by_id(db, type_id)
\ No newline at end of file
@@ -0,0 +1,220 @@
+"""
+Stockage local des photos adressé par contenu
+
+Chaque fichier est enregistré sous le SHA-256 de son contenu (<racine>/ab/abcd…) :
+un même fichier envoyé deux fois n'est stocké qu'une fois et un fichier stocké ne
+change jamais, ce qui permet de le servir avec un cache immuable. Les miniatures
+JPEG (<racine>/thumbnails/ab/abcd….jpg) sont générées dans un pool de processus
+pour ne pas bloquer la boucle d'événements.
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterable, Optional, Tuple
+
+from config import settings
+
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+DATA_URL_PATTERN = re.compile(r"^data:[^,]*;base64,(?P<data>.*)$", re.DOTALL)
+
+# Signatures des formats d'image acceptés (premiers octets → type MIME)
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+# Octets lus pour reconnaître le format
+SIGNATURE_SIZE = 16
+UNKNOWN_CONTENT_TYPE = "application/octet-stream"
+
+
+class PictureTooLargeError(ValueError):
+    """Le fichier dépasse la taille maximale autorisée"""
+
+
+class EmptyPictureError(ValueError):
+    """Le fichier envoyé est vide"""
+
+
+class UnsupportedPictureError(ValueError):
+    """Le contenu n'est pas une image d'un format accepté"""
+
+
+def is_picture_hash(value: str) -> bool:
+    """Vérifier qu'une chaîne est un SHA-256 hexadécimal (minuscules)"""
+    return bool(HASH_PATTERN.match(value))
+
+
+def detect_content_type(head: bytes) -> str:
+    """Type MIME d'une image d'après ses premiers octets (UNKNOWN_CONTENT_TYPE si non reconnue)"""
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return UNKNOWN_CONTENT_TYPE
+
+
+def decode_data_url(value: str) -> Optional[bytes]:
+    """Décoder une data-URL base64 (None si la chaîne n'en est pas une)"""
+    match = DATA_URL_PATTERN.match(value)
+    if match is None:
+        return None
+    try:
+        return base64.b64decode(match.group("data"), validate=False)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def make_thumbnail(source: str, target: str, size: int) -> bool:
+    """Générer une miniature JPEG (exécuté dans un processus du pool)"""
+    from PIL import Image
+
+    Path(target).parent.mkdir(parents=True, exist_ok=True)
+    with Image.open(source) as image:
+        image.thumbnail((size, size))
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as output:
+                image.convert("RGB").save(output, "JPEG", quality=85)
+            os.replace(temporary, target)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+    return True
+
+
+class PictureStore:
+    """Dossier de photos adressé par SHA-256"""
+
+    def __init__(self, root: str, max_bytes: int, thumbnail_size: int, thumbnail_workers: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self.thumbnail_workers = thumbnail_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    def thumbnail_path(self, sha256: str) -> Path:
+        return self.root / "thumbnails" / sha256[:2] / f"{sha256}.jpg"
+
+    def exists(self, sha256: str) -> bool:
+        return is_picture_hash(sha256) and self.path(sha256).is_file()
+
+    def content_type(self, sha256: str) -> str:
+        """Déterminer le type MIME d'une photo stockée d'après ses premiers octets"""
+        with open(self.path(sha256), "rb") as handle:
+            return detect_content_type(handle.read(SIGNATURE_SIZE))
+
+    def _temporary_file(self) -> Tuple[int, str]:
+        self.root.mkdir(parents=True, exist_ok=True)
+        return tempfile.mkstemp(dir=self.root, suffix=".upload")
+
+    def _commit(self, temporary: str, sha256: str, head: bytes) -> bool:
+        """
+        Déplacer un fichier temporaire à son adresse ; False s'il y était déjà. Un contenu
+        qui n'est pas une image acceptée (head : premiers octets) est supprimé sans être
+        stocké : il serait sinon servi depuis l'origine de l'API avec un cache immuable.
+        """
+        if detect_content_type(head) == UNKNOWN_CONTENT_TYPE:
+            os.unlink(temporary)
+            raise UnsupportedPictureError("Format de photo non pris en charge (JPEG, PNG, GIF ou WebP attendu)")
+        target = self.path(sha256)
+        if target.is_file():
+            os.unlink(temporary)
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temporary, target)
+        return True
+
+    async def save_stream(self, chunks: AsyncIterable[bytes]) -> Tuple[str, int, bool]:
+        """
+        Enregistrer un flux d'octets en calculant son SHA-256 au fil de l'eau ;
+        retourne (sha256, taille, créé)
+        """
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        fd, temporary = self._temporary_file()
+        try:
+            with os.fdopen(fd, "wb") as output:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise PictureTooLargeError(
+                            f"La photo dépasse la taille maximale de {self.max_bytes} octets"
+                        )
+                    if len(head) < SIGNATURE_SIZE:
+                        head += chunk[:SIGNATURE_SIZE - len(head)]
+                    digest.update(chunk)
+                    await asyncio.to_thread(output.write, chunk)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        if size == 0:
+            os.unlink(temporary)
+            raise EmptyPictureError("Le corps de la requête est vide")
+        sha256 = digest.hexdigest()
+        return sha256, size, self._commit(temporary, sha256, head)
+
+    def save_bytes(self, data: bytes) -> Tuple[str, bool]:
+        """Enregistrer un contenu déjà en mémoire ; retourne (sha256, créé)"""
+        if len(data) > self.max_bytes:
+            raise PictureTooLargeError(
+                f"La photo dépasse la taille maximale de {self.max_bytes} octets"
+            )
+        if detect_content_type(data[:SIGNATURE_SIZE]) == UNKNOWN_CONTENT_TYPE:
+            raise UnsupportedPictureError("Format de photo non pris en charge (JPEG, PNG, GIF ou WebP attendu)")
+        sha256 = hashlib.sha256(data).hexdigest()
+        if self.path(sha256).is_file():
+            return sha256, False
+        fd, temporary = self._temporary_file()
+        with os.fdopen(fd, "wb") as output:
+            output.write(data)
+        return sha256, self._commit(temporary, sha256, data[:SIGNATURE_SIZE])
+
+    def submit_thumbnail(self, sha256: str) -> Optional[Future]:
+        """Lancer la génération de la miniature dans le pool de processus (si absente)"""
+        if self.thumbnail_path(sha256).is_file():
+            return None
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.thumbnail_workers)
+        return self._pool.submit(
+            make_thumbnail, str(self.path(sha256)), str(self.thumbnail_path(sha256)), self.thumbnail_size
+        )
+
+    async def create_thumbnail(self, sha256: str) -> bool:
+        """Générer la miniature sans bloquer la boucle ; False si l'image n'a pas pu être lue"""
+        future = self.submit_thumbnail(sha256)
+        if future is None:
+            return True
+        try:
+            return await asyncio.wrap_future(future)
+        except Exception as e:
+            print(f"Miniature impossible pour {sha256}: {e}")
+            return False
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Arrêter le pool de miniatures (en abandonnant les tâches en attente sauf si wait)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=not wait)
+            self._pool = None
+
+
+picture_store = PictureStore(
+    settings.PICTURE_STORE_DIR,
+    settings.PICTURE_MAX_BYTES,
+    settings.THUMBNAIL_SIZE,
+    settings.THUMBNAIL_WORKERS,
+)
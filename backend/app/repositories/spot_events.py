@@ -0,0 +1,232 @@
+"""
+Diffusion en temps réel des modifications d'emplacements (flux /api/stream)
+
+Les modifications sont lues dans le journal change_log (voir app.repositories.change_log),
+écrit dans la transaction de chaque écriture : seules les modifications validées sont
+diffusées. Dans chaque worker, une tâche lit les nouvelles lignes (immédiatement après
+une écriture locale, sinon toutes les STREAM_POLL_INTERVAL secondes pour voir celles des
+autres workers) et distribue celles des emplacements aux abonnés du parking concerné.
+
+Chaque abonné a une file bornée : un client trop lent pour suivre perd son retard et
+reçoit à la place un message {"op": "resync"} lui demandant de recharger les emplacements.
+La suppression du parking ou de son hôtel termine l'abonnement : son dernier message est
+{"op": "deleted"}, après quoi le flux est fermé.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, or_, select
+
+from app.models.parking import ChangeLogEntry
+from app.repositories.change_log import GAP_TIMEOUT
+from config import settings
+from database import SessionLocal
+
+RESYNC_MESSAGE = json.dumps({"op": "resync"})
+
+FETCH_LIMIT = 1000
+
+
+class Subscription:
+    """Abonnement d'un client aux modifications des emplacements d'un parking"""
+
+    def __init__(self, parking_id: int, hotel_id: int, max_pending: int):
+        self.parking_id = parking_id
+        self.hotel_id = hotel_id
+        self.queue: asyncio.Queue = asyncio.Queue(max_pending)
+        self.closed = False
+
+    def push(self, message: str) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Client lent : abandonner son retard plutôt que de retenir la diffusion
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_MESSAGE)
+
+    def close(self, message: str) -> None:
+        """Terminer l'abonnement : message est le dernier, le retard éventuel est abandonné"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+        self.closed = True
+
+    @property
+    def finished(self) -> bool:
+        """Le dernier message d'un abonnement terminé a été lu"""
+        return self.closed and self.queue.empty()
+
+    async def get(self) -> str:
+        return await self.queue.get()
+
+
+def _status_message(parking_id: int, changes: str, spot_ids: List[int], seq: int) -> Tuple[int, str]:
+    spot_list = ",".join(map(str, spot_ids))
+    return parking_id, (
+        f'{{"seq":{seq},"parking_id":{parking_id},"op":"status","spot_ids":[{spot_list}],"changes":{changes}}}'
+    )
+
+
+def _deleted_message(parking_id: int, seq: int) -> str:
+    return f'{{"seq":{seq},"parking_id":{parking_id},"op":"deleted"}}'
+
+
+def _spot_messages(rows: List[Any]) -> List[Tuple[int, str]]:
+    """
+    Construire les messages (parking, JSON) des lignes d'emplacements ; les changements de
+    statuts identiques consécutifs d'un même parking (opérations en lot) sont regroupés
+    """
+    messages = []
+    # Changement de statuts en cours de regroupement : [parking, changes, IDs, seq]
+    group = None
+    for row in rows:
+        if row.entity != "spot":
+            continue
+        if row.op == "status" and group is not None and group[:2] == [row.parking_id, row.changes]:
+            group[2].append(row.entity_id)
+            group[3] = row.id
+            continue
+        if group is not None:
+            messages.append(_status_message(*group))
+            group = None
+        if row.op == "status":
+            group = [row.parking_id, row.changes, [row.entity_id], row.id]
+            continue
+        message = f'{{"seq":{row.id},"parking_id":{row.parking_id},"op":"{row.op}","spot_id":{row.entity_id}'
+        if row.changes is not None:
+            message += f',"changes":{row.changes}'
+        messages.append((row.parking_id, message + "}"))
+    if group is not None:
+        messages.append(_status_message(*group))
+    return messages
+
+
+class SpotEventHub:
+    """Distribution des modifications d'emplacements du journal aux abonnés du worker"""
+
+    def __init__(self, poll_interval: float, max_pending: int):
+        self.poll_interval = poll_interval
+        self.max_pending = max_pending
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._last_id: Optional[int] = None
+        # IDs sautés (transactions concurrentes pas encore validées) → date d'abandon
+        self._gaps: Dict[int, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def subscribe(self, parking_id: int, hotel_id: int) -> Subscription:
+        subscription = Subscription(parking_id, hotel_id, self.max_pending)
+        idle = not self._subscriptions
+        self._subscriptions.setdefault(parking_id, set()).add(subscription)
+        if idle:
+            # Relire sans attendre la position courante du journal
+            self.notify()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.parking_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.parking_id]
+
+    def notify(self) -> None:
+        """Signaler une écriture locale validée (lecture immédiate du journal)"""
+        if self._wakeup is None:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Écriture hors de la boucle (script) : les lignes seront lues au prochain cycle
+            return
+        self._wakeup.set()
+
+    def _fetch(self) -> List[Any]:
+        """Lire les lignes postérieures à la dernière lue, ainsi que celles des IDs sautés"""
+        db = SessionLocal()
+        try:
+            if self._last_id is None:
+                self._last_id = db.execute(select(func.max(ChangeLogEntry.id))).scalar() or 0
+                return []
+            condition = ChangeLogEntry.id > self._last_id
+            if self._gaps:
+                condition = or_(condition, ChangeLogEntry.id.in_(list(self._gaps)))
+            return db.execute(
+                select(
+                    ChangeLogEntry.id, ChangeLogEntry.entity, ChangeLogEntry.entity_id,
+                    ChangeLogEntry.op, ChangeLogEntry.hotel_id, ChangeLogEntry.parking_id,
+                    ChangeLogEntry.changes,
+                )
+                .where(condition)
+                .order_by(ChangeLogEntry.id)
+                .limit(FETCH_LIMIT)
+            ).all()
+        finally:
+            db.close()
+
+    def _advance(self, rows: List[Any]) -> None:
+        """Avancer la position de lecture en retenant les IDs sautés"""
+        now = time.monotonic()
+        for row in rows:
+            self._gaps.pop(row.id, None)
+            if row.id > self._last_id:
+                # Un saut plus grand qu'une lecture vient d'un incrément, pas d'une transaction
+                if row.id - self._last_id <= FETCH_LIMIT:
+                    for missing in range(self._last_id + 1, row.id):
+                        self._gaps[missing] = now + GAP_TIMEOUT
+                self._last_id = row.id
+        self._gaps = {event_id: deadline for event_id, deadline in self._gaps.items() if deadline > now}
+
+    def _dispatch(self, rows: List[Any]) -> None:
+        for parking_id, message in _spot_messages(rows):
+            # Le message est construit une seule fois pour tous les abonnés du parking
+            for subscription in list(self._subscriptions.get(parking_id, ())):
+                subscription.push(message)
+        for row in rows:
+            if row.op == "delete" and row.entity in ("parking", "hotel"):
+                self._close(row)
+
+    def _close(self, row: Any) -> None:
+        """Terminer les abonnements d'un parking supprimé, ou de tous les parkings d'un hôtel supprimé"""
+        if row.entity == "parking":
+            subscriptions = list(self._subscriptions.get(row.parking_id, ()))
+        else:
+            subscriptions = [
+                subscription
+                for parking_subscriptions in self._subscriptions.values()
+                for subscription in parking_subscriptions
+                if subscription.hotel_id == row.hotel_id
+            ]
+        for subscription in subscriptions:
+            subscription.close(_deleted_message(subscription.parking_id, row.id))
+            self.unsubscribe(subscription)
+
+    async def run(self) -> None:
+        """Boucle de lecture et de distribution (une tâche par worker)"""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._subscriptions:
+                # Sans abonné, inutile de lire : la position sera relue au prochain abonnement
+                self._last_id = None
+                self._gaps.clear()
+                continue
+            try:
+                rows = await asyncio.to_thread(self._fetch)
+            except Exception as e:
+                print(f"Erreur lors de la lecture du journal des modifications: {e}")
+                continue
+            if rows:
+                self._advance(rows)
+                self._dispatch(rows)
+                if len(rows) == FETCH_LIMIT:
+                    self._wakeup.set()
+
+
+spot_event_hub = SpotEventHub(settings.STREAM_POLL_INTERVAL, settings.STREAM_MAX_PENDING)
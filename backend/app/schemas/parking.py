@@ -1,8 +1,9 @@
 """
 Schémas Pydantic pour la validation des données - Hiérarchie à trois niveaux
 """
-from typing import List, Optional, Dict, Any, Union
-from pydantic import BaseModel, Field
+from functools import lru_cache
+from typing import List, Literal, Optional, Dict, Any, Tuple, Type, Union
+from pydantic import BaseModel, ConfigDict, Field, create_model, field_validator
 
 class StatusBase(BaseModel):
     """Schéma de base pour le statut"""
@@ -76,11 +77,11 @@ class ParkingSpotBase(BaseModel):
     hourly_rate: float
     daily_rate: float
     monthly_rate: float
-    pictures: List[str] = []
 
 class ParkingSpotCreate(ParkingSpotBase):
     """Schéma pour la création d'un emplacement"""
     types: List[str]
+    pictures: List[str] = []
 
 class ParkingSpotUpdate(BaseModel):
     """Schéma pour la mise à jour d'un emplacement"""
@@ -108,10 +109,207 @@ class ParkingSpotInDB(ParkingSpotBase):
     types: List[str]
     statuses: List[StatusBase] = []
     parking_id: int
+    # Les listes ne renvoient que le nombre de photos (voir ParkingSpotDetail)
+    picture_count: int = 0
 
     class Config:
         from_attributes = True
 
+    @field_validator("types", mode="before")
+    @classmethod
+    def types_to_values(cls, value):
+        """Convertir les objets SpotType du modèle en leurs valeurs"""
+        return [getattr(spot_type, "value", spot_type) for spot_type in value or []]
+
+# URL de service des photos du stockage local (suivie du SHA-256)
+PICTURE_URL_PREFIX = "/api/pictures/"
+
+class ParkingSpotDetail(ParkingSpotInDB):
+    """Schéma du détail d'un emplacement, avec ses photos"""
+    pictures: List[str] = []
+
+    @field_validator("pictures", mode="before")
+    @classmethod
+    def pictures_to_urls(cls, value):
+        """Convertir les objets SpotPicture du modèle en URLs (stockage local ou externes)"""
+        urls = []
+        for picture in value or []:
+            if isinstance(picture, str):
+                urls.append(picture)
+            elif picture.sha256:
+                urls.append(f"{PICTURE_URL_PREFIX}{picture.sha256}")
+            else:
+                urls.append(picture.url)
+        return urls
+
+class ParkingSpotSearch(BaseModel):
+    """Critères de recherche des emplacements (paramètres de requête)"""
+    hotel_id: Optional[int] = None
+    parking_id: Optional[int] = None
+    floor: Optional[int] = None
+    section: Optional[str] = None
+    types: List[str] = []
+    types_mode: Literal["any", "all", "none"] = "any"
+    statuses: List[str] = []
+    statuses_mode: Literal["any", "all", "none"] = "any"
+    electric_charging: Optional[bool] = None
+    camera: Optional[bool] = None
+    sensor: Optional[bool] = None
+    min_length: Optional[float] = None
+    min_width: Optional[float] = None
+    min_height: Optional[float] = None
+    min_hourly_rate: Optional[float] = None
+    max_hourly_rate: Optional[float] = None
+    min_daily_rate: Optional[float] = None
+    max_daily_rate: Optional[float] = None
+    min_monthly_rate: Optional[float] = None
+    max_monthly_rate: Optional[float] = None
+    sort: Optional[Literal[
+        "number", "floor", "length", "width", "height", "surface",
+        "hourly_rate", "daily_rate", "monthly_rate"
+    ]] = None
+    order: Literal["asc", "desc"] = "asc"
+    cursor: Optional[str] = None
+    limit: int = Field(100, ge=1, le=1000)
+
+class AvailabilityQuery(BaseModel):
+    """Critères de recherche d'emplacements libres dans l'index mémoire (paramètres de requête)"""
+    hotel_id: Optional[int] = None
+    parking_id: Optional[int] = None
+    floor: Optional[int] = None
+    types: List[str] = []
+    electric_charging: bool = False
+    camera: bool = False
+    sensor: bool = False
+    min_length: Optional[float] = None
+    min_width: Optional[float] = None
+    min_height: Optional[float] = None
+    # Statuts rendant un emplacement indisponible (par défaut : n'importe quel statut)
+    busy_statuses: Optional[List[str]] = None
+    limit: int = Field(20, ge=1, le=1000)
+
+class AvailableSpot(BaseModel):
+    """Emplacement libre trouvé dans l'index de disponibilité"""
+    id: int
+    parking_id: int
+    number: int
+    floor: int
+    section: Optional[str] = None
+    length: Optional[float] = None
+    width: Optional[float] = None
+    height: Optional[float] = None
+    electric_charging: bool
+    camera: bool
+    sensor: bool
+    types: List[str] = []
+
+class ArrivalRequest(BaseModel):
+    """Véhicule d'un client arrivant, à placer"""
+    reference: Optional[str] = None
+    length: float = 0
+    width: float = 0
+    height: float = 0
+    pmr: bool = False
+    electric_charging: bool = False
+
+class AllocationRequest(BaseModel):
+    """Demande d'affectation des emplacements pour les arrivées d'un hôtel"""
+    arrivals: List[ArrivalRequest]
+    # Coût minimisé : surface de l'emplacement (surface perdue) ou tarif
+    objective: Literal["surface", "hourly_rate", "daily_rate"] = "surface"
+    # N'utiliser les emplacements PMR / avec recharge qu'en dernier recours
+    preserve_special: bool = True
+    # Statuts rendant un emplacement indisponible (par défaut : n'importe quel statut)
+    busy_statuses: Optional[List[str]] = None
+    # Poser le statut arrival_today sur les emplacements affectés
+    apply: bool = False
+
+class Assignment(BaseModel):
+    """Affectation d'une arrivée à un emplacement"""
+    index: int
+    reference: Optional[str] = None
+    spot_id: int
+    parking_id: int
+    number: int
+    cost: float
+
+class AllocationResult(BaseModel):
+    """Résultat d'une affectation en lot"""
+    assignments: List[Assignment] = []
+    unassigned: List[int] = []
+    total_cost: float = 0
+    applied: bool = False
+
+class PictureUploadResult(BaseModel):
+    """Photo enregistrée dans le stockage local"""
+    sha256: str
+    size: int
+    created: bool
+    url: str
+    thumbnail_url: Optional[str] = None
+
+class ParkingSpotPage(BaseModel):
+    """Page d'emplacements avec le curseur de la page suivante"""
+    items: List[ParkingSpotInDB]
+    next_cursor: Optional[str] = None
+
+class BulkItemError(BaseModel):
+    """Erreur sur un élément d'une opération en lot"""
+    index: int
+    number: Optional[int] = None
+    detail: str
+
+class ParkingSpotBulkResult(BaseModel):
+    """Résultat de la création d'emplacements en lot"""
+    created: int
+    spot_ids: List[int] = []
+    errors: List[BulkItemError] = []
+
+class ImportRowError(BaseModel):
+    """Erreur sur une ligne d'un fichier d'import"""
+    line: int
+    detail: str
+
+class SpotImportResult(BaseModel):
+    """Bilan de l'import d'un fichier d'emplacements"""
+    rows: int
+    created: int
+    hotels: int
+    parkings: int
+    error_count: int
+    errors: List[ImportRowError] = []
+    duration: float
+
+class SpotStatusBulkUpdate(BaseModel):
+    """Schéma pour l'ajout, le retrait ou le remplacement de statuts sur plusieurs emplacements"""
+    operation: Literal["add", "remove", "replace"]
+    statuses: List[str]
+    spot_ids: Optional[List[int]] = None
+    parking_id: Optional[int] = None
+    hotel_id: Optional[int] = None
+
+class SpotStatusBulkResult(BaseModel):
+    """Résumé d'une mise à jour de statuts en lot"""
+    matched_spots: int
+    added: int
+    removed: int
+
+class Occupancy(BaseModel):
+    """Répartition des emplacements par statut et par type"""
+    total_spots: int = 0
+    spots_without_status: int = 0
+    by_status: Dict[str, int] = {}
+    by_type: Dict[str, int] = {}
+
+class ParkingOccupancy(Occupancy):
+    """Occupation d'un parking"""
+    parking_id: int
+
+class HotelOccupancy(Occupancy):
+    """Occupation d'un hôtel, au total et par parking"""
+    hotel_id: int
+    parkings: List[ParkingOccupancy] = []
+
 class ParkingBase(BaseModel):
     """Schéma de base pour un parking"""
     name: str
@@ -147,6 +345,11 @@ class ParkingWithoutSpots(ParkingBase):
     class Config:
         from_attributes = True
 
+class ParkingPage(BaseModel):
+    """Page de parkings avec le curseur de la page suivante"""
+    items: List[ParkingWithoutSpots]
+    next_cursor: Optional[str] = None
+
 class HotelBase(BaseModel):
     """Schéma de base pour un hôtel"""
     name: str
@@ -174,4 +377,66 @@ class HotelWithoutParkings(HotelBase):
     id: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class HotelPage(BaseModel):
+    """Page d'hôtels avec le curseur de la page suivante"""
+    items: List[HotelWithoutParkings]
+    next_cursor: Optional[str] = None
+
+class DeletedEntities(BaseModel):
+    """IDs des entités supprimées (les parkings et emplacements d'un hôtel ou d'un parking supprimé n'y figurent pas)"""
+    hotels: List[int] = []
+    parkings: List[int] = []
+    spots: List[int] = []
+
+class ChangeSet(BaseModel):
+    """
+    Modifications compactées depuis une position du journal : état courant des entités
+    créées ou modifiées et IDs des entités supprimées
+    """
+    since: int
+    next: int
+    has_more: bool = False
+    hotels: List[HotelWithoutParkings] = []
+    parkings: List[ParkingWithoutSpots] = []
+    spots: List[ParkingSpotInDB] = []
+    deleted: DeletedEntities = DeletedEntities()
+
+# Champs partiels (?fields=) : sous-schémas construits à la demande et mis en cache
+def parse_fields(schema: Type[BaseModel], fields: str) -> Tuple[str, ...]:
+    """
+    Lire une liste de champs séparés par des virgules ; l'ID est toujours inclus et
+    l'ordre des champs est celui du schéma. Lève ValueError pour un champ inconnu.
+    """
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - schema.model_fields.keys())
+    if unknown:
+        raise ValueError(f"Champs inconnus : {', '.join(unknown)}")
+    return tuple(name for name in schema.model_fields if name in requested or name == "id")
+
+@lru_cache(maxsize=None)
+def partial_schema(schema: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """Sous-schéma limité à fields, avec les validateurs de ces champs"""
+    validators = {}
+    for name, decorator in schema.__pydantic_decorators__.field_validators.items():
+        selected = [field for field in decorator.info.fields if field in fields]
+        if selected:
+            validators[name] = field_validator(*selected, mode=decorator.info.mode)(
+                classmethod(decorator.func.__func__)
+            )
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        __validators__=validators,
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields},
+    )
+
+@lru_cache(maxsize=None)
+def partial_page_schema(item_schema: Type[BaseModel]) -> Type[BaseModel]:
+    """Page de sous-schémas avec le curseur de la page suivante"""
+    return create_model(
+        f"{item_schema.__name__}Page",
+        items=(List[item_schema], ...),
+        next_cursor=(Optional[str], None),
+    )
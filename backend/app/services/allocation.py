@@ -0,0 +1,201 @@
+"""
+Affectation en lot des emplacements aux arrivées du jour
+
+La matrice de faisabilité arrivées × emplacements est calculée ligne par ligne sous
+forme de bitmaps (un entier par emplacement, bit i = l'arrivée i y rentre) : les
+arrivées sont triées par longueur, largeur et hauteur, et les arrivées compatibles
+avec un emplacement sont l'intersection de trois préfixes pré-calculés.
+
+Le coût ne dépend que de l'emplacement (surface ou tarif) : les ensembles
+d'emplacements pouvant être tous affectés forment un matroïde transversal, dont
+une base de coût minimal est obtenue en parcourant les emplacements par coût
+croissant et en gardant ceux pour lesquels un chemin augmentant existe (algorithme
+de Kuhn sur les bitmaps). Le résultat place le nombre maximal d'arrivées au coût
+total minimal.
+"""
+import asyncio
+import math
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.repositories.parking import HotelRepository, ParkingSpotRepository, StatusRepository
+from app.schemas.parking import AllocationRequest, AllocationResult, ArrivalRequest
+
+# Statut posé sur les emplacements affectés
+ARRIVAL_STATUS = "arrival_today"
+
+
+def _prefix_masks(values: Sequence[float]) -> Tuple[List[float], List[int]]:
+    """
+    Trier les valeurs et calculer masks[k] = bitmap des k plus petites :
+    les arrivées dont la valeur est <= x sont masks[bisect_right(sorted_values, x)]
+    """
+    order = sorted(range(len(values)), key=values.__getitem__)
+    masks = [0]
+    mask = 0
+    for index in order:
+        mask |= 1 << index
+        masks.append(mask)
+    return [values[index] for index in order], masks
+
+
+def _spot_limit(value: Optional[float]) -> float:
+    # Dimension non renseignée (place extérieure, sans hauteur limite) : pas de limite
+    return math.inf if value is None else value
+
+
+def build_feasibility(arrivals: Sequence[ArrivalRequest], spots: Sequence[Dict[str, Any]]) -> List[int]:
+    """Calculer pour chaque emplacement le bitmap des arrivées qui peuvent y être placées"""
+    lengths, length_masks = _prefix_masks([arrival.length or 0 for arrival in arrivals])
+    widths, width_masks = _prefix_masks([arrival.width or 0 for arrival in arrivals])
+    heights, height_masks = _prefix_masks([arrival.height or 0 for arrival in arrivals])
+    needs_pmr = needs_charging = 0
+    for index, arrival in enumerate(arrivals):
+        if arrival.pmr:
+            needs_pmr |= 1 << index
+        if arrival.electric_charging:
+            needs_charging |= 1 << index
+
+    rows = []
+    for spot in spots:
+        row = (
+            length_masks[bisect_right(lengths, _spot_limit(spot["length"]))]
+            & width_masks[bisect_right(widths, _spot_limit(spot["width"]))]
+            & height_masks[bisect_right(heights, _spot_limit(spot["height"]))]
+        )
+        if not spot["pmr"]:
+            row &= ~needs_pmr
+        if not spot["electric_charging"]:
+            row &= ~needs_charging
+        rows.append(row)
+    return rows
+
+
+def match_min_cost(rows: Sequence[int], order: Sequence[int], arrival_count: int) -> Dict[int, int]:
+    """
+    Affecter les arrivées aux emplacements parcourus dans l'ordre de coût croissant ;
+    retourne le mapping arrivée → position de l'emplacement
+    """
+    free = (1 << arrival_count) - 1
+    assigned: Dict[int, int] = {}
+    # Arrivées dont on sait qu'elles ne mènent à aucune arrivée libre (matching inchangé)
+    dead_ends = 0
+
+    for spot in order:
+        if not free:
+            break
+        if not rows[spot]:
+            continue
+
+        # Parcours en profondeur itératif : spots[k] prendrait l'arrivée path[k]
+        spots = [spot]
+        path: List[int] = []
+        pending = [rows[spot]]
+        while spots:
+            candidates = pending[-1] & ~dead_ends
+            direct = candidates & free
+            if direct:
+                arrival = (direct & -direct).bit_length() - 1
+                free &= ~(1 << arrival)
+                for position, target in zip(spots, path + [arrival]):
+                    assigned[target] = position
+                dead_ends = 0
+                break
+            if not candidates:
+                spots.pop()
+                pending.pop()
+                if path:
+                    path.pop()
+                continue
+            lowest = candidates & -candidates
+            pending[-1] = candidates ^ lowest
+            dead_ends |= lowest
+            arrival = lowest.bit_length() - 1
+            path.append(arrival)
+            spots.append(assigned[arrival])
+            pending.append(rows[assigned[arrival]])
+    return assigned
+
+
+def allocate(
+    arrivals: Sequence[ArrivalRequest],
+    spots: Sequence[Dict[str, Any]],
+    objective: str = "surface",
+    preserve_special: bool = True,
+) -> Dict[str, Any]:
+    """Calculer l'affectation de coût minimal des arrivées aux emplacements"""
+    costs = [spot[objective] or 0 for spot in spots]
+    if preserve_special:
+        rank = [int(bool(spot["pmr"])) + int(bool(spot["electric_charging"])) for spot in spots]
+        order = sorted(range(len(spots)), key=lambda position: (rank[position], costs[position]))
+    else:
+        order = sorted(range(len(spots)), key=costs.__getitem__)
+
+    assigned = match_min_cost(build_feasibility(arrivals, spots), order, len(arrivals))
+
+    assignments = []
+    for index in sorted(assigned):
+        spot = spots[assigned[index]]
+        assignments.append({
+            "index": index,
+            "reference": arrivals[index].reference,
+            "spot_id": spot["id"],
+            "parking_id": spot["parking_id"],
+            "number": spot["number"],
+            "cost": costs[assigned[index]],
+        })
+    return {
+        "assignments": assignments,
+        "unassigned": [index for index in range(len(arrivals)) if index not in assigned],
+        "total_cost": sum(assignment["cost"] for assignment in assignments),
+    }
+
+
+class AllocationService:
+    """Service d'affectation des emplacements aux arrivées"""
+
+    @staticmethod
+    def get_candidates(db: Session, hotel_id: int, request: AllocationRequest) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Récupérer les emplacements libres de l'hôtel et l'ID du statut à poser (avec apply)"""
+        if HotelRepository.get_hotel_by_id(db, hotel_id) is None:
+            raise HTTPException(status_code=404, detail=f"Hôtel avec l'ID {hotel_id} non trouvé")
+
+        busy_status_ids: Optional[List[int]] = None
+        if request.busy_statuses is not None:
+            busy_status_ids = list(StatusRepository.get_status_ids_by_values(db, request.busy_statuses).values())
+
+        arrival_status_id: Optional[int] = None
+        if request.apply:
+            arrival_status_id = StatusRepository.get_status_ids_by_values(db, [ARRIVAL_STATUS]).get(ARRIVAL_STATUS)
+            if arrival_status_id is None:
+                raise HTTPException(status_code=400, detail=f"Statuts inconnus : {ARRIVAL_STATUS}")
+
+        return ParkingSpotRepository.get_allocatable_spots(db, hotel_id, busy_status_ids), arrival_status_id
+
+    @staticmethod
+    def apply_allocation(db: Session, result: Dict[str, Any], arrival_status_id: Optional[int]) -> Dict[str, Any]:
+        """Poser le statut d'arrivée sur les emplacements affectés (si arrival_status_id est fourni)"""
+        if arrival_status_id is not None and result["assignments"]:
+            ParkingSpotRepository.bulk_update_statuses(
+                db, "add", [arrival_status_id],
+                spot_ids=[assignment["spot_id"] for assignment in result["assignments"]]
+            )
+        result["applied"] = arrival_status_id is not None and bool(result["assignments"])
+        return result
+
+    @staticmethod
+    async def allocate_arrivals(db: AsyncSession, hotel_id: int, request: AllocationRequest) -> AllocationResult:
+        """
+        Affecter les emplacements libres d'un hôtel à une liste d'arrivées. Le calcul de
+        l'affectation est fait dans un thread, hors de la boucle d'événements ; la lecture
+        et l'écriture restent dans la même transaction.
+        """
+        spots, arrival_status_id = await db.run_sync(AllocationService.get_candidates, hotel_id, request)
+        result = await asyncio.to_thread(
+            allocate, request.arrivals, spots, request.objective, request.preserve_special
+        )
+        return await db.run_sync(AllocationService.apply_allocation, result, arrival_status_id)
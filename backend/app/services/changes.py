@@ -0,0 +1,99 @@
+"""
+Synchronisation incrémentale de l'inventaire à partir du journal des modifications
+
+Un client garde la position (next) de sa dernière synchronisation et demande les
+modifications suivantes : les lignes du journal sont compactées par entité (une entité
+créée puis supprimée disparaît, plusieurs modifications n'en font qu'une) et l'état
+courant des entités créées ou modifiées est relu, si bien que le coût dépend du nombre
+de modifications et non de la taille de l'inventaire.
+"""
+from typing import Any, Dict, Optional, Set
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.repositories.change_log import ChangeLogRepository
+from app.repositories.parking import HotelRepository, ParkingRepository, ParkingSpotRepository
+
+CHANGES_PAGE_SIZE = 1000
+
+# Entités du journal → clés de la réponse
+ENTITY_KEYS = {"hotel": "hotels", "parking": "parkings", "spot": "spots"}
+
+
+class ChangeService:
+    """Service de synchronisation incrémentale"""
+
+    @staticmethod
+    def get_changes(
+        db: Session,
+        since: Optional[int] = None,
+        hotel_id: Optional[int] = None,
+        limit: int = CHANGES_PAGE_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        Récupérer les modifications compactées après la position since (au plus limit
+        lignes du journal ; has_more indique qu'il faut rappeler avec since=next). Sans
+        since, retourne seulement la position courante, à lire avant un chargement complet.
+        """
+        first, last = ChangeLogRepository.get_bounds(db)
+        if since is None:
+            return {
+                "since": last, "next": last, "has_more": False, "hotels": [], "parkings": [], "spots": [],
+                "deleted": {key: [] for key in ENTITY_KEYS.values()},
+            }
+        if since > last or since < first - 1:
+            # Position purgée du journal (ou d'une autre base) : les modifications
+            # intermédiaires ne sont plus disponibles
+            raise HTTPException(
+                status_code=410,
+                detail=f"Position {since} hors du journal des modifications : rechargez l'inventaire",
+            )
+
+        until = ChangeLogRepository.get_settled_position(db, since, last)
+        entries = ChangeLogRepository.get_entries(db, since, until, hotel_id, limit)
+        has_more = len(entries) == limit
+
+        created: Set[tuple] = set()
+        last_ops: Dict[tuple, str] = {}
+        # La capacité d'un parking suit la création et la suppression de ses emplacements
+        resized_parkings: Set[int] = set()
+        for entry in entries:
+            key = (entry.entity, entry.entity_id)
+            if key not in last_ops and entry.op == "create":
+                created.add(key)
+            last_ops[key] = entry.op
+            if entry.entity == "spot" and entry.op in ("create", "delete"):
+                resized_parkings.add(entry.parking_id)
+
+        changed = {key: set() for key in ENTITY_KEYS.values()}
+        deleted = {key: set() for key in ENTITY_KEYS.values()}
+        for (entity, entity_id), op in last_ops.items():
+            if op != "delete":
+                changed[ENTITY_KEYS[entity]].add(entity_id)
+            elif (entity, entity_id) not in created:
+                deleted[ENTITY_KEYS[entity]].add(entity_id)
+        changed["parkings"].update(resized_parkings - deleted["parkings"])
+
+        result: Dict[str, Any] = {
+            "since": since,
+            "next": entries[-1].id if has_more else until,
+            "has_more": has_more,
+        }
+        readers = {
+            "hotels": HotelRepository.get_hotel_rows_by_ids,
+            "parkings": ParkingRepository.get_parking_rows_by_ids,
+            "spots": ParkingSpotRepository.get_spot_rows_by_ids,
+        }
+        for key, read_rows in readers.items():
+            rows = read_rows(db, changed[key]) if changed[key] else []
+            result[key] = rows
+            # Supprimée depuis (ligne suivante du journal, ou avec son parent)
+            deleted[key].update(changed[key] - {row["id"] for row in rows})
+        result["deleted"] = {key: sorted(ids) for key, ids in deleted.items()}
+        return result
+
+    @staticmethod
+    def truncate_change_log(db: Session, retention: float) -> int:
+        """Purger les lignes du journal plus anciennes que retention secondes"""
+        return ChangeLogRepository.truncate(db, retention)
@@ -0,0 +1,71 @@
+"""
+Export en flux (NDJSON ou CSV) de l'inventaire des emplacements
+
+Les emplacements sont lus par un curseur côté serveur (stream_results / yield_per) :
+chaque lot est complété par deux requêtes (types et statuts du lot) sur une seconde
+connexion, formaté puis envoyé, si bien que la mémoire utilisée ne dépend que de la
+taille d'un lot, quel que soit le nombre d'emplacements exportés.
+"""
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.repositories.parking import ParkingSpotRepository
+from database import async_engine
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FIELDS = [
+    "id", "hotel_id", "parking_id", "number", "floor", "section", "address",
+    "length", "width", "height", "surface",
+    "electric_charging", "camera", "sensor",
+    "hourly_rate", "daily_rate", "monthly_rate",
+    "types", "statuses",
+]
+
+
+class ExportService:
+    """Service d'export des emplacements"""
+
+    @staticmethod
+    async def spot_batches(
+        hotel_id: Optional[int] = None,
+        parking_id: Optional[int] = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Parcourir les emplacements par lots, avec leurs types et statuts"""
+        query = ParkingSpotRepository.export_query(hotel_id, parking_id).execution_options(yield_per=batch_size)
+        # Le curseur côté serveur occupe sa connexion jusqu'à la fin du parcours :
+        # les types et statuts de chaque lot sont lus sur une seconde connexion
+        async with async_engine.connect() as stream_connection, async_engine.connect() as lookup_connection:
+            result = await stream_connection.stream(query)
+            async for rows in result.mappings().partitions(batch_size):
+                spots = {row["id"]: {**row, "types": [], "statuses": []} for row in rows}
+                types_query, statuses_query = ParkingSpotRepository.export_relations_queries(list(spots))
+                for key, relation_query in (("types", types_query), ("statuses", statuses_query)):
+                    for spot_id, value in await lookup_connection.execute(relation_query):
+                        spots[spot_id][key].append(value)
+                yield list(spots.values())
+
+    @staticmethod
+    async def export_ndjson(hotel_id: Optional[int] = None, parking_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Emplacements au format NDJSON (un objet JSON par ligne)"""
+        async for spots in ExportService.spot_batches(hotel_id, parking_id):
+            yield "".join(json.dumps(spot, ensure_ascii=False) + "\n" for spot in spots).encode()
+
+    @staticmethod
+    async def export_csv(hotel_id: Optional[int] = None, parking_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Emplacements au format CSV (types et statuts séparés par des |)"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        yield buffer.getvalue().encode()
+        async for spots in ExportService.spot_batches(hotel_id, parking_id):
+            buffer.seek(0)
+            buffer.truncate()
+            for spot in spots:
+                spot["types"] = "|".join(spot["types"])
+                spot["statuses"] = "|".join(spot["statuses"])
+                writer.writerow([spot[field] for field in EXPORT_FIELDS])
+            yield buffer.getvalue().encode()
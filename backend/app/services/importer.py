@@ -0,0 +1,338 @@
+"""
+Import en flux d'emplacements (CSV ou NDJSON) avec création des hôtels et parkings
+
+Le fichier est lu au fil de l'eau : les octets reçus sont découpés en enregistrements
+complets (lignes NDJSON, ou lignes CSV dont les guillemets sont équilibrés), puis
+traités par lots. Pour chaque lot, les lignes sont validées contre ParkingSpotCreate,
+les hôtels et parkings sont créés ou mis à jour par nom, et les emplacements, leurs
+types et leurs statuts sont insérés par des INSERT multi-lignes dans une transaction
+par lot. Les lignes invalides sont signalées avec leur numéro sans interrompre l'import.
+
+Colonnes attendues : hotel, parking (noms), les champs de ParkingSpotCreate, et
+optionnellement hotel_address, parking_description, parking_location et statuses.
+En CSV, types, statuses et pictures sont séparés par des |.
+"""
+import asyncio
+import codecs
+import csv
+import json
+import time
+from typing import Any, AsyncIterable, BinaryIO, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.repositories.availability import availability_index
+from app.repositories.cache import invalidate_occupancy
+from app.repositories.parking import HotelRepository, ParkingRepository, ParkingSpotRepository, StatusRepository
+from app.repositories.spot_events import spot_event_hub
+from app.schemas.parking import ParkingSpotCreate, SpotImportResult
+from app.services.parking import _store_pictures
+
+IMPORT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+READ_SIZE = 64 * 1024
+
+LIST_COLUMNS = ("types", "statuses", "pictures")
+HOTEL_COLUMNS = {"hotel_address": "address"}
+PARKING_COLUMNS = {"parking_description": "description", "parking_location": "location"}
+
+SPOT_ADAPTER = TypeAdapter(ParkingSpotCreate)
+
+# (numéro de ligne, enregistrement ou message d'erreur)
+Record = Tuple[int, Union[Dict[str, Any], str]]
+
+# (numéro de ligne, enregistrement, hôtel, parking, emplacement validé, statuts)
+ValidRecord = Tuple[int, Dict[str, Any], str, str, ParkingSpotCreate, List[str]]
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+    )
+
+
+class RecordParser:
+    """Découpage incrémental d'un flux d'octets en enregistrements CSV ou NDJSON"""
+
+    def __init__(self, format: str):
+        self.format = format
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._pending = ""
+        self._pending_quotes = 0
+        self._line = 0
+        self._header: Optional[List[str]] = None
+
+    def feed(self, data: bytes) -> List[Record]:
+        return self._parse(self._decoder.decode(data), final=False)
+
+    def close(self) -> List[Record]:
+        return self._parse(self._decoder.decode(b"", final=True), final=True)
+
+    def _split(self, text: str, final: bool) -> List[Tuple[int, str]]:
+        """Extraire les enregistrements complets (numéro de leur première ligne, texte)"""
+        lines = (self._pending + text).split("\n")
+        self._pending = "" if final else lines.pop()
+        records = []
+        current: List[str] = []
+        quotes = 0
+        start = self._line + 1
+        for line in lines:
+            self._line += 1
+            if self.format == "csv":
+                # Un saut de ligne entre guillemets fait partie du champ
+                current.append(line)
+                quotes += line.count('"')
+                if quotes % 2:
+                    continue
+                line = "\n".join(current)
+                current = []
+                quotes = 0
+            records.append((start, line))
+            start = self._line + 1
+        if current:
+            if final:
+                records.append((start, "\n".join(current)))
+            else:
+                # Champ CSV encore ouvert : attendre la suite du flux
+                self._line -= len(current)
+                self._pending = "\n".join(current + [self._pending])
+        return records
+
+    def _parse(self, text: str, final: bool) -> List[Record]:
+        records: List[Record] = []
+        split = self._split(text, final)
+        if self.format == "csv":
+            lines = [line for _, line in split]
+            for (number, line), values in zip(split, csv.reader(lines)):
+                if not line.strip():
+                    continue
+                if self._header is None:
+                    self._header = [column.strip() for column in values]
+                    continue
+                record: Dict[str, Any] = {}
+                for column, value in zip(self._header, values):
+                    if column in LIST_COLUMNS:
+                        record[column] = [item for item in value.split("|") if item]
+                    elif value != "":
+                        record[column] = value
+                records.append((number, record))
+        else:
+            for number, line in split:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as exc:
+                    records.append((number, f"JSON invalide : {exc}"))
+                    continue
+                if not isinstance(record, dict):
+                    records.append((number, "Un objet JSON est attendu"))
+                    continue
+                records.append((number, record))
+        return records
+
+
+class SpotImporter:
+    """Import par lots des enregistrements d'un fichier, avec bilan et erreurs par ligne"""
+
+    def __init__(self, progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.progress = progress
+        self.rows = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.started = time.perf_counter()
+        self._hotels: Dict[str, int] = {}
+        self._parkings: Dict[Tuple[int, str], int] = {}
+        self._hotel_ids: Set[int] = set()
+        self._parking_ids: Set[int] = set()
+
+    def _error(self, line: int, detail: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "detail": detail})
+
+    def import_chunk(self, db: Session, records: Sequence[Record]) -> None:
+        """Valider et insérer un lot d'enregistrements dans une transaction"""
+        self.store_chunk(db, self.validate_chunk(records))
+
+    def validate_chunk(self, records: Sequence[Record]) -> List[ValidRecord]:
+        """
+        Valider un lot d'enregistrements contre ParkingSpotCreate, sans accès à la base
+        (calcul seul : exécuté dans un thread par l'import en flux)
+        """
+        self.rows += len(records)
+        valid: List[ValidRecord] = []
+        for line, record in records:
+            if isinstance(record, str):
+                self._error(line, record)
+                continue
+            hotel_name = str(record.get("hotel") or "").strip()
+            parking_name = str(record.get("parking") or "").strip()
+            if not hotel_name or not parking_name:
+                self._error(line, "Les colonnes hotel et parking sont obligatoires")
+                continue
+            try:
+                spot = SPOT_ADAPTER.validate_python(record)
+                statuses = record.get("statuses") or []
+                if not isinstance(statuses, list) or not all(isinstance(value, str) for value in statuses):
+                    raise ValueError("statuses: une liste de valeurs de statut est attendue")
+                if spot.pictures:
+                    spot = spot.model_copy(update={"pictures": _store_pictures(spot.pictures)})
+            except ValidationError as exc:
+                self._error(line, _format_validation_error(exc))
+                continue
+            except ValueError as exc:
+                self._error(line, str(exc))
+                continue
+            valid.append((line, record, hotel_name, parking_name, spot, statuses))
+        return valid
+
+    def store_chunk(self, db: Session, valid: Sequence[ValidRecord]) -> None:
+        """Créer les hôtels et parkings et insérer les emplacements validés dans une transaction"""
+        if not valid:
+            self._report()
+            return
+
+        new_hotels: Dict[str, Dict[str, Any]] = {}
+        status_values: Set[str] = set()
+        for _, record, hotel_name, _, _, statuses in valid:
+            if hotel_name not in self._hotels and hotel_name not in new_hotels:
+                new_hotels[hotel_name] = {
+                    attribute: record[column] for column, attribute in HOTEL_COLUMNS.items() if column in record
+                }
+            status_values.update(statuses)
+
+        try:
+            self._hotels.update(HotelRepository.upsert_hotels_by_name(db, new_hotels))
+            new_parkings: Dict[Tuple[int, str], Dict[str, Any]] = {}
+            for _, record, hotel_name, parking_name, _, _ in valid:
+                key = (self._hotels[hotel_name], parking_name)
+                if key not in self._parkings and key not in new_parkings:
+                    new_parkings[key] = {
+                        attribute: record[column] for column, attribute in PARKING_COLUMNS.items() if column in record
+                    }
+            self._parkings.update(ParkingRepository.upsert_parkings_by_name(db, new_parkings))
+            status_ids = StatusRepository.get_status_ids_by_values(db, status_values)
+
+            by_parking: Dict[int, List[Tuple[int, ParkingSpotCreate, List[int]]]] = {}
+            for line, _, hotel_name, parking_name, spot, statuses in valid:
+                unknown = sorted(set(statuses) - status_ids.keys())
+                if unknown:
+                    self._error(line, f"Statuts inconnus : {', '.join(unknown)}")
+                    continue
+                parking_id = self._parkings[(self._hotels[hotel_name], parking_name)]
+                by_parking.setdefault(parking_id, []).append(
+                    (line, spot, [status_ids[value] for value in statuses])
+                )
+
+            created = 0
+            for parking_id, items in by_parking.items():
+                existing = ParkingSpotRepository.get_existing_numbers(
+                    db, parking_id, (spot.number for _, spot, _ in items)
+                )
+                spots = []
+                spot_status_ids = []
+                for line, spot, ids in items:
+                    if spot.number in existing:
+                        self._error(line, f"Un emplacement avec le numéro {spot.number} existe déjà dans ce parking")
+                        continue
+                    existing.add(spot.number)
+                    spots.append(spot)
+                    spot_status_ids.append(ids)
+                if spots:
+                    ParkingSpotRepository.insert_spots(db, spots, parking_id, spot_status_ids)
+                    created += len(spots)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Les hôtels et parkings créés dans ce lot n'existent plus
+            self._hotels.clear()
+            self._parkings.clear()
+            raise
+
+        self.created += created
+        self._hotel_ids.update(self._hotels[hotel_name] for _, _, hotel_name, _, _, _ in valid)
+        self._parking_ids.update(by_parking)
+        for parking_id in by_parking:
+            invalidate_occupancy(parking_id)
+        spot_event_hub.notify()
+        self._report()
+
+    def _report(self) -> None:
+        if self.progress is not None:
+            self.progress(self.summary())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "hotels": len(self._hotel_ids),
+            "parkings": len(self._parking_ids),
+            "error_count": self.error_count,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "duration": round(time.perf_counter() - self.started, 3),
+        }
+
+    def finish(self, db: Session) -> Dict[str, Any]:
+        """Recharger l'index de disponibilité des parkings importés et retourner le bilan"""
+        availability_index.reload_parkings(db, self._parking_ids)
+        return self.summary()
+
+
+class ImportService:
+    """Service d'import d'emplacements"""
+
+    @staticmethod
+    async def import_stream(
+        db: AsyncSession,
+        chunks: AsyncIterable[bytes],
+        format: str,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ) -> SpotImportResult:
+        """
+        Importer un flux d'octets reçu (corps de requête), lot par lot. La validation d'un
+        lot est faite dans un thread : run_sync exécute le code synchrone sur le thread de
+        la boucle d'événements, qui ne doit porter que les écritures.
+        """
+        parser = RecordParser(format)
+        importer = SpotImporter()
+        pending: List[Record] = []
+
+        async def import_chunk(records: List[Record]) -> None:
+            valid = await asyncio.to_thread(importer.validate_chunk, records)
+            await db.run_sync(importer.store_chunk, valid)
+
+        async for data in chunks:
+            pending.extend(parser.feed(data))
+            while len(pending) >= chunk_size:
+                await import_chunk(pending[:chunk_size])
+                del pending[:chunk_size]
+        pending.extend(parser.close())
+        if pending:
+            await import_chunk(pending)
+        return await db.run_sync(importer.finish)
+
+    @staticmethod
+    def import_file(
+        db: Session,
+        handle: BinaryIO,
+        format: str,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> SpotImportResult:
+        """Importer un fichier ouvert en binaire, lot par lot"""
+        parser = RecordParser(format)
+        importer = SpotImporter(progress)
+        pending: List[Record] = []
+        while True:
+            data = handle.read(READ_SIZE)
+            pending.extend(parser.feed(data) if data else parser.close())
+            while len(pending) >= chunk_size or (pending and not data):
+                importer.import_chunk(db, pending[:chunk_size])
+                del pending[:chunk_size]
+            if not data:
+                break
+        return importer.finish(db)
@@ -1,10 +1,16 @@
 """
 Services pour la logique métier - Hiérarchie à trois niveaux
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Sequence, Tuple, TypeVar
 from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.repositories.availability import availability_index
+from app.repositories.pagination import InvalidCursorError
+from app.repositories.picture_store import (
+    PictureTooLargeError, UnsupportedPictureError, decode_data_url, is_picture_hash, picture_store
+)
 from app.repositories.parking import (
     HotelRepository, ParkingRepository, ParkingSpotRepository,
     StatusRepository, SpotTypeRepository
@@ -12,26 +18,98 @@ from app.repositories.parking import (
 from app.schemas.parking import (
     HotelCreate, HotelUpdate, HotelInDB, HotelWithoutParkings,
     ParkingCreate, ParkingUpdate, ParkingInDB, ParkingWithoutSpots,
-    ParkingSpotCreate, ParkingSpotUpdate, ParkingSpotInDB,
-    StatusCreate, Status, SpotType
+    ParkingSpotCreate, ParkingSpotUpdate, ParkingSpotInDB, ParkingSpotDetail,
+    StatusCreate, Status, SpotType,
+    HotelPage, ParkingPage, ParkingSpotPage,
+    ParkingSpotBulkResult, SpotStatusBulkUpdate, SpotStatusBulkResult,
+    ParkingSpotSearch, HotelOccupancy, ParkingOccupancy,
+    AvailabilityQuery, AvailableSpot, PICTURE_URL_PREFIX
 )
 
+def _invalid_cursor(exc: InvalidCursorError) -> HTTPException:
+    return HTTPException(status_code=400, detail=str(exc))
+
+def _duplicate_spot_number(number: int) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"Un emplacement avec le numéro {number} existe déjà dans ce parking"
+    )
+
+def _store_pictures(pictures: List[str]) -> List[str]:
+    """
+    Ramener les photos d'un emplacement à des SHA-256 du stockage local : les data-URLs
+    sont enregistrées dans le stockage, les URLs /api/pictures/<sha256> réduites à leur
+    SHA-256 ; seules les URLs http(s) externes sont conservées telles quelles.
+    Lève ValueError pour une photo invalide.
+    """
+    stored = []
+    for picture in pictures:
+        if picture.startswith(PICTURE_URL_PREFIX):
+            picture = picture[len(PICTURE_URL_PREFIX):]
+        if is_picture_hash(picture):
+            if not picture_store.exists(picture):
+                raise ValueError(f"Photo {picture} absente du stockage")
+            stored.append(picture)
+        elif picture.startswith("data:"):
+            data = decode_data_url(picture)
+            if not data:
+                raise ValueError("Data-URL de photo invalide")
+            try:
+                sha256, _ = picture_store.save_bytes(data)
+            except (PictureTooLargeError, UnsupportedPictureError) as exc:
+                raise ValueError(str(exc))
+            picture_store.submit_thumbnail(sha256)
+            stored.append(sha256)
+        elif picture.startswith(("http://", "https://")):
+            stored.append(picture)
+        else:
+            raise ValueError("Photo invalide : attendu un SHA-256 de /api/pictures/, une data-URL ou une URL http(s)")
+    return stored
+
+def _invalid_picture(exc: ValueError) -> HTTPException:
+    return HTTPException(status_code=400, detail=str(exc))
+
+SpotT = TypeVar("SpotT", ParkingSpotCreate, ParkingSpotUpdate)
+
 class HotelService:
     """Service pour la gestion des hôtels"""
 
     @staticmethod
-    def get_all_hotels(db: Session, skip: int = 0, limit: int = 100) -> List[HotelWithoutParkings]:
+    def get_all_hotels(db: Session, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[HotelWithoutParkings]:
         """Récupérer tous les hôtels"""
-        return HotelRepository.get_all_hotels(db, skip, limit)
+        return HotelRepository.get_all_hotels(db, skip, limit, fields)
+
+    @staticmethod
+    def get_hotels_page(db: Session, cursor: Optional[str] = None, limit: int = 100, fields: Optional[Sequence[str]] = None) -> HotelPage:
+        """Récupérer une page d'hôtels à partir d'un curseur"""
+        try:
+            items, next_cursor = HotelRepository.get_hotels_page(db, cursor, limit, fields)
+        except InvalidCursorError as exc:
+            raise _invalid_cursor(exc)
+        return {"items": items, "next_cursor": next_cursor}
 
     @staticmethod
     def get_hotel_by_id(db: Session, hotel_id: int) -> HotelInDB:
         """Récupérer un hôtel par son ID"""
-        db_hotel = HotelRepository.get_hotel_by_id(db, hotel_id)
+        db_hotel = HotelRepository.get_hotel_by_id(db, hotel_id, load_tree=True)
         if db_hotel is None:
             raise HTTPException(status_code=404, detail=f"Hôtel avec l'ID {hotel_id} non trouvé")
         return db_hotel
 
+    @staticmethod
+    def get_hotel_version(db: Session, hotel_id: int) -> Optional[str]:
+        """Version de l'hôtel et de son arborescence (ETag), None s'il n'existe pas"""
+        version = HotelRepository.get_version(db, hotel_id)
+        return None if version is None else f"hotel-{hotel_id}-{version}"
+
+    @staticmethod
+    def get_hotel_occupancy(db: Session, hotel_id: int) -> HotelOccupancy:
+        """Récupérer l'occupation d'un hôtel par statut et par type"""
+        db_hotel = HotelRepository.get_hotel_by_id(db, hotel_id)
+        if db_hotel is None:
+            raise HTTPException(status_code=404, detail=f"Hôtel avec l'ID {hotel_id} non trouvé")
+        return HotelRepository.get_occupancy(db, hotel_id)
+
     @staticmethod
     def create_hotel(db: Session, hotel: HotelCreate) -> HotelInDB:
         """Créer un nouvel hôtel"""
@@ -53,8 +131,8 @@ class HotelService:
             if existing_hotel:
                 raise HTTPException(status_code=400, detail=f"Un hôtel avec le nom '{hotel.name}' existe déjà")
                 
-        updated_hotel = HotelRepository.update_hotel(db, hotel_id, hotel.dict(exclude_unset=True))
-        return updated_hotel
+        HotelRepository.update_hotel(db, hotel_id, hotel.model_dump(exclude_unset=True))
+        return HotelRepository.get_hotel_by_id(db, hotel_id, load_tree=True)
 
     @staticmethod
     def delete_hotel(db: Session, hotel_id: int) -> Dict[str, bool]:
@@ -70,7 +148,7 @@ class ParkingService:
     """Service pour la gestion des parkings"""
 
     @staticmethod
-    def get_all_parkings(db: Session, hotel_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[ParkingWithoutSpots]:
+    def get_all_parkings(db: Session, hotel_id: Optional[int] = None, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[ParkingWithoutSpots]:
         """Récupérer tous les parkings, optionnellement filtrés par hôtel"""
         # Vérifier si l'hôtel existe si un hotel_id est fourni
         if hotel_id:
@@ -78,16 +156,38 @@ class ParkingService:
             if db_hotel is None:
                 raise HTTPException(status_code=404, detail=f"Hôtel avec l'ID {hotel_id} non trouvé")
                 
-        return ParkingRepository.get_all_parkings(db, hotel_id, skip, limit)
+        return ParkingRepository.get_all_parkings(db, hotel_id, skip, limit, fields)
+
+    @staticmethod
+    def get_parkings_page(db: Session, hotel_id: Optional[int] = None, cursor: Optional[str] = None, limit: int = 100, fields: Optional[Sequence[str]] = None) -> ParkingPage:
+        """Récupérer une page de parkings à partir d'un curseur, optionnellement filtrés par hôtel"""
+        if hotel_id:
+            db_hotel = HotelRepository.get_hotel_by_id(db, hotel_id)
+            if db_hotel is None:
+                raise HTTPException(status_code=404, detail=f"Hôtel avec l'ID {hotel_id} non trouvé")
+
+        try:
+            items, next_cursor = ParkingRepository.get_parkings_page(db, hotel_id, cursor, limit, fields)
+        except InvalidCursorError as exc:
+            raise _invalid_cursor(exc)
+        return {"items": items, "next_cursor": next_cursor}
 
     @staticmethod
     def get_parking_by_id(db: Session, parking_id: int) -> ParkingInDB:
         """Récupérer un parking par son ID"""
-        db_parking = ParkingRepository.get_parking_by_id(db, parking_id)
+        db_parking = ParkingRepository.get_parking_by_id(db, parking_id, load_tree=True)
         if db_parking is None:
             raise HTTPException(status_code=404, detail=f"Parking avec l'ID {parking_id} non trouvé")
         return db_parking
 
+    @staticmethod
+    def get_parking_occupancy(db: Session, parking_id: int) -> ParkingOccupancy:
+        """Récupérer l'occupation d'un parking par statut et par type"""
+        db_parking = ParkingRepository.get_parking_by_id(db, parking_id)
+        if db_parking is None:
+            raise HTTPException(status_code=404, detail=f"Parking avec l'ID {parking_id} non trouvé")
+        return ParkingRepository.get_occupancy(db, parking_id)
+
     @staticmethod
     def create_parking(db: Session, parking: ParkingCreate, hotel_id: int) -> ParkingInDB:
         """Créer un nouveau parking"""
@@ -105,8 +205,8 @@ class ParkingService:
         if db_parking is None:
             raise HTTPException(status_code=404, detail=f"Parking avec l'ID {parking_id} non trouvé")
                     
-        updated_parking = ParkingRepository.update_parking(db, parking_id, parking.dict(exclude_unset=True))
-        return updated_parking
+        ParkingRepository.update_parking(db, parking_id, parking.model_dump(exclude_unset=True))
+        return ParkingRepository.get_parking_by_id(db, parking_id, load_tree=True)
 
     @staticmethod
     def delete_parking(db: Session, parking_id: int) -> Dict[str, bool]:
@@ -122,7 +222,44 @@ class ParkingSpotService:
     """Service pour la gestion des emplacements de parking"""
 
     @staticmethod
-    def get_all_spots(db: Session, parking_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[ParkingSpotInDB]:
+    def store_pictures(spot: SpotT) -> SpotT:
+        """
+        Enregistrer les photos d'un emplacement dans le stockage, sans accès à la base
+        (décodage, SHA-256 et écriture : exécuté dans un thread par les endpoints async).
+        Les services de création et de mise à jour ne font ensuite que vérifier les SHA-256.
+        """
+        if not spot.pictures:
+            return spot
+        try:
+            return spot.model_copy(update={"pictures": _store_pictures(spot.pictures)})
+        except ValueError as exc:
+            raise _invalid_picture(exc)
+
+    @staticmethod
+    def store_bulk_pictures(spots: List[ParkingSpotCreate]) -> Tuple[List[ParkingSpotCreate], Dict[int, str]]:
+        """
+        Enregistrer les photos d'un lot d'emplacements (voir store_pictures) ; retourne
+        le lot et les erreurs de photo par indice, signalées ensuite par bulk_create_spots
+        """
+        stored = []
+        picture_errors = {}
+        for index, spot in enumerate(spots):
+            if spot.pictures:
+                try:
+                    spot = spot.model_copy(update={"pictures": _store_pictures(spot.pictures)})
+                except ValueError as exc:
+                    picture_errors[index] = str(exc)
+            stored.append(spot)
+        return stored, picture_errors
+
+    @staticmethod
+    def get_parking_spots_version(db: Session, parking_id: int) -> Optional[str]:
+        """Version des emplacements d'un parking (ETag), None si le parking n'existe pas"""
+        version = ParkingRepository.get_version(db, parking_id)
+        return None if version is None else f"parking-{parking_id}-{version}"
+
+    @staticmethod
+    def get_all_spots(db: Session, parking_id: Optional[int] = None, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[ParkingSpotInDB]:
         """Récupérer tous les emplacements, optionnellement filtrés par parking"""
         # Vérifier si le parking existe si un parking_id est fourni
         if parking_id:
@@ -130,18 +267,78 @@ class ParkingSpotService:
             if db_parking is None:
                 raise HTTPException(status_code=404, detail=f"Parking avec l'ID {parking_id} non trouvé")
                 
-        return ParkingSpotRepository.get_all_spots(db, parking_id, skip, limit)
+        return ParkingSpotRepository.get_all_spots(db, parking_id, skip, limit, fields)
 
     @staticmethod
-    def get_spot_by_id(db: Session, spot_id: int) -> ParkingSpotInDB:
+    def get_spots_page(db: Session, parking_id: Optional[int] = None, cursor: Optional[str] = None, limit: int = 100, fields: Optional[Sequence[str]] = None) -> ParkingSpotPage:
+        """Récupérer une page d'emplacements à partir d'un curseur, optionnellement filtrés par parking"""
+        if parking_id:
+            db_parking = ParkingRepository.get_parking_by_id(db, parking_id)
+            if db_parking is None:
+                raise HTTPException(status_code=404, detail=f"Parking avec l'ID {parking_id} non trouvé")
+
+        try:
+            items, next_cursor = ParkingSpotRepository.get_spots_page(db, parking_id, cursor, limit, fields)
+        except InvalidCursorError as exc:
+            raise _invalid_cursor(exc)
+        return {"items": items, "next_cursor": next_cursor}
+
+    @staticmethod
+    def get_spot_rows(db: Session, parking_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Récupérer des emplacements en lignes au format de ParkingSpotInDB (sans objets ORM)"""
+        if parking_id and ParkingRepository.get_version(db, parking_id) is None:
+            raise HTTPException(status_code=404, detail=f"Parking avec l'ID {parking_id} non trouvé")
+        return ParkingSpotRepository.get_spot_rows(db, parking_id, skip, limit)
+
+    @staticmethod
+    def get_spot_rows_page(db: Session, parking_id: Optional[int] = None, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """Récupérer une page d'emplacements en lignes au format de ParkingSpotPage (sans objets ORM)"""
+        if parking_id and ParkingRepository.get_version(db, parking_id) is None:
+            raise HTTPException(status_code=404, detail=f"Parking avec l'ID {parking_id} non trouvé")
+        try:
+            items, next_cursor = ParkingSpotRepository.get_spot_rows_page(db, parking_id, cursor, limit)
+        except InvalidCursorError as exc:
+            raise _invalid_cursor(exc)
+        return {"items": items, "next_cursor": next_cursor}
+
+    @staticmethod
+    def search_spots(db: Session, filters: ParkingSpotSearch) -> ParkingSpotPage:
+        """Rechercher des emplacements selon des critères combinables"""
+        try:
+            items, next_cursor = ParkingSpotRepository.search_spots(db, filters)
+        except InvalidCursorError as exc:
+            raise _invalid_cursor(exc)
+        return {"items": items, "next_cursor": next_cursor}
+
+    @staticmethod
+    def find_available_spots(filters: AvailabilityQuery) -> List[AvailableSpot]:
+        """Rechercher des emplacements libres dans l'index mémoire (sans requête SQL)"""
+        return availability_index.find(
+            hotel_id=filters.hotel_id,
+            parking_id=filters.parking_id,
+            limit=filters.limit,
+            types=filters.types,
+            equipment=[
+                flag for flag in ("electric_charging", "camera", "sensor")
+                if getattr(filters, flag)
+            ],
+            busy_statuses=filters.busy_statuses,
+            min_length=filters.min_length,
+            min_width=filters.min_width,
+            min_height=filters.min_height,
+            floor=filters.floor,
+        )
+
+    @staticmethod
+    def get_spot_by_id(db: Session, spot_id: int) -> ParkingSpotDetail:
         """Récupérer un emplacement par son ID"""
-        db_spot = ParkingSpotRepository.get_spot_by_id(db, spot_id)
+        db_spot = ParkingSpotRepository.get_spot_by_id(db, spot_id, load_relations=True)
         if db_spot is None:
             raise HTTPException(status_code=404, detail=f"Emplacement avec l'ID {spot_id} non trouvé")
         return db_spot
 
     @staticmethod
-    def create_spot(db: Session, spot: ParkingSpotCreate, parking_id: int) -> ParkingSpotInDB:
+    def create_spot(db: Session, spot: ParkingSpotCreate, parking_id: int) -> ParkingSpotDetail:
         """Créer un nouvel emplacement de parking"""
         # Vérifier si le parking existe
         db_parking = ParkingRepository.get_parking_by_id(db, parking_id)
@@ -149,18 +346,78 @@ class ParkingSpotService:
             raise HTTPException(status_code=404, detail=f"Parking avec l'ID {parking_id} non trouvé")
             
         # Vérifier si le numéro d'emplacement n'est pas déjà utilisé dans ce parking
-        existing_spots = ParkingSpotRepository.get_all_spots(db, parking_id)
-        for existing_spot in existing_spots:
-            if existing_spot.number == spot.number:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Un emplacement avec le numéro {spot.number} existe déjà dans ce parking"
-                )
-                
-        return ParkingSpotRepository.create_spot(db, spot, parking_id)
+        # (l'index unique parking/numéro couvre aussi les créations concurrentes)
+        if ParkingSpotRepository.number_exists(db, parking_id, spot.number):
+            raise _duplicate_spot_number(spot.number)
+
+        try:
+            spot = spot.model_copy(update={"pictures": _store_pictures(spot.pictures)})
+        except ValueError as exc:
+            raise _invalid_picture(exc)
+
+        try:
+            return ParkingSpotRepository.create_spot(db, spot, parking_id)
+        except IntegrityError:
+            db.rollback()
+            raise _duplicate_spot_number(spot.number)
+
+    @staticmethod
+    def bulk_create_spots(
+        db: Session,
+        spots: List[ParkingSpotCreate],
+        parking_id: int,
+        picture_errors: Optional[Dict[int, str]] = None,
+    ) -> ParkingSpotBulkResult:
+        """
+        Créer des emplacements en lot, les éléments en erreur étant signalés individuellement
+        (picture_errors : erreurs de photo déjà relevées par store_bulk_pictures)
+        """
+        picture_errors = picture_errors or {}
+        db_parking = ParkingRepository.get_parking_by_id(db, parking_id)
+        if db_parking is None:
+            raise HTTPException(status_code=404, detail=f"Parking avec l'ID {parking_id} non trouvé")
+
+        existing_numbers = ParkingSpotRepository.get_existing_numbers(
+            db, parking_id, (spot.number for spot in spots)
+        )
+
+        errors = []
+        valid_spots = []
+        seen_numbers = set()
+        for index, spot in enumerate(spots):
+            if spot.number in existing_numbers:
+                detail = f"Un emplacement avec le numéro {spot.number} existe déjà dans ce parking"
+            elif spot.number in seen_numbers:
+                detail = f"Le numéro {spot.number} est présent plusieurs fois dans la requête"
+            elif index in picture_errors:
+                detail = picture_errors[index]
+            else:
+                try:
+                    pictures = _store_pictures(spot.pictures)
+                except ValueError as exc:
+                    detail = str(exc)
+                else:
+                    seen_numbers.add(spot.number)
+                    valid_spots.append(spot.model_copy(update={"pictures": pictures}))
+                    continue
+            errors.append({"index": index, "number": spot.number, "detail": detail})
+
+        try:
+            spot_ids = ParkingSpotRepository.bulk_create_spots(db, valid_spots, parking_id)
+        except IntegrityError:
+            # Numéros créés entre la vérification et l'insertion par une autre requête
+            raise HTTPException(
+                status_code=400,
+                detail="Un ou plusieurs numéros d'emplacement existent déjà dans ce parking"
+            )
+        return {
+            "created": len(valid_spots),
+            "spot_ids": [spot_ids[spot.number] for spot in valid_spots],
+            "errors": errors,
+        }
 
     @staticmethod
-    def update_spot(db: Session, spot_id: int, spot: ParkingSpotUpdate) -> ParkingSpotInDB:
+    def update_spot(db: Session, spot_id: int, spot: ParkingSpotUpdate) -> ParkingSpotDetail:
         """Mettre à jour un emplacement de parking"""
         db_spot = ParkingSpotRepository.get_spot_by_id(db, spot_id)
         if db_spot is None:
@@ -168,15 +425,20 @@ class ParkingSpotService:
             
         # Vérifier si le numéro est déjà utilisé (seulement si le numéro est modifié)
         if spot.number is not None and spot.number != db_spot.number:
-            existing_spots = ParkingSpotRepository.get_all_spots(db, db_spot.parking_id)
-            for existing_spot in existing_spots:
-                if existing_spot.number == spot.number and existing_spot.id != spot_id:
-                    raise HTTPException(
-                        status_code=400, 
-                        detail=f"Un emplacement avec le numéro {spot.number} existe déjà dans ce parking"
-                    )
-                    
-        updated_spot = ParkingSpotRepository.update_spot(db, spot_id, spot)
+            if ParkingSpotRepository.number_exists(db, db_spot.parking_id, spot.number, exclude_spot_id=spot_id):
+                raise _duplicate_spot_number(spot.number)
+
+        if spot.pictures is not None:
+            try:
+                spot = spot.model_copy(update={"pictures": _store_pictures(spot.pictures)})
+            except ValueError as exc:
+                raise _invalid_picture(exc)
+
+        try:
+            updated_spot = ParkingSpotRepository.update_spot(db, spot_id, spot)
+        except IntegrityError:
+            db.rollback()
+            raise _duplicate_spot_number(spot.number)
         return updated_spot
 
     @staticmethod
@@ -209,6 +471,29 @@ class ParkingSpotService:
         updated_spot = ParkingSpotRepository.remove_status_from_spot(db, spot_id, status_id)
         return updated_spot
 
+    @staticmethod
+    def bulk_update_statuses(db: Session, bulk: SpotStatusBulkUpdate) -> SpotStatusBulkResult:
+        """Ajouter, retirer ou remplacer des statuts sur une liste ou un ensemble filtré d'emplacements"""
+        if bulk.spot_ids is None and bulk.parking_id is None and bulk.hotel_id is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Indiquer au moins un critère de sélection : spot_ids, parking_id ou hotel_id"
+            )
+        if bulk.parking_id and ParkingRepository.get_parking_by_id(db, bulk.parking_id) is None:
+            raise HTTPException(status_code=404, detail=f"Parking avec l'ID {bulk.parking_id} non trouvé")
+        if bulk.hotel_id and HotelRepository.get_hotel_by_id(db, bulk.hotel_id) is None:
+            raise HTTPException(status_code=404, detail=f"Hôtel avec l'ID {bulk.hotel_id} non trouvé")
+
+        status_ids = StatusRepository.get_status_ids_by_values(db, bulk.statuses)
+        unknown = sorted(set(bulk.statuses) - status_ids.keys())
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Statuts inconnus : {', '.join(unknown)}")
+
+        return ParkingSpotRepository.bulk_update_statuses(
+            db, bulk.operation, list(status_ids.values()),
+            bulk.spot_ids, bulk.parking_id, bulk.hotel_id
+        )
+
 class StatusService:
     """Service pour la gestion des statuts"""
     
@@ -216,6 +501,11 @@ class StatusService:
     def get_all_statuses(db: Session, skip: int = 0, limit: int = 100) -> List[Status]:
         """Récupérer tous les statuts disponibles"""
         return StatusRepository.get_all_statuses(db, skip, limit)
+
+    @staticmethod
+    def get_statuses_version(db: Session) -> str:
+        """Version de la liste des statuts (ETag)"""
+        return f"statuses-{StatusRepository.get_version(db)}"
     
     @staticmethod
     def get_status_by_id(db: Session, status_id: int) -> Status:
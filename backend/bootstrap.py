@@ -0,0 +1,167 @@
+"""
+Préparation de la base avant le lancement des workers
+
+Les migrations Alembic et les données par défaut sont appliquées une seule fois, par le
+lanceur (serve.py) ou par python -m scripts.migrate, sous un verrou : plusieurs instances
+démarrées en même temps s'attendent au lieu d'exécuter le DDL en parallèle. Les workers
+n'exécutent ensuite aucun DDL.
+"""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+
+from app.models.parking import Hotel, Parking, SpotType, Status
+from config import settings
+from database import SessionLocal, engine
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Nom du verrou applicatif MySQL (GET_LOCK)
+LOCK_NAME = "parking_api_migrations"
+
+DEFAULT_STATUSES = [
+    {"value": "personnel", "color": "#F4CCCC"},
+    {"value": "late_checkout", "color": "#FF9900"},
+    {"value": "arrival_today", "color": "#00FF00"},
+    {"value": "already_in", "color": "#D9A384"},
+    {"value": "contact_hotel", "color": "#FF00FF"},
+    {"value": "external_company", "color": "#FFFF00"},
+    {"value": "unknown_occupation", "color": "#FF0000"},
+]
+
+DEFAULT_SPOT_TYPES = ["PMR", "STANDARD"]
+
+
+def alembic_config() -> Config:
+    """Configuration Alembic du projet, indépendante du dossier courant"""
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "alembic"))
+    return config
+
+
+@contextmanager
+def _file_lock(path: str, timeout: float) -> Iterator[None]:
+    """Verrou exclusif sur un fichier (SQLite : bases locales)"""
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        fcntl = None
+        import msvcrt
+
+    deadline = time.monotonic() + timeout
+    with open(path, "a+") as handle:
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Verrou des migrations non obtenu après {timeout:.0f} s ({path})")
+                time.sleep(0.2)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def migration_lock(timeout: float) -> Iterator[None]:
+    """
+    Verrou partagé par toutes les instances utilisant la base : verrou applicatif MySQL
+    (GET_LOCK), sinon verrou de fichier à côté de la base SQLite
+    """
+    if engine.dialect.name in ("mysql", "mariadb"):
+        with engine.connect() as connection:
+            acquired = connection.execute(
+                text("SELECT GET_LOCK(:name, :timeout)"), {"name": LOCK_NAME, "timeout": int(timeout)}
+            ).scalar()
+            if acquired != 1:
+                raise TimeoutError(f"Verrou des migrations non obtenu après {timeout:.0f} s")
+            try:
+                yield
+            finally:
+                connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+        return
+
+    database = engine.url.database
+    if database and database != ":memory:":
+        path = f"{os.path.abspath(database)}.migrations.lock"
+    else:
+        path = os.path.join(tempfile.gettempdir(), f"{LOCK_NAME}.lock")
+    with _file_lock(path, timeout):
+        yield
+
+
+def _check_alembic_managed() -> None:
+    """Refuser une base créée par create_all sans révision Alembic (la migration échouerait)"""
+    tables = set(inspect(engine).get_table_names())
+    if "hotels" in tables and "alembic_version" not in tables:
+        raise RuntimeError(
+            "La base contient déjà des tables mais aucune révision Alembic : indiquer sa "
+            "révision avec `alembic stamp <révision>` avant le lancement"
+        )
+
+
+def seed_default_data() -> None:
+    """Créer les statuts, types d'emplacement, hôtel et parking par défaut d'une base vide"""
+    db = SessionLocal()
+    try:
+        # Vérifier si des statuts existent déjà
+        if db.query(Status).count() > 0:
+            print("Les données par défaut existent déjà.")
+            return
+
+        for status_data in DEFAULT_STATUSES:
+            db.add(Status(**status_data))
+        for type_value in DEFAULT_SPOT_TYPES:
+            db.add(SpotType(value=type_value))
+
+        # Créer un hôtel et un parking par défaut s'ils n'existent pas
+        if db.query(Hotel).count() == 0:
+            hotel = Hotel(name="Hôtel Example", address="123 Rue de l'Example, 75000 Paris")
+            db.add(hotel)
+            db.flush()  # Pour obtenir l'ID de l'hôtel
+            db.add(Parking(
+                name="Parking Principal",
+                description="Parking principal de l'hôtel",
+                location="Sous-sol",
+                hotel_id=hotel.id
+            ))
+
+        db.commit()
+        print("Données par défaut initialisées avec succès.")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def prepare_database(lock_timeout: float = None) -> None:
+    """
+    Appliquer les migrations Alembic jusqu'à la dernière révision puis les données par
+    défaut, sous le verrou des migrations. Les connexions ouvertes sont fermées ensuite :
+    les workers créés par fork ne doivent pas hériter de celles du lanceur.
+    """
+    timeout = settings.MIGRATION_LOCK_TIMEOUT if lock_timeout is None else lock_timeout
+    try:
+        with migration_lock(timeout):
+            _check_alembic_managed()
+            command.upgrade(alembic_config(), "head")
+            seed_default_data()
+    finally:
+        engine.dispose()
@@ -0,0 +1,89 @@
+"""
+Configuration de l'application lue depuis les variables d'environnement (fichier .env)
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _get_bool(name: str, default: bool) -> bool:
+    """Lire un booléen depuis une variable d'environnement"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class Settings:
+    """Paramètres de l'application (base de données, pool de connexions, caches, stockage, compression, flux temps réel, lancement)"""
+
+    def __init__(self):
+        # URL de connexion (MySQL avec XAMPP par défaut)
+        self.DATABASE_URL: str = os.getenv(
+            "DATABASE_URL",
+            "mysql+pymysql://parking_user:ZwXj]/[/[YNN46cw@localhost/parking_db"
+        )
+        # URL du driver asynchrone (déduite de DATABASE_URL si absente)
+        self.ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+
+        # Pool de connexions (QueuePool) : à dimensionner selon le nombre de workers uvicorn,
+        # chaque worker ouvrant au plus DB_POOL_SIZE + DB_MAX_OVERFLOW connexions
+        self.DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        self.DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        self.DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+        self.DB_POOL_PRE_PING: bool = _get_bool("DB_POOL_PRE_PING", True)
+        self.DB_ECHO: bool = _get_bool("DB_ECHO", False)
+
+        # Durée de vie (secondes) du cache mémoire des statuts et types d'emplacement
+        self.LOOKUP_CACHE_TTL: float = float(os.getenv("LOOKUP_CACHE_TTL", "300"))
+        # Intervalle minimal (secondes) entre deux rechargements provoqués par une valeur inconnue
+        self.LOOKUP_CACHE_MISS_RELOAD: float = float(os.getenv("LOOKUP_CACHE_MISS_RELOAD", "1"))
+
+        # Durée de vie (secondes) du cache des taux d'occupation
+        self.OCCUPANCY_CACHE_TTL: float = float(os.getenv("OCCUPANCY_CACHE_TTL", "10"))
+
+        # Intervalle (secondes) de reconstruction de l'index de disponibilité,
+        # pour voir les écritures des autres workers (0 : désactivé)
+        self.AVAILABILITY_INDEX_REFRESH: float = float(os.getenv("AVAILABILITY_INDEX_REFRESH", "60"))
+
+        # Stockage local des photos (adressé par SHA-256) et miniatures
+        self.PICTURE_STORE_DIR: str = os.getenv("PICTURE_STORE_DIR", "media/pictures")
+        self.PICTURE_MAX_BYTES: int = int(os.getenv("PICTURE_MAX_BYTES", str(10 * 1024 * 1024)))
+        self.THUMBNAIL_SIZE: int = int(os.getenv("THUMBNAIL_SIZE", "320"))
+        self.THUMBNAIL_WORKERS: int = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+
+        # Compression des réponses (brotli si installé et accepté, sinon gzip) au-delà
+        # d'une taille minimale en octets (0 : désactivée)
+        self.COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+        self.GZIP_LEVEL: int = int(os.getenv("GZIP_LEVEL", "6"))
+        self.BROTLI_QUALITY: int = int(os.getenv("BROTLI_QUALITY", "4"))
+
+        # Flux temps réel des emplacements : intervalle de lecture du journal pour les
+        # écritures des autres workers (secondes), messages en attente par client avant
+        # resynchronisation et intervalle des messages de maintien SSE (secondes)
+        self.STREAM_POLL_INTERVAL: float = float(os.getenv("STREAM_POLL_INTERVAL", "0.5"))
+        self.STREAM_MAX_PENDING: int = int(os.getenv("STREAM_MAX_PENDING", "100"))
+        self.STREAM_HEARTBEAT: float = float(os.getenv("STREAM_HEARTBEAT", "15"))
+
+        # Journal des modifications (/api/changes) : conservation des lignes et intervalle
+        # de purge, en secondes (0 : pas de purge)
+        self.CHANGE_LOG_RETENTION: float = float(os.getenv("CHANGE_LOG_RETENTION", "604800"))
+        self.CHANGE_LOG_TRUNCATE_INTERVAL: float = float(os.getenv("CHANGE_LOG_TRUNCATE_INTERVAL", "3600"))
+
+        # Lanceur de production (serve.py) : adresse d'écoute, nombre de workers (0 : un
+        # par processeur), préchargement de l'application avant le fork des workers, délai
+        # (secondes) laissé aux requêtes en cours à l'arrêt et durée du keep-alive HTTP
+        self.SERVER_HOST: str = os.getenv("SERVER_HOST", "0.0.0.0")
+        self.SERVER_PORT: int = int(os.getenv("SERVER_PORT", "8000"))
+        self.SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", "0"))
+        self.SERVER_PRELOAD: bool = _get_bool("SERVER_PRELOAD", True)
+        self.SERVER_GRACEFUL_TIMEOUT: int = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+        self.SERVER_KEEPALIVE: int = int(os.getenv("SERVER_KEEPALIVE", "5"))
+        # Attente maximale (secondes) du verrou des migrations pris au lancement
+        self.MIGRATION_LOCK_TIMEOUT: float = float(os.getenv("MIGRATION_LOCK_TIMEOUT", "300"))
+
+
+settings = Settings()
@@ -1,19 +1,132 @@
+import threading
+import time
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 import pymysql
 
-# Configuration pour MySQL avec XAMPP (utilisateur root par défaut)
-# Remplacez "votre_mot_de_passe" par le mot de passe que vous avez créé
-SQLALCHEMY_DATABASE_URL = "mysql+pymysql://parking_user:ZwXj]/[/[YNN46cw@localhost/parking_db"
+from config import settings
 
-# Création du moteur SQLAlchemy (sans l'argument check_same_thread spécifique à SQLite)
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL
-)
+# URL de connexion lue depuis la configuration (variable DATABASE_URL)
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+
+def _to_async_url(url: str) -> str:
+    """Déduire l'URL du driver asynchrone à partir de l'URL synchrone"""
+    if url.startswith("mysql+pymysql://"):
+        return url.replace("mysql+pymysql://", "mysql+aiomysql://", 1)
+    if url.startswith("mysql://"):
+        return url.replace("mysql://", "mysql+aiomysql://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+# URL asynchrone (variable ASYNC_DATABASE_URL, sinon déduite de DATABASE_URL)
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.ASYNC_DATABASE_URL or _to_async_url(SQLALCHEMY_DATABASE_URL)
+
+
+class PoolStats:
+    """Compteurs du pool de connexions (temps d'attente, dépassements de délai)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record_wait(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_time_total_ms": round(self.total_wait * 1000, 3),
+                "wait_time_avg_ms": round(self.total_wait * 1000 / attempts, 3) if attempts else 0.0,
+                "wait_time_max_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+
+class _WaitTimeMixin:
+    """Mesure du temps d'attente pour obtenir une connexion du pool"""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_WaitTimeMixin, QueuePool):
+    """QueuePool mesurant le temps d'attente pour obtenir une connexion"""
+
+    stats = pool_stats
+
+
+class InstrumentedAsyncQueuePool(_WaitTimeMixin, AsyncAdaptedQueuePool):
+    """Pool du moteur asynchrone mesurant le temps d'attente pour obtenir une connexion"""
+
+    stats = async_pool_stats
+
+
+def _engine_options(url: str, poolclass=InstrumentedQueuePool) -> dict:
+    """Options du moteur selon le dialecte (SQLite n'accepte pas les réglages du QueuePool)"""
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}, "echo": settings.DB_ECHO}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "echo": settings.DB_ECHO,
+    }
+
+
+# Création du moteur SQLAlchemy avec un pool de connexions configurable
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Moteur et sessions asynchrones utilisés par les endpoints de l'API
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    **_engine_options(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool)
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 # Fonction pour obtenir une session de base de données
@@ -22,4 +135,43 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Fonction pour obtenir une session asynchrone de base de données
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _pool_status(pool, stats: PoolStats) -> dict:
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "timeout": settings.DB_POOL_TIMEOUT,
+        })
+    status.update(stats.snapshot())
+    return status
+
+
+def get_pool_status() -> dict:
+    """État courant des pools de connexions du processus (connexions empruntées, débordement, attente)"""
+    return {
+        "sync": _pool_status(engine.pool, pool_stats),
+        "async": _pool_status(async_engine.sync_engine.pool, async_pool_stats),
+    }
+
+
+def reset_pools_after_fork() -> None:
+    """
+    Abandonner, dans un worker créé par fork, les connexions héritées du processus parent
+    (sans les fermer : elles appartiennent toujours au parent)
+    """
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    pool_stats.reset()
+    async_pool_stats.reset()
@@ -1,19 +1,26 @@
 """
-Point d'entrée principal de l'application FastAPI avec initialisation des données par défaut
+Point d'entrée principal de l'application FastAPI
+
+Aucun DDL ni donnée par défaut au démarrage d'un worker : la base est préparée une seule
+fois par le lanceur (serve.py, voir bootstrap.prepare_database).
 """
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import asyncio
 import os
 import json
 from sqlalchemy.orm import Session
 
-from api.endpoints import parking
-from database import engine, Base, SessionLocal
-from app.models.parking import Status, SpotType, Hotel, Parking
-
-# Créer les tables en base de données
-Base.metadata.create_all(bind=engine)
+from api.compression import CompressionMiddleware
+from api.endpoints import changes, export, imports, parking, pictures, stream
+from database import SessionLocal, get_pool_status
+from app.repositories.availability import availability_index
+from app.repositories.cache import warm_lookup_caches
+from app.repositories.picture_store import picture_store
+from app.repositories.spot_events import spot_event_hub
+from app.services.changes import ChangeService
+from config import settings
 
 # Créer et configurer l'application FastAPI
 app = FastAPI(
@@ -31,6 +38,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression des réponses volumineuses (listes d'emplacements, exports)
+if settings.COMPRESSION_MINIMUM_SIZE > 0:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.GZIP_LEVEL,
+        brotli_quality=settings.BROTLI_QUALITY,
+    )
+
 # Gestion des exceptions
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -41,68 +57,91 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 # Ajouter les endpoints
 app.include_router(parking.router, prefix="/api")
+app.include_router(pictures.router, prefix="/api")
+app.include_router(export.router, prefix="/api")
+app.include_router(imports.router, prefix="/api")
+app.include_router(stream.router, prefix="/api")
+app.include_router(changes.router, prefix="/api")
+
+# État propre à chaque worker (lectures seules : la base est préparée par le lanceur)
+def load_worker_state():
+    db = SessionLocal()
+    try:
+        # Charger en mémoire les statuts et types d'emplacement
+        warm_lookup_caches(db)
+
+        # Construire l'index de disponibilité des emplacements
+        availability_index.build(db)
+    finally:
+        db.close()
 
-# Initialisation des données par défaut
-def init_default_data():
+def rebuild_availability_index():
     db = SessionLocal()
     try:
-        # Vérifier si des statuts existent déjà
-        if db.query(Status).count() == 0:
-            # Ajouter les statuts par défaut
-            default_statuses = [
-                {"value": "personnel", "color": "#F4CCCC"},
-                {"value": "late_checkout", "color": "#FF9900"},
-                {"value": "arrival_today", "color": "#00FF00"},
-                {"value": "already_in", "color": "#D9A384"},
-                {"value": "contact_hotel", "color": "#FF00FF"},
-                {"value": "external_company", "color": "#FFFF00"},
-                {"value": "unknown_occupation", "color": "#FF0000"}
-            ]
-            for status_data in default_statuses:
-                db.add(Status(**status_data))
-            
-            # Ajouter les types d'emplacement par défaut
-            default_types = ["PMR", "STANDARD"]
-            for type_value in default_types:
-                db.add(SpotType(value=type_value))
-            
-            # Créer un hôtel et un parking par défaut s'ils n'existent pas
-            if db.query(Hotel).count() == 0:
-                hotel = Hotel(name="Hôtel Example", address="123 Rue de l'Example, 75000 Paris")
-                db.add(hotel)
-                db.flush()  # Pour obtenir l'ID de l'hôtel
-                
-                # Créer un parking par défaut
-                parking = Parking(
-                    name="Parking Principal",
-                    description="Parking principal de l'hôtel",
-                    location="Sous-sol",
-                    hotel_id=hotel.id
-                )
-                db.add(parking)
-            
-            db.commit()
-            print("Données par défaut initialisées avec succès.")
-        else:
-            print("Les données par défaut existent déjà.")
-    except Exception as e:
-        print(f"Erreur lors de l'initialisation des données: {e}")
-        db.rollback()
-        raise
+        availability_index.build(db)
     finally:
         db.close()
 
-# Initialisation des données au démarrage
+async def refresh_availability_index():
+    """Reconstruire périodiquement l'index (écritures des autres workers)"""
+    while True:
+        await asyncio.sleep(settings.AVAILABILITY_INDEX_REFRESH)
+        try:
+            await asyncio.to_thread(rebuild_availability_index)
+        except Exception as e:
+            print(f"Erreur lors de la reconstruction de l'index de disponibilité: {e}")
+
+def truncate_change_log():
+    db = SessionLocal()
+    try:
+        removed = ChangeService.truncate_change_log(db, settings.CHANGE_LOG_RETENTION)
+        if removed:
+            print(f"Journal des modifications : {removed} lignes purgées")
+    finally:
+        db.close()
+
+async def truncate_change_log_periodically():
+    """Purger périodiquement le journal des modifications"""
+    while True:
+        await asyncio.sleep(settings.CHANGE_LOG_TRUNCATE_INTERVAL)
+        try:
+            await asyncio.to_thread(truncate_change_log)
+        except Exception as e:
+            print(f"Erreur lors de la purge du journal des modifications: {e}")
+
 @app.on_event("startup")
 async def startup_event():
-    init_default_data()
+    load_worker_state()
+    if settings.AVAILABILITY_INDEX_REFRESH > 0:
+        app.state.availability_refresh = asyncio.create_task(refresh_availability_index())
+    # Diffusion des modifications d'emplacements aux flux WebSocket/SSE
+    app.state.spot_events = asyncio.create_task(spot_event_hub.run())
+    if settings.CHANGE_LOG_RETENTION > 0 and settings.CHANGE_LOG_TRUNCATE_INTERVAL > 0:
+        app.state.change_log_truncation = asyncio.create_task(truncate_change_log_periodically())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for name in ("availability_refresh", "spot_events", "change_log_truncation"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+    picture_store.shutdown()
 
 # Route racine pour vérifier que l'API fonctionne
 @app.get("/")
 def read_root():
     return {"message": "Bienvenue sur l'API de gestion des parkings d'hôtels", "status": "OK"}
 
-# Si le script est exécuté directement, lancer l'application
+# Route de supervision du pool de connexions (valeurs propres au worker courant)
+@app.get("/health/db", tags=["health"])
+def read_db_pool_status():
+    return {"pid": os.getpid(), "pool": get_pool_status()}
+
+# Si le script est exécuté directement, lancer le serveur de développement
+# (production : python serve.py, plusieurs workers sans rechargement)
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    from bootstrap import prepare_database
+
+    prepare_database()
+    uvicorn.run("main:app", host=settings.SERVER_HOST, port=settings.SERVER_PORT, reload=True)
\ No newline at end of file
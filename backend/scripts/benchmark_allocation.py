@@ -0,0 +1,70 @@
+"""
+Mesure du temps d'affectation des arrivées sur des données synthétiques (sans base)
+
+Usage (depuis le dossier backend) :
+    python -m scripts.benchmark_allocation [arrivées] [emplacements]
+"""
+import random
+import sys
+import time
+
+from app.schemas.parking import ArrivalRequest
+from app.services.allocation import allocate, build_feasibility
+
+
+def synthetic_data(arrival_count: int, spot_count: int, seed: int = 42):
+    rng = random.Random(seed)
+    spots = []
+    for spot_id in range(1, spot_count + 1):
+        length = rng.choice((4.5, 5.0, 5.5, 6.0))
+        width = rng.choice((2.3, 2.5, 3.3))
+        spots.append({
+            "id": spot_id,
+            "parking_id": 1 + spot_id % 5,
+            "number": spot_id,
+            "length": length,
+            "width": width,
+            "height": rng.choice((1.9, 2.1, 2.5, None)),
+            "surface": length * width,
+            "hourly_rate": rng.choice((2.0, 2.5, 3.0)),
+            "daily_rate": rng.choice((15.0, 20.0, 25.0)),
+            "electric_charging": rng.random() < 0.2,
+            "pmr": width >= 3.3,
+        })
+    arrivals = [
+        ArrivalRequest(
+            reference=f"R{index}",
+            length=round(rng.uniform(3.6, 5.6), 2),
+            width=round(rng.uniform(1.6, 2.2), 2),
+            height=round(rng.uniform(1.4, 2.2), 2),
+            pmr=rng.random() < 0.05,
+            electric_charging=rng.random() < 0.15,
+        )
+        for index in range(arrival_count)
+    ]
+    return arrivals, spots
+
+
+def main() -> None:
+    arrival_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    spot_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    arrivals, spots = synthetic_data(arrival_count, spot_count)
+
+    start = time.perf_counter()
+    rows = build_feasibility(arrivals, spots)
+    feasibility = time.perf_counter() - start
+    pairs = sum(bin(row).count("1") for row in rows)
+
+    start = time.perf_counter()
+    result = allocate(arrivals, spots)
+    total = time.perf_counter() - start
+
+    print(f"{arrival_count} arrivées × {spot_count} emplacements ({pairs} couples compatibles)")
+    print(f"  matrice de faisabilité : {feasibility * 1000:.1f} ms")
+    print(f"  affectation complète   : {total * 1000:.1f} ms")
+    print(f"  affectées : {len(result['assignments'])}, non affectées : {len(result['unassigned'])}, "
+          f"surface totale : {result['total_cost']:.1f} m²")
+
+
+if __name__ == "__main__":
+    main()
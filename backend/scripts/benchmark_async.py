@@ -0,0 +1,185 @@
+"""
+Comparaison du débit de la pile synchrone et de la pile asynchrone de l'API
+
+La pile synchrone sert les mêmes endpoints de lecture avec les mêmes services, en def
+avec une Session (une requête par thread du threadpool Starlette) ; la pile asynchrone
+est l'application (async def, AsyncSession). Chacune est lancée dans un serveur uvicorn
+séparé (un worker) sur la même base SQLite temporaire, puis chargée par un client httpx
+avec un nombre fixe de requêtes simultanées : le script affiche les requêtes par seconde
+et les latences médiane et p95 de chaque endpoint.
+
+Avec SQLite les requêtes ne font presque pas attendre la base : l'écart mesure surtout le
+coût de répartition (threadpool ou boucle d'événements), pas un gain de concurrence, qui
+n'apparaît qu'avec une base distante (MySQL, DATABASE_URL) où chaque requête attend le
+réseau.
+
+Usage (depuis le dossier backend) :
+    python -m scripts.benchmark_async [emplacements] [requêtes] [concurrence]
+"""
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = (
+    "/api/hotels/{hotel_id}",
+    "/api/parkings/{parking_id}",
+    "/api/spots/?limit=100",
+)
+
+STACKS = (
+    ("synchrone", "scripts.benchmark_async:create_sync_app", True),
+    ("asynchrone", "main:app", False),
+)
+
+
+def create_sync_app():
+    """Application des endpoints de lecture mesurés, en def avec une Session synchrone"""
+    from fastapi import Depends, FastAPI
+    from fastapi.responses import ORJSONResponse
+    from sqlalchemy.orm import Session
+
+    from api.deps import get_db_session
+    from app.schemas.parking import HotelInDB, ParkingInDB
+    from app.services.parking import HotelService, ParkingService, ParkingSpotService
+
+    app = FastAPI()
+
+    @app.get("/api/hotels/{hotel_id}", response_model=HotelInDB)
+    def read_hotel(hotel_id: int, db: Session = Depends(get_db_session)):
+        return HotelService.get_hotel_by_id(db, hotel_id)
+
+    @app.get("/api/parkings/{parking_id}", response_model=ParkingInDB)
+    def read_parking(parking_id: int, db: Session = Depends(get_db_session)):
+        return ParkingService.get_parking_by_id(db, parking_id)
+
+    @app.get("/api/spots/")
+    def read_spots(skip: int = 0, limit: int = 100, db: Session = Depends(get_db_session)):
+        return ORJSONResponse(ParkingSpotService.get_spot_rows(db, None, skip, limit))
+
+    return app
+
+
+def create_data(spot_count: int, hotel_count: int = 10, parkings_per_hotel: int = 2) -> Dict[str, int]:
+    """Créer des hôtels de quelques parkings par les services ; retourne les IDs mesurés"""
+    from app.schemas.parking import HotelCreate, ParkingCreate, ParkingSpotCreate
+    from app.services.parking import HotelService, ParkingService, ParkingSpotService
+    from database import SessionLocal
+
+    per_parking = max(spot_count // (hotel_count * parkings_per_hotel), 1)
+    db = SessionLocal()
+    try:
+        for hotel_index in range(hotel_count):
+            hotel = HotelService.create_hotel(db, HotelCreate(name=f"Hôtel {hotel_index}"))
+            for parking_index in range(parkings_per_hotel):
+                parking = ParkingService.create_parking(db, ParkingCreate(name=f"Parking {parking_index}"), hotel.id)
+                for number in range(per_parking):
+                    ParkingSpotService.create_spot(db, ParkingSpotCreate(
+                        number=number, floor=number % 4, section="ABCD"[number % 4],
+                        length=5.0, width=2.5, height=2.1, surface=12.5,
+                        hourly_rate=2.5, daily_rate=20.0, monthly_rate=150.0,
+                        electric_charging=number % 5 == 0, types=["STANDARD"],
+                    ), parking.id)
+        return {"hotel_id": hotel.id, "parking_id": parking.id}
+    finally:
+        db.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(target: str, factory: bool, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    """Lancer un serveur uvicorn (un seul worker) et attendre qu'il accepte les connexions"""
+    command = [sys.executable, "-m", "uvicorn", target, "--port", str(port), "--log-level", "warning"]
+    if factory:
+        command.append("--factory")
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"Le serveur {target} s'est arrêté au démarrage")
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Le serveur {target} ne répond pas")
+
+
+async def load(base_url: str, path: str, total: int, concurrency: int) -> Tuple[float, List[float]]:
+    """Envoyer total requêtes GET, concurrency à la fois ; retourne (durée, latences en secondes)"""
+    import httpx
+
+    latencies: List[float] = []
+    queue = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await client.get(path)  # Préchauffage
+
+        async def worker() -> None:
+            for _ in queue:
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start, latencies
+
+
+def main() -> None:
+    spot_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    # Base temporaire : à configurer avant d'importer l'application
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+    os.environ["AVAILABILITY_INDEX_REFRESH"] = "0"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+    from bootstrap import prepare_database
+    prepare_database()
+
+    ids = create_data(spot_count)
+
+    print(f"{spot_count} emplacements, {total} requêtes par endpoint, {concurrency} simultanées")
+    results: Dict[str, Dict[str, float]] = {}
+    for name, target, factory in STACKS:
+        port = free_port()
+        process = start_server(target, factory, port, dict(os.environ))
+        try:
+            print(f"\nPile {name}")
+            for endpoint in ENDPOINTS:
+                path = endpoint.format(**ids)
+                duration, latencies = asyncio.run(load(f"http://127.0.0.1:{port}", path, total, concurrency))
+                latencies.sort()
+                rate = total / duration
+                results.setdefault(endpoint, {})[name] = rate
+                print(
+                    f"  {endpoint:<28} {rate:>8.0f} req/s, médiane {statistics.median(latencies) * 1000:.1f} ms,"
+                    f" p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms"
+                )
+        finally:
+            process.terminate()
+            process.wait()
+
+    print()
+    for endpoint, rates in results.items():
+        print(f"{endpoint:<28} asynchrone / synchrone : {rates['asynchrone'] / rates['synchrone']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Mesure de la sérialisation et du volume des réponses de liste (emplacements, parkings, hôtels)
+
+Pour chaque endpoint, compare l'encodage JSON du module standard (JSONResponse) à
+orjson (ORJSONResponse) sur le même contenu, puis le temps de réponse et les octets
+envoyés sans compression, en gzip et en brotli. Les données sont générées dans une
+base SQLite temporaire.
+
+Usage (depuis le dossier backend) :
+    python -m scripts.benchmark_responses [emplacements] [répétitions]
+"""
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ENDPOINTS = (
+    "/api/spots/?limit=100",
+    "/api/parkings/?limit=100",
+    "/api/hotels/?limit=100",
+)
+ENCODINGS = ("identity", "gzip", "br")
+
+
+def synthetic_spots(spot_count: int, hotel_count: int = 100, parkings_per_hotel: int = 2) -> bytes:
+    """Fichier NDJSON d'emplacements répartis sur plusieurs hôtels et parkings"""
+    lines = []
+    for index in range(spot_count):
+        hotel = index % hotel_count
+        parking = index // hotel_count % parkings_per_hotel
+        lines.append(json.dumps({
+            "hotel": f"Hôtel {hotel}",
+            "hotel_address": f"{hotel} avenue de la Gare, 75000 Paris",
+            "parking": f"Parking {parking}",
+            "parking_location": "Souterrain",
+            "number": index,
+            "floor": index % 4,
+            "section": "ABCD"[index % 4],
+            "address": f"Niveau {index % 4}, allée {index % 12}",
+            "length": 5.0,
+            "width": 2.5,
+            "height": 2.1,
+            "surface": 12.5,
+            "electric_charging": index % 5 == 0,
+            "hourly_rate": 2.5,
+            "daily_rate": 20.0,
+            "monthly_rate": 150.0,
+            "types": ["STANDARD", "EV"] if index % 5 == 0 else ["STANDARD"],
+        }))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def timed(func, repeat: int) -> float:
+    """Durée médiane d'un appel, en millisecondes"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+def main() -> None:
+    spot_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    # Base temporaire : à configurer avant d'importer l'application
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+    os.environ["AVAILABILITY_INDEX_REFRESH"] = "0"
+
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.testclient import TestClient
+
+    from bootstrap import prepare_database
+    prepare_database()
+
+    import main as application
+    from app.services.importer import ImportService
+    from database import SessionLocal
+
+    with TestClient(application.app) as client:
+        db = SessionLocal()
+        try:
+            ImportService.import_file(db, io.BytesIO(synthetic_spots(spot_count)), "ndjson")
+        finally:
+            db.close()
+
+        print(f"{spot_count} emplacements, médiane sur {repeat} requêtes")
+        for url in ENDPOINTS:
+            content = client.get(url, headers={"Accept-Encoding": "identity"}).json()
+            standard = timed(lambda: JSONResponse(content), repeat)
+            fast = timed(lambda: ORJSONResponse(content), repeat)
+            print(f"\n{url} ({len(content)} éléments)")
+            print(f"  encodage json : {standard:.2f} ms, orjson : {fast:.2f} ms ({standard / fast:.1f}x)")
+            for encoding in ENCODINGS:
+                headers = {"Accept-Encoding": encoding}
+                response = client.get(url, headers=headers)
+                size = len(response.content) if encoding == "identity" else int(response.headers.get("content-length", 0))
+                duration = timed(lambda: client.get(url, headers=headers), repeat)
+                applied = response.headers.get("content-encoding", "identity")
+                print(f"  {encoding:>8} : {size:>7} octets envoyés ({applied}), {duration:.2f} ms par requête")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Mesure du chemin de lecture des listes d'emplacements, pour 1 000 emplacements
+
+Compare le chemin ORM (objets ParkingSpot, validation from_attributes, nouvelle
+validation par le response_model puis encodage) au chemin en lignes Core (types et
+statuts agrégés en SQL, dictionnaires encodés directement par orjson). Les données sont
+générées dans une base SQLite temporaire.
+
+Usage (depuis le dossier backend) :
+    python -m scripts.benchmark_spot_reads [emplacements] [répétitions]
+"""
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+
+def timed(func, repeat: int) -> float:
+    """Durée médiane d'un appel, en millisecondes"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+def main() -> None:
+    spot_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    # Base temporaire : à configurer avant d'importer l'application
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{directory}/benchmark.db"
+    os.environ["AVAILABILITY_INDEX_REFRESH"] = "0"
+
+    import orjson
+    from pydantic import TypeAdapter
+
+    from bootstrap import prepare_database
+    from app.repositories.parking import ParkingSpotRepository
+    from app.schemas.parking import ParkingSpotInDB
+    from app.services.importer import ImportService
+    from database import SessionLocal
+    from scripts.benchmark_responses import synthetic_spots
+
+    prepare_database()
+    db = SessionLocal()
+    try:
+        ImportService.import_file(db, io.BytesIO(synthetic_spots(spot_count, hotel_count=1, parkings_per_hotel=1)), "ndjson")
+        ParkingSpotRepository.bulk_update_statuses(db, "add", [1, 2], spot_ids=list(range(1, spot_count + 1, 3)))
+        adapter = TypeAdapter(List[ParkingSpotInDB])
+
+        def orm_query():
+            db.expunge_all()
+            return ParkingSpotRepository.get_all_spots(db, None, 0, spot_count)
+
+        def orm_path():
+            spots = adapter.validate_python(orm_query(), from_attributes=True)
+            # Nouvelle validation et encodage par FastAPI (response_model)
+            return orjson.dumps(adapter.dump_python(adapter.validate_python(spots), mode="json"))
+
+        def rows_query():
+            return ParkingSpotRepository.get_spot_rows(db, None, 0, spot_count)
+
+        def rows_path():
+            return orjson.dumps(rows_query())
+
+        orm_body, rows_body = orm_path(), rows_path()
+        print(f"{spot_count} emplacements, médiane sur {repeat} exécutions "
+              f"({len(orm_body)} / {len(rows_body)} octets)")
+        for label, query, path in (("ORM + validation", orm_query, orm_path), ("lignes Core", rows_query, rows_path)):
+            query_time = timed(query, repeat)
+            total = timed(path, repeat)
+            print(f"  {label:<17} : requêtes {query_time:6.2f} ms, total {total:6.2f} ms "
+                  f"({total * 1000 / spot_count:.2f} ms pour 1 000 emplacements)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Vérification par EXPLAIN des plans d'exécution des principales requêtes des repositories
+
+Chaque requête doit être servie par un index (pas de parcours complet de la table filtrée).
+Le script affiche le plan de chaque requête et retourne un code de sortie non nul si une
+requête parcourt toute sa table. Sous MySQL, l'optimiseur peut préférer un parcours complet
+sur des tables presque vides : lancer la vérification sur une base contenant des données.
+
+Usage (depuis le dossier backend) :
+    python -m scripts.explain_queries
+"""
+import sys
+from typing import List, Tuple
+
+from sqlalchemy import select, text
+
+from database import engine
+from app.models.parking import Hotel, Parking, ParkingSpot, spot_statuses, spot_types
+
+# (description, table filtrée, requête) ; les valeurs sont arbitraires, seul le plan compte
+QUERIES = [
+    (
+        "Parkings d'un hôtel (HotelRepository.get_hotel_by_id / ParkingRepository.get_all_parkings)",
+        "parkings",
+        select(Parking).where(Parking.hotel_id == 1),
+    ),
+    (
+        "Emplacements d'un parking triés par numéro (ParkingSpotRepository.get_spots_page)",
+        "parking_spots",
+        select(ParkingSpot).where(ParkingSpot.parking_id == 1).order_by(ParkingSpot.number, ParkingSpot.id),
+    ),
+    (
+        "Unicité du numéro (ParkingSpotRepository.number_exists)",
+        "parking_spots",
+        select(ParkingSpot.id).where(ParkingSpot.parking_id == 1, ParkingSpot.number == 1),
+    ),
+    (
+        "Emplacements ayant un statut",
+        "spot_statuses",
+        select(spot_statuses.c.spot_id).where(spot_statuses.c.status_id == 1),
+    ),
+    (
+        "Emplacements ayant un type",
+        "spot_types",
+        select(spot_types.c.spot_id).where(spot_types.c.type_id == 1),
+    ),
+    (
+        "Statuts d'une page d'emplacements (selectinload ParkingSpot.statuses)",
+        "spot_statuses",
+        select(spot_statuses).where(spot_statuses.c.spot_id.in_([1, 2, 3])),
+    ),
+    (
+        "Hôtel par nom (HotelRepository.get_hotel_by_name)",
+        "hotels",
+        select(Hotel).where(Hotel.name == "Hôtel"),
+    ),
+]
+
+
+def _explain(connection, sql: str) -> Tuple[List[str], List[str]]:
+    """Retourner les lignes du plan et les tables parcourues entièrement"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).mappings().all()
+        plan = [row["detail"] for row in rows]
+        # "SCAN <table>" sans index = parcours complet ; "SEARCH" ou "COVERING INDEX" = index
+        full_scans = [
+            line.split()[1] for line in plan
+            if line.startswith("SCAN ") and "INDEX" not in line
+        ]
+        return plan, full_scans
+    if dialect == "mysql":
+        rows = connection.execute(text(f"EXPLAIN {sql}")).mappings().all()
+        plan = [
+            f"table={row['table']} type={row['type']} key={row['key']} rows={row['rows']}"
+            for row in rows
+        ]
+        full_scans = [row["table"] for row in rows if row["type"] == "ALL"]
+        return plan, full_scans
+    raise RuntimeError(f"Dialecte non supporté pour EXPLAIN : {dialect}")
+
+
+def main() -> int:
+    failures = 0
+    with engine.connect() as connection:
+        for description, table, query in QUERIES:
+            sql = str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+            plan, full_scans = _explain(connection, sql)
+            ok = table not in full_scans
+            failures += not ok
+            print(f"[{'OK' if ok else 'SCAN'}] {description}")
+            for line in plan:
+                print(f"    {line}")
+    if failures:
+        print(f"{failures} requête(s) parcourent entièrement leur table.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
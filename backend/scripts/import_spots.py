@@ -0,0 +1,49 @@
+"""
+Import d'un fichier d'emplacements (CSV ou NDJSON), avec affichage de la progression
+
+Usage (depuis le dossier backend) :
+    python -m scripts.import_spots fichier.csv [--format csv|ndjson] [--chunk-size 5000]
+"""
+import argparse
+import sys
+
+from database import SessionLocal
+from app.services.importer import IMPORT_CHUNK_SIZE, ImportService
+
+
+def show_progress(summary) -> None:
+    rate = summary["created"] / summary["duration"] if summary["duration"] else 0
+    print(
+        f"\r{summary['rows']} lignes lues, {summary['created']} emplacements créés, "
+        f"{summary['error_count']} erreurs ({rate:.0f} emplacements/s)",
+        end="", file=sys.stderr, flush=True
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Importer des emplacements depuis un fichier CSV ou NDJSON")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("csv", "ndjson"))
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+    format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as handle:
+            summary = ImportService.import_file(db, handle, format, args.chunk_size, show_progress)
+    finally:
+        db.close()
+    print(file=sys.stderr)
+    print(
+        f"{summary['created']} emplacements créés sur {summary['rows']} lignes "
+        f"({summary['hotels']} hôtels, {summary['parkings']} parkings) en {summary['duration']:.1f} s"
+    )
+    for error in summary["errors"]:
+        print(f"  ligne {error['line']} : {error['detail']}")
+    if summary["error_count"] > len(summary["errors"]):
+        print(f"  … et {summary['error_count'] - len(summary['errors'])} autres erreurs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+"""
+Préparation de la base sans lancer le serveur : migrations Alembic et données par
+défaut, sous le verrou des migrations (étape de déploiement avant serve.py --skip-migrations)
+
+Usage (depuis le dossier backend) :
+    python -m scripts.migrate
+"""
+from bootstrap import prepare_database
+
+
+def main() -> None:
+    prepare_database()
+    print("Base à jour.")
+
+
+if __name__ == "__main__":
+    main()
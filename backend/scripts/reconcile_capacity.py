@@ -0,0 +1,21 @@
+"""
+Recalcul de la capacité totale des parkings à partir du nombre réel d'emplacements
+
+Usage (depuis le dossier backend) :
+    python -m scripts.reconcile_capacity
+"""
+from database import SessionLocal
+from app.repositories.parking import ParkingRepository
+
+
+def main() -> None:
+    db = SessionLocal()
+    try:
+        fixed = ParkingRepository.reconcile_capacities(db)
+        print(f"Capacité corrigée pour {fixed} parking(s).")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
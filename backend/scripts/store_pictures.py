@@ -0,0 +1,61 @@
+"""
+Déplacement des photos data-URL des emplacements vers le stockage local adressé par SHA-256
+
+Chaque photo spot_pictures dont l'URL est une data-URL est enregistrée dans le stockage
+(PICTURE_STORE_DIR), sa miniature générée, puis la ligne ne garde que le SHA-256.
+Le script peut être relancé : les photos déjà déplacées sont ignorées.
+
+Usage (depuis le dossier backend) :
+    python -m scripts.store_pictures
+"""
+from sqlalchemy import select, update
+
+from database import SessionLocal
+from app.models.parking import SpotPicture
+from app.repositories.picture_store import UnsupportedPictureError, decode_data_url, picture_store
+
+BATCH_SIZE = 200
+
+
+def main() -> None:
+    db = SessionLocal()
+    moved = skipped = 0
+    last_id = 0
+    try:
+        while True:
+            rows = db.execute(
+                select(SpotPicture.id, SpotPicture.url)
+                .where(SpotPicture.id > last_id, SpotPicture.url.like("data:%"))
+                .order_by(SpotPicture.id)
+                .limit(BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            for picture_id, url in rows:
+                last_id = picture_id
+                data = decode_data_url(url)
+                if not data:
+                    skipped += 1
+                    continue
+                try:
+                    sha256, _ = picture_store.save_bytes(data)
+                except UnsupportedPictureError:
+                    # Contenu qui n'est pas une image : laissé en data-URL
+                    skipped += 1
+                    continue
+                picture_store.submit_thumbnail(sha256)
+                db.execute(
+                    update(SpotPicture)
+                    .where(SpotPicture.id == picture_id)
+                    .values(sha256=sha256, url=None)
+                )
+                moved += 1
+            db.commit()
+        print(f"{moved} photo(s) déplacée(s) dans {picture_store.root}, {skipped} data-URL(s) illisible(s) ou non image.")
+    finally:
+        db.close()
+        picture_store.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Lanceur de production de l'API
+
+1. La base est préparée une seule fois, sous un verrou : migrations Alembic jusqu'à la
+   dernière révision et données par défaut (voir bootstrap.prepare_database).
+2. gunicorn lance SERVER_WORKERS workers uvicorn. Avec SERVER_PRELOAD, l'application
+   est importée une fois dans le processus maître avant le fork des workers, qui
+   abandonnent les connexions héritées (post_fork).
+3. Arrêt gracieux sur SIGTERM : chaque worker cesse d'accepter des connexions et laisse
+   SERVER_GRACEFUL_TIMEOUT secondes aux requêtes en cours. Les flux /api/stream encore
+   ouverts sont alors coupés ; les clients reprennent avec /api/changes?since=.
+
+Sans gunicorn (Windows), uvicorn lance lui-même les workers, sans préchargement.
+
+Usage (depuis le dossier backend) :
+    python serve.py [--skip-migrations]
+"""
+import os
+import sys
+
+from bootstrap import prepare_database
+from config import settings
+
+try:
+    from gunicorn.app.base import BaseApplication
+    from uvicorn_worker import UvicornWorker
+except ImportError:  # gunicorn n'est pas disponible sous Windows
+    BaseApplication = None
+
+
+def worker_count() -> int:
+    return settings.SERVER_WORKERS or os.cpu_count() or 1
+
+
+if BaseApplication is not None:
+    class GracefulUvicornWorker(UvicornWorker):
+        """Worker uvicorn qui attend les requêtes en cours pendant le délai d'arrêt de gunicorn"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.config.timeout_graceful_shutdown = self.cfg.graceful_timeout
+
+    def post_fork(server, worker) -> None:
+        from database import reset_pools_after_fork
+
+        reset_pools_after_fork()
+
+    class ProductionServer(BaseApplication):
+        """Application gunicorn configurée depuis les paramètres de l'API"""
+
+        def load_config(self) -> None:
+            options = {
+                "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+                "workers": worker_count(),
+                "worker_class": GracefulUvicornWorker,
+                "preload_app": settings.SERVER_PRELOAD,
+                "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+                "keepalive": settings.SERVER_KEEPALIVE,
+                "post_fork": post_fork,
+                "accesslog": "-",
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+
+            return app
+
+
+def main() -> None:
+    if "--skip-migrations" not in sys.argv[1:]:
+        prepare_database()
+
+    if BaseApplication is not None:
+        ProductionServer().run()
+        return
+
+    import uvicorn
+
+    uvicorn.run(
+        "main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=worker_count(),
+        timeout_keep_alive=settings.SERVER_KEEPALIVE,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Configuration des tests : base SQLite temporaire (driver aiosqlite pour les endpoints),
+préparée par bootstrap.prepare_database comme au lancement du serveur
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIR = tempfile.mkdtemp(prefix="parking-tests-")
+
+# À configurer avant le premier import de config
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["PICTURE_STORE_DIR"] = os.path.join(TEST_DIR, "pictures")
+os.environ["AVAILABILITY_INDEX_REFRESH"] = "0"
+sys.path.insert(0, BACKEND_DIR)
+
+from bootstrap import prepare_database  # noqa: E402
+
+prepare_database()
+
+
+@pytest.fixture
+def spot_data():
+    """Corps de création d'un emplacement (ParkingSpotCreate)"""
+    def build(number: int, **values):
+        data = {
+            "number": number, "floor": 0, "section": "A",
+            "length": 5.0, "width": 2.5, "height": 2.1, "surface": 12.5,
+            "hourly_rate": 2.5, "daily_rate": 20.0, "monthly_rate": 150.0,
+            "types": ["STANDARD"],
+        }
+        data.update(values)
+        return data
+
+    return build
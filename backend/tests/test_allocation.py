@@ -0,0 +1,58 @@
+"""
+Affectation des emplacements aux arrivées : résultat optimal sur des instances connues
+"""
+import pytest
+
+from app.schemas.parking import ArrivalRequest
+from app.services.allocation import allocate
+
+
+def spot(spot_id, length, width, height, surface, pmr=False, electric_charging=False):
+    return {
+        "id": spot_id, "parking_id": 1, "number": spot_id,
+        "length": length, "width": width, "height": height, "surface": surface,
+        "hourly_rate": 2.5, "daily_rate": 20.0, "pmr": pmr, "electric_charging": electric_charging,
+    }
+
+
+def assigned_spots(result):
+    return {assignment["index"]: assignment["spot_id"] for assignment in result["assignments"]}
+
+
+def test_known_optimum_with_unbounded_height():
+    arrivals = [
+        ArrivalRequest(reference="citadine", length=4.0, width=1.8, height=1.5),
+        ArrivalRequest(reference="fourgon", length=5.0, width=2.0, height=2.5),
+        ArrivalRequest(reference="berline", length=4.5, width=1.9, height=1.6),
+    ]
+    spots = [
+        spot(1, 5.0, 2.2, 2.0, 11.0),
+        spot(2, 4.2, 2.0, 2.0, 8.4),
+        # Place extérieure : hauteur non renseignée, donc sans limite
+        spot(3, 6.0, 2.5, None, 15.0),
+        spot(4, 5.5, 2.4, 2.1, 13.2),
+    ]
+    result = allocate(arrivals, spots, "surface", preserve_special=False)
+    assert assigned_spots(result) == {0: 2, 1: 3, 2: 1}
+    assert result["unassigned"] == []
+    assert result["total_cost"] == pytest.approx(34.4)
+
+
+def test_maximum_assignment_before_cost():
+    # L'emplacement le moins cher est le seul possible pour la seconde arrivée
+    arrivals = [ArrivalRequest(length=4.0), ArrivalRequest(length=4.8)]
+    spots = [spot(1, 5.0, 2.5, 2.0, 10.0), spot(2, 4.5, 2.5, 2.0, 9.0), spot(3, 4.2, 2.5, 2.0, 8.0)]
+    result = allocate(arrivals, spots, "surface", preserve_special=False)
+    assert assigned_spots(result) == {0: 3, 1: 1}
+    assert result["total_cost"] == pytest.approx(18.0)
+
+
+def test_special_spots_used_last():
+    arrivals = [ArrivalRequest(length=4.0), ArrivalRequest(length=4.0, pmr=True)]
+    spots = [
+        spot(1, 5.0, 3.3, 2.0, 16.5, pmr=True),
+        spot(2, 5.0, 2.5, 2.0, 12.5),
+        spot(3, 5.0, 2.3, 2.0, 11.5, electric_charging=True),
+    ]
+    result = allocate(arrivals, spots, "surface", preserve_special=True)
+    assert assigned_spots(result) == {0: 2, 1: 1}
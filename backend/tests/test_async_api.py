@@ -0,0 +1,108 @@
+"""
+Endpoints asynchrones (AsyncSession sur sqlite+aiosqlite) appelés par httpx.AsyncClient
+"""
+import asyncio
+import base64
+
+import httpx
+import pytest
+
+from database import async_engine
+from main import app
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    # Les connexions aiosqlite sont liées à la boucle du test
+    await async_engine.dispose()
+
+
+async def test_async_engine_uses_aiosqlite():
+    assert async_engine.url.drivername == "sqlite+aiosqlite"
+
+
+async def test_hotel_parking_spot_round_trip(client, spot_data):
+    response = await client.post("/api/hotels/", json={"name": "Hôtel Async", "address": "1 rue du Test"})
+    assert response.status_code == 201
+    hotel_id = response.json()["id"]
+
+    response = await client.post(f"/api/hotels/{hotel_id}/parkings/", json={"name": "Parking Async"})
+    assert response.status_code == 201
+    parking_id = response.json()["id"]
+
+    response = await client.post(f"/api/parkings/{parking_id}/spots/", json=spot_data(1))
+    assert response.status_code == 201
+    spot_id = response.json()["id"]
+
+    response = await client.put(f"/api/spots/{spot_id}", json={"section": "B"})
+    assert response.status_code == 200
+    assert response.json()["section"] == "B"
+
+    response = await client.get(f"/api/hotels/{hotel_id}")
+    assert response.status_code == 200
+    parkings = response.json()["parkings"]
+    assert [parking["id"] for parking in parkings] == [parking_id]
+    assert [spot["id"] for spot in parkings[0]["spots"]] == [spot_id]
+
+    response = await client.delete(f"/api/spots/{spot_id}")
+    assert response.status_code == 200
+    response = await client.get(f"/api/spots/{spot_id}")
+    assert response.status_code == 404
+
+
+async def test_concurrent_requests(client, spot_data):
+    response = await client.post("/api/hotels/", json={"name": "Hôtel Concurrent"})
+    hotel_id = response.json()["id"]
+    response = await client.post(f"/api/hotels/{hotel_id}/parkings/", json={"name": "Parking Concurrent"})
+    parking_id = response.json()["id"]
+
+    # Écritures et lectures entrelacées sur la boucle d'événements
+    responses = await asyncio.gather(*(
+        client.post(f"/api/parkings/{parking_id}/spots/", json=spot_data(number)) for number in range(1, 11)
+    ))
+    assert [response.status_code for response in responses] == [201] * 10
+
+    responses = await asyncio.gather(*(client.get(f"/api/hotels/{hotel_id}") for _ in range(20)))
+    assert all(response.status_code == 200 for response in responses)
+    assert {len(response.json()["parkings"][0]["spots"]) for response in responses} == {10}
+
+
+async def test_unknown_hotel_returns_404(client):
+    response = await client.get("/api/hotels/999999")
+    assert response.status_code == 404
+
+
+async def test_data_url_pictures_are_stored(client, spot_data):
+    response = await client.post("/api/hotels/", json={"name": "Hôtel Photos"})
+    hotel_id = response.json()["id"]
+    response = await client.post(f"/api/hotels/{hotel_id}/parkings/", json={"name": "Parking Photos"})
+    parking_id = response.json()["id"]
+
+    png = base64.b64encode(b"\x89PNG\r\n\x1a\n" + bytes(64)).decode()
+    picture = f"data:image/png;base64,{png}"
+    response = await client.post(f"/api/parkings/{parking_id}/spots/", json=spot_data(1, pictures=[picture]))
+    assert response.status_code == 201, response.text
+    [url] = response.json()["pictures"]
+    assert url.startswith("/api/pictures/")
+
+    response = await client.post(f"/api/parkings/{parking_id}/spots/bulk", json=[
+        spot_data(2, pictures=[url]),
+        spot_data(3, pictures=["data:image/png;base64,!!!"]),
+        spot_data(1),
+    ])
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["created"] == 1
+    assert [error["index"] for error in result["errors"]] == [1, 2]
+    assert "Data-URL" in result["errors"][0]["detail"]
+    assert "existe déjà" in result["errors"][1]["detail"]
@@ -0,0 +1,20 @@
+"""
+Index de disponibilité : filtres de dimensions
+"""
+from app.repositories.availability import ParkingAvailability
+
+
+def test_missing_dimension_is_unbounded():
+    parking = ParkingAvailability(1, 1)
+    for spot_id, height in ((1, 2.0), (2, None), (3, 2.5)):
+        parking.upsert({
+            "id": spot_id, "number": spot_id, "floor": 0, "section": "A",
+            "length": 5.0, "width": 2.5, "height": height,
+            "electric_charging": False, "camera": False, "sensor": False,
+        }, ["STANDARD"], [])
+
+    spots = parking.find(min_height=2.2)
+    assert [spot["id"] for spot in spots] == [2, 3]
+    # La dimension non renseignée est restituée telle quelle
+    assert spots[0]["height"] is None
+    assert [spot["id"] for spot in parking.find(min_length=5.5)] == []
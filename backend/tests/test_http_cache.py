@@ -0,0 +1,83 @@
+"""
+GET conditionnels (ETag, If-None-Match) sur les réponses compressées ou non
+"""
+import httpx
+import pytest
+
+from database import async_engine
+from main import app
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def hotel_id(request, client, spot_data):
+    name = f"Hôtel {request.node.name}"
+    hotel_id = (await client.post("/api/hotels/", json={"name": name})).json()["id"]
+    parking_id = (await client.post(f"/api/hotels/{hotel_id}/parkings/", json={"name": "Parking Cache"})).json()["id"]
+    for number in range(1, 21):
+        await client.post(f"/api/parkings/{parking_id}/spots/", json=spot_data(number))
+    return hotel_id
+
+
+async def test_etag_is_weak_and_shared_by_encodings(client, hotel_id):
+    etags = {}
+    for encoding in ("identity", "gzip"):
+        response = await client.get(f"/api/hotels/{hotel_id}", headers={"Accept-Encoding": encoding})
+        assert response.status_code == 200
+        assert response.headers.get("content-encoding", "identity") == encoding
+        etags[encoding] = response.headers["etag"]
+    assert etags["identity"] == etags["gzip"]
+    etag = etags["gzip"]
+    assert etag.startswith('W/"')
+
+    # Comparaison faible : la forme forte envoyée par un client correspond aussi
+    for if_none_match in (etag, etag[2:], f'"autre", {etag}'):
+        response = await client.get(
+            f"/api/hotels/{hotel_id}", headers={"If-None-Match": if_none_match, "Accept-Encoding": "identity"}
+        )
+        assert response.status_code == 304, if_none_match
+
+    await client.put(f"/api/hotels/{hotel_id}", json={"address": "2 rue du Cache"})
+    response = await client.get(f"/api/hotels/{hotel_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+async def test_vary_accept_encoding_on_every_encoding(client, hotel_id):
+    for encoding in ("identity", "gzip"):
+        response = await client.get(f"/api/hotels/{hotel_id}", headers={"Accept-Encoding": encoding})
+        assert response.headers["vary"].lower() == "accept-encoding", encoding
+        etag = response.headers["etag"]
+        response = await client.get(
+            f"/api/hotels/{hotel_id}", headers={"Accept-Encoding": encoding, "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.headers["vary"].lower() == "accept-encoding", encoding
+
+
+async def test_bulk_status_update_changes_etag_only_when_spots_change(client, hotel_id):
+    etag = (await client.get(f"/api/hotels/{hotel_id}")).headers["etag"]
+    bulk = {"operation": "add", "statuses": ["personnel"], "hotel_id": hotel_id}
+    response = await client.post("/api/spots/statuses/bulk", json=bulk)
+    assert response.json()["added"] == 20
+    new_etag = (await client.get(f"/api/hotels/{hotel_id}")).headers["etag"]
+    assert new_etag != etag
+
+    # Statut déjà posé partout : rien ne change, la version non plus
+    response = await client.post("/api/spots/statuses/bulk", json=bulk)
+    assert response.json()["added"] == 0
+    assert (await client.get(f"/api/hotels/{hotel_id}")).headers["etag"] == new_etag
@@ -0,0 +1,82 @@
+"""
+Cache des tables de référence : rechargements provoqués par les valeurs inconnues et
+invalidation à la validation de la transaction qui crée une valeur
+"""
+import io
+import json
+
+import pytest
+
+from app.models.parking import Status, SpotType
+from app.repositories.cache import LookupCache
+from app.repositories.parking import ParkingSpotRepository
+from app.schemas.parking import Status as StatusSchema, SpotType as SpotTypeSchema
+from app.services.importer import ImportService
+from database import SessionLocal
+from test_query_count import count_queries
+
+
+@pytest.fixture
+def db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def test_unknown_values_do_not_reload_each_time(db):
+    cache = LookupCache(Status, StatusSchema, ttl=300, miss_reload=60)
+    with count_queries() as statements:
+        assert cache.get_by_value(db, "inconnu") is None
+    assert len(statements) == 1
+
+    with count_queries() as statements:
+        for _ in range(10):
+            assert cache.get_by_value(db, "inconnu") is None
+            assert cache.get_by_id(db, 999999) is None
+            assert cache.get_ids(db, ["inconnu", "personnel"]).keys() == {"personnel"}
+    assert statements == []
+
+
+def test_unknown_value_reloads_after_interval(db):
+    cache = LookupCache(Status, StatusSchema, ttl=300, miss_reload=0)
+    assert cache.get_by_value(db, "cree_ailleurs") is None
+    # Création validée par une autre session (autre worker)
+    other = SessionLocal()
+    try:
+        other.add(Status(value="cree_ailleurs", color="#123456"))
+        other.commit()
+    finally:
+        other.close()
+    assert cache.get_by_value(db, "cree_ailleurs").color == "#123456"
+
+
+def test_invalidated_after_commit(db):
+    cache = LookupCache(SpotType, SpotTypeSchema, ttl=300, miss_reload=60)
+    cache.load(db)
+    db.add(SpotType(value="NON_VALIDE"))
+    db.flush()
+    cache.invalidate_after_commit(db)
+    with count_queries() as statements:
+        assert "NON_VALIDE" not in {item.value for item in cache.get_all(db)}
+    assert statements == []
+
+    db.commit()
+    with count_queries() as statements:
+        assert "NON_VALIDE" in {item.value for item in cache.get_all(db)}
+    assert len(statements) == 1
+
+
+def test_new_type_shared_by_parkings_of_an_import_chunk(db):
+    lines = [json.dumps({
+        "hotel": "Hôtel Types", "parking": f"Parking {parking}",
+        "number": 1, "floor": 0, "section": "A",
+        "length": 5.0, "width": 2.5, "height": 2.1, "surface": 12.5,
+        "hourly_rate": 2.5, "daily_rate": 20.0, "monthly_rate": 150.0,
+        "types": ["NOUVEAU_TYPE"],
+    }) for parking in range(2)]
+    result = ImportService.import_file(db, io.BytesIO("\n".join(lines).encode()), "ndjson")
+    assert result["errors"] == []
+    assert result["created"] == 2
+    assert ParkingSpotRepository.resolve_spot_type_ids(db, ["NOUVEAU_TYPE"]).keys() == {"NOUVEAU_TYPE"}
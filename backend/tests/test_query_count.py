@@ -0,0 +1,105 @@
+"""
+Nombre de requêtes SQL pour charger et sérialiser l'arborescence d'un hôtel ou d'un
+parking : il ne doit pas dépendre du nombre de parkings et d'emplacements
+"""
+import io
+import json
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.models.parking import Hotel
+from app.schemas.parking import HotelInDB, ParkingInDB
+from app.services.importer import ImportService
+from app.services.parking import HotelService, ParkingService
+from database import SessionLocal, engine
+
+# Requêtes attendues : hôtel, parkings, emplacements, types, statuts (une par niveau)
+MAX_QUERIES = 5
+
+
+def import_hotel(name: str, parkings: int, spots: int) -> Hotel:
+    """Créer un hôtel de parkings × spots emplacements, avec types et statuts"""
+    lines = []
+    for parking in range(parkings):
+        for number in range(spots):
+            lines.append(json.dumps({
+                "hotel": name, "parking": f"Parking {parking}",
+                "number": number, "floor": number % 3, "section": "A",
+                "length": 5.0, "width": 2.5, "height": 2.1, "surface": 12.5,
+                "hourly_rate": 2.5, "daily_rate": 20.0, "monthly_rate": 150.0,
+                "types": ["STANDARD", "PMR"] if number % 2 else ["STANDARD"],
+                "statuses": ["personnel", "already_in"] if number % 3 else [],
+            }))
+    db = SessionLocal()
+    try:
+        result = ImportService.import_file(db, io.BytesIO("\n".join(lines).encode()), "ndjson")
+        assert result["created"] == parkings * spots
+        return db.query(Hotel).filter(Hotel.name == name).one()
+    finally:
+        db.close()
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def hotel_queries(hotel_id: int) -> int:
+    db = SessionLocal()
+    try:
+        with count_queries() as statements:
+            HotelInDB.model_validate(HotelService.get_hotel_by_id(db, hotel_id), from_attributes=True)
+        return len(statements)
+    finally:
+        db.close()
+
+
+def parking_queries(parking_id: int) -> int:
+    db = SessionLocal()
+    try:
+        with count_queries() as statements:
+            ParkingInDB.model_validate(ParkingService.get_parking_by_id(db, parking_id), from_attributes=True)
+        return len(statements)
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="module")
+def hotels():
+    small = import_hotel("Hôtel Petit", parkings=1, spots=1)
+    # 400 emplacements : sous la taille des lots IN de selectinload (500)
+    large = import_hotel("Hôtel Grand", parkings=5, spots=80)
+    return small, large
+
+
+def test_hotel_tree_query_count_is_constant(hotels):
+    small, large = hotels
+    small_count = hotel_queries(small.id)
+    large_count = hotel_queries(large.id)
+    assert small_count == large_count
+    assert large_count <= MAX_QUERIES, large_count
+
+
+def test_parking_tree_query_count_is_constant(hotels):
+    small, large = hotels
+    db = SessionLocal()
+    try:
+        small_parking = HotelService.get_hotel_by_id(db, small.id).parkings[0].id
+        large_parking = max(HotelService.get_hotel_by_id(db, large.id).parkings, key=lambda parking: len(parking.spots)).id
+    finally:
+        db.close()
+    small_count = parking_queries(small_parking)
+    large_count = parking_queries(large_parking)
+    assert small_count == large_count
+    assert large_count <= MAX_QUERIES, large_count
@@ -0,0 +1,86 @@
+"""
+Flux temps réel des emplacements (/api/stream) : diffusion des modifications et fin du
+flux à la suppression du parking ou de son hôtel
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from api.endpoints.stream import _sse_events
+from app.repositories.spot_events import spot_event_hub
+from database import async_engine
+from main import app
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def client():
+    # Le cycle de vie de l'application démarre la tâche de diffusion (spot_event_hub.run)
+    with TestClient(app) as client:
+        yield client
+        # Les connexions aiosqlite sont liées à la boucle du client
+        client.portal.call(async_engine.dispose)
+
+
+def create_parking(client, name: str):
+    hotel_id = client.post("/api/hotels/", json={"name": name}).json()["id"]
+    parking_id = client.post(f"/api/hotels/{hotel_id}/parkings/", json={"name": "Parking"}).json()["id"]
+    return hotel_id, parking_id
+
+
+@pytest.mark.parametrize("deleted", ["parking", "hotel"])
+def test_websocket_closes_when_parking_is_deleted(client, spot_data, deleted):
+    hotel_id, parking_id = create_parking(client, f"Hôtel Flux {deleted}")
+    with client.websocket_connect(f"/api/stream/parkings/{parking_id}") as websocket:
+        assert json.loads(websocket.receive_text())["op"] == "subscribed"
+
+        response = client.post(f"/api/parkings/{parking_id}/spots/", json=spot_data(1))
+        assert response.status_code == 201
+        message = json.loads(websocket.receive_text())
+        assert (message["op"], message["spot_id"]) == ("create", response.json()["id"])
+
+        path = f"/api/parkings/{parking_id}" if deleted == "parking" else f"/api/hotels/{hotel_id}"
+        assert client.delete(path).status_code == 200
+        message = json.loads(websocket.receive_text())
+        assert message["op"] == "deleted"
+        assert message["parking_id"] == parking_id
+        assert message["seq"] > 0
+        with pytest.raises(WebSocketDisconnect):
+            websocket.receive_text()
+
+
+@pytest.mark.anyio
+async def test_sse_ends_when_hotel_is_deleted():
+    # TestClient attend la fin d'une réponse en flux : le générateur SSE est lu directement
+    hub = asyncio.create_task(spot_event_hub.run())
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            hotel_id = (await client.post("/api/hotels/", json={"name": "Hôtel Flux SSE"})).json()["id"]
+            parking_id = (await client.post(f"/api/hotels/{hotel_id}/parkings/", json={"name": "Parking"})).json()["id"]
+            other_hotel_id = (await client.post("/api/hotels/", json={"name": "Hôtel Flux SSE autre"})).json()["id"]
+
+            events = _sse_events(parking_id, hotel_id, 1)
+            assert (await events.__anext__()).startswith("event: subscribed")
+            # La suppression d'un autre hôtel ne concerne pas ce flux
+            assert (await client.delete(f"/api/hotels/{other_hotel_id}")).status_code == 200
+            assert (await client.delete(f"/api/hotels/{hotel_id}")).status_code == 200
+            event = await asyncio.wait_for(events.__anext__(), 5)
+            # Le flux se termine après le message de suppression
+            with pytest.raises(StopAsyncIteration):
+                await asyncio.wait_for(events.__anext__(), 5)
+    finally:
+        hub.cancel()
+        await async_engine.dispose()
+    seq, data = event.split("\n")[:2]
+    message = json.loads(data[len("data: "):])
+    assert (message["op"], message["parking_id"]) == ("deleted", parking_id)
+    assert seq == f"id: {message['seq']}"